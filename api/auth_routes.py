@@ -1,7 +1,6 @@
 """
 Authentication API routes для email/пароль, Google OAuth и Telegram
 """
-import requests
 import logging
 import os
 import secrets
@@ -17,6 +16,7 @@ from pydantic import BaseModel, EmailStr
 import bcrypt
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
+from services.http_client import http_transport
 from config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD
 
 logger = logging.getLogger(__name__)
@@ -362,23 +362,20 @@ async def google_login(request: Request, body: GoogleTokenRequest):
                 content={'success': False, 'error': 'Google OAuth не настроен'}
             )
 
-        import requests as req
-
         # Верифицируем токен через Google API
-        response = req.get(
+        status, idinfo = await http_transport.get_json(
             'https://www.googleapis.com/oauth2/v1/tokeninfo',
             params={'id_token': body.token},
             timeout=10
         )
 
-        if response.status_code != 200:
-            logger.error(f"Google token validation failed: {response.text}")
+        if status != 200 or idinfo is None:
+            logger.error(f"Google token validation failed: HTTP {status}")
             return JSONResponse(
                 status_code=400,
                 content={'success': False, 'error': 'Invalid token'}
             )
 
-        idinfo = response.json()
         logger.info(f"Token info: {idinfo}")
 
         # Декодируем id_token для получения полной информации, включая фото
@@ -404,8 +401,8 @@ async def google_login(request: Request, body: GoogleTokenRequest):
         if google_avatar_url:
             try:
                 # Скачиваем изображение
-                img_response = req.get(google_avatar_url, timeout=10)
-                if img_response.status_code == 200:
+                img_status, img_content = await http_transport.get_bytes(google_avatar_url, timeout=10)
+                if img_status == 200:
                     # Создаем директорию если не существует
                     avatars_dir = Path("static/avatars")
                     avatars_dir.mkdir(exist_ok=True)
@@ -416,13 +413,13 @@ async def google_login(request: Request, body: GoogleTokenRequest):
                     filepath = avatars_dir / filename
 
                     with open(filepath, 'wb') as f:
-                        f.write(img_response.content)
+                        f.write(img_content)
 
                     # Сохраняем относительный путь
                     avatar_url = f"/static/avatars/{filename}"
                     logger.info(f"✅ Avatar saved: {avatar_url}")
                 else:
-                    logger.warning(f"Failed to download avatar: {img_response.status_code}")
+                    logger.warning(f"Failed to download avatar: {img_status}")
             except Exception as e:
                 logger.error(f"Error downloading avatar: {e}")
                 avatar_url = None
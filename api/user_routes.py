@@ -305,7 +305,9 @@ async def save_prediction(
             symbol=request_data.get('symbol'),
             predicted_price=float(request_data.get('predicted_price', 0)),
             confidence=float(request_data.get('confidence', 0)),
-            signal=request_data.get('signal', 'HOLD')
+            signal=request_data.get('signal', 'HOLD'),
+            base_price=float(request_data['current_price']) if request_data.get('current_price') else None,
+            horizon_days=int(request_data.get('days', 7))
         )
 
         if not success:
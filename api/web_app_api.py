@@ -1,6 +1,5 @@
 import asyncio
 import logging
-import httpx
 import os
 import json
 import time
@@ -12,8 +11,15 @@ from fastapi import FastAPI, HTTPException, Query, Request, Header
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api.auth_routes import verify_jwt_token
-from config import POPULAR_CRYPTOS, CACHE_TTL, DATABASE_URL, ADMIN_IDS
-from services import bybit_service
+from config import (POPULAR_CRYPTOS, DATABASE_URL, ADMIN_IDS, BYBIT_WS_ENABLED, INDICATOR_TABLE_ENABLED,
+                    FORECAST_PREWARM_ENABLED, PREDICTION_RESOLVER_ENABLED, ONLINE_MODEL_ENABLED)
+from services import bybit_service, http_transport, indicators
+from services.forecast_service import forecast_service
+from services.prediction_resolver import prediction_resolver
+from services.intraday_forecast import intraday_forecast_service
+from services.response_cache import response_cache
+from models.simulation import direction_confidence, format_bands
+from services.analytics_pool import analytics_pool, AnalyticsPoolBusy
 from models.database import Database
 from api import auth_routes  # ✨ НОВОЕ
 from fastapi.staticfiles import StaticFiles
@@ -31,43 +37,23 @@ from json import JSONEncoder
 # Глобальная переменная БД
 db: Optional[Database] = None
 
-# 🎯 Кэш доступных символов Bybit (обновляется каждые 10 минут)
-BYBIT_AVAILABLE_SYMBOLS = set()
-BYBIT_SYMBOLS_LAST_UPDATE = 0
-BYBIT_SYMBOLS_TTL = 600  # 10 минут
-
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-cache = {}
-
 
 # ==================== BYBIT API ФУНКЦИИ ====================
 
 
 async def update_bybit_available_symbols():
-    """Обновить список доступных символов на Bybit"""
-    global BYBIT_AVAILABLE_SYMBOLS, BYBIT_SYMBOLS_LAST_UPDATE
-
-    current_time = time.time()
-
-    # Проверяем, нужно ли обновлять кэш
-    if BYBIT_AVAILABLE_SYMBOLS and (current_time - BYBIT_SYMBOLS_LAST_UPDATE) < BYBIT_SYMBOLS_TTL:
-        return BYBIT_AVAILABLE_SYMBOLS
-
+    """Обновить список доступных символов на Bybit (из общего снимка тикеров)"""
     try:
-        symbols = await bybit_service.get_all_available_symbols()
-        if symbols:
-            BYBIT_AVAILABLE_SYMBOLS = symbols
-            BYBIT_SYMBOLS_LAST_UPDATE = current_time
-            logger.info(f"✅ Обновлен кэш Bybit символов: {len(symbols)} монет")
-        return BYBIT_AVAILABLE_SYMBOLS
+        return await bybit_service.get_all_available_symbols()
     except Exception as e:
         logger.error(f"Ошибка обновления списка Bybit символов: {e}")
-        return BYBIT_AVAILABLE_SYMBOLS
+        return set()
 
 
 def get_crypto_logo_from_config(symbol: str):
@@ -103,9 +89,32 @@ async def lifespan(app: FastAPI):
 
     logger.info("🚀 Запуск приложения...")
 
+    # 🌐 Общий пул HTTP соединений для всех исходящих запросов
+    await http_transport.start()
+
+    # 🧮 Пул для CPU-тяжёлой аналитики (прогнозы, батч индикаторов)
+    analytics_pool.start()
+
     # 🎯 Загружаем доступные символы с Bybit (используем вместо локального JSON)
     logger.info("🎯 Загружаем доступные символы с Bybit...")
-    await update_bybit_available_symbols()
+    symbols = await update_bybit_available_symbols()
+
+    # 📡 Живые тикеры через WebSocket: цены и поиск читаются из памяти
+    if BYBIT_WS_ENABLED and symbols:
+        await bybit_service.start_ticker_stream(symbols)
+
+    # 📊 Фоновый пересчёт таблицы индикаторов по всем USDT парам
+    if INDICATOR_TABLE_ENABLED:
+        bybit_service.start_indicator_table_job()
+
+    # 🔮 Прогнозы популярных монет считаются заранее, после закрытия дневной свечи
+    if FORECAST_PREWARM_ENABLED:
+        forecast_service.start_prewarm_job()
+
+    # ⏱ Внутридневные онлайн модели: состояние с диска, обновление на каждой закрытой свече
+    if ONLINE_MODEL_ENABLED:
+        intraday_forecast_service.load_checkpoints()
+        intraday_forecast_service.start_job()
 
     # Подключаемся к БД
     db = Database(DATABASE_URL)
@@ -168,6 +177,10 @@ async def lifespan(app: FastAPI):
             )
 
             logger.info("✅ Тарифы созданы")
+
+        # 🎯 Оценка сохранённых прогнозов по фактическим ценам
+        if PREDICTION_RESOLVER_ENABLED:
+            prediction_resolver.start(db)
     else:
         logger.warning("⚠️ БД недоступна")
 
@@ -176,9 +189,14 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("🛑 Остановка приложения...")
+    await prediction_resolver.stop()
     if db:
         await db.close()
+    await forecast_service.stop()
+    await intraday_forecast_service.stop()
     await bybit_service.close_session()
+    await http_transport.close()
+    await analytics_pool.close()
     logger.info("✅ Приложение остановлено")
 
 
@@ -214,18 +232,6 @@ app.add_middleware(
 )
 
 
-async def get_cache(key: str):
-    if key in cache:
-        value, timestamp = cache[key]
-        if time.time() - timestamp < CACHE_TTL:
-            return value
-    return None
-
-
-async def set_cache(key: str, value):
-    cache[key] = (value, time.time())
-
-
 async def verify_token(authorization: str = Header(None)):
     """Проверить JWT токен из header Authorization"""
     if not authorization:
@@ -563,6 +569,12 @@ async def health_check():
         'timestamp': datetime.now().isoformat(),
         'database': db_status,
         'api': 'Bybit API v5',
+        'bybit': bybit_service.get_request_stats(),
+        'forecasts': forecast_service.get_stats(),
+        'analytics_pool': analytics_pool.get_stats(),
+        'prediction_resolver': prediction_resolver.get_stats(),
+        'intraday_models': intraday_forecast_service.get_stats(),
+        'response_cache': response_cache.get_stats(),
     })
 
 
@@ -599,14 +611,14 @@ async def register_user(request: Request, x_user_id: int = Header(None)):
 # ==================== КРИПТОВАЛЮТЫ ====================
 
 @app.get('/api/search')
-async def search_cryptocurrencies(q: str = Query('', min_length=1)):
+async def search_cryptocurrencies(q: str = Query('', min_length=1, max_length=50)):
     query = q.strip()
 
     if not query:
         return JSONResponse({'success': True, 'data': [], 'source': 'empty'})
 
     cache_key = f"search:{query}"
-    cached_result = await get_cache(cache_key)
+    cached_result = response_cache.get(cache_key)
     if cached_result:
         return JSONResponse(cached_result)
 
@@ -621,7 +633,7 @@ async def search_cryptocurrencies(q: str = Query('', min_length=1)):
                         crypto['emoji'] = logo_info.get('emoji', '💰')
 
                 result = {'success': True, 'data': db_results, 'source': 'database', 'count': len(db_results)}
-                await set_cache(cache_key, result)
+                response_cache.set(cache_key, result)
                 return JSONResponse(result)
 
         api_results = await bybit_service.search_cryptocurrencies(query)
@@ -634,7 +646,7 @@ async def search_cryptocurrencies(q: str = Query('', min_length=1)):
                 crypto['emoji'] = logo_info.get('emoji', '💰')
 
         result = {'success': True, 'data': api_results, 'source': 'bybit_api', 'count': len(api_results)}
-        await set_cache(cache_key, result)
+        response_cache.set(cache_key, result)
         return JSONResponse(result)
 
     except Exception as e:
@@ -646,12 +658,12 @@ async def search_cryptocurrencies(q: str = Query('', min_length=1)):
 async def get_all_cryptocurrencies():
     try:
         cache_key = "all_cryptos"
-        cached_result = await get_cache(cache_key)
+        cached_result = response_cache.get(cache_key)
         if cached_result:
             return JSONResponse(cached_result)
 
         result = {'success': True, 'data': POPULAR_CRYPTOS, 'total': len(POPULAR_CRYPTOS), 'source': 'config'}
-        await set_cache(cache_key, result)
+        response_cache.set(cache_key, result)
         return JSONResponse(result)
 
     except Exception as e:
@@ -726,7 +738,7 @@ async def get_crypto_data(symbol: str):
         symbol = f"{symbol}USDT"
 
     cache_key = f"crypto:{symbol}"
-    cached_result = await get_cache(cache_key)
+    cached_result = response_cache.get(cache_key)
     if cached_result:
         return JSONResponse(cached_result)
 
@@ -737,17 +749,16 @@ async def get_crypto_data(symbol: str):
 
         history = await bybit_service.get_price_history(symbol, days=90)
         if not history:
-            history = {'prices': [ticker['last_price']], 'timestamps': [int(time.time() * 1000)]}
+            history = {'prices': np.array([ticker['last_price']]), 'timestamps': np.array([int(time.time() * 1000)])}
 
         prices = history['prices']
-        indicators = await bybit_service.calculate_technical_indicators(prices)
 
-        rsi = calculate_rsi(np.array(prices))
-        ma_7 = np.mean(np.array(prices[-7:]))
-        ma_25 = np.mean(np.array(prices[-25:]))
-        ma_50 = np.mean(np.array(prices[-50:]))
-        volatility = calculate_volatility(np.array(prices))
-        trend_strength = calculate_trend_strength(np.array(prices))
+        # Индикаторы из потокового состояния - без пересчёта по всей истории
+        live = await bybit_service.get_live_indicators(symbol, "D")
+        if not live:
+            price = ticker['last_price']
+            live = {'rsi': 50.0, 'ma_7': price, 'ma_25': price, 'ma_50': price,
+                    'volatility': 0.0, 'trend_strength': 0.0}
 
         logo_info = get_crypto_logo_from_config(symbol)
 
@@ -769,22 +780,22 @@ async def get_crypto_data(symbol: str):
                     'turnover_24h': ticker['turnover_24h']
                 },
                 'history': {
-                    'prices': prices,
-                    'timestamps': history['timestamps']
+                    'prices': prices.tolist(),
+                    'timestamps': history['timestamps'].tolist()
                 },
                 'indicators': {
-                    'rsi': float(rsi),
-                    'ma_7': float(ma_7),
-                    'ma_25': float(ma_25),
-                    'ma_50': float(ma_50),
-                    'volatility': float(volatility),
-                    'trend_strength': float(trend_strength)
+                    'rsi': live['rsi'],
+                    'ma_7': live['ma_7'],
+                    'ma_25': live['ma_25'],
+                    'ma_50': live['ma_50'],
+                    'volatility': live['volatility'],
+                    'trend_strength': live['trend_strength']
                 }
             },
             'timestamp': datetime.now().isoformat()
         }
 
-        await set_cache(cache_key, result)
+        response_cache.set(cache_key, result)
         return JSONResponse(result)
 
     except HTTPException:
@@ -845,24 +856,33 @@ async def predict_price(symbol: str, request: Request):
                 }
             )
 
-        from models.lstm_model import predictor
+        if not await bybit_service.is_symbol_available(symbol):
+            raise HTTPException(status_code=404, detail=f'Symbol {symbol} not found')
 
-        history = await bybit_service.get_price_history(symbol, days=90)
-        if not history or not history['prices']:
+        # 🔮 Прогноз по закрытым дневным свечам - один расчёт на символ в сутки
+        try:
+            forecast = await forecast_service.get_forecast(symbol)
+        except (AnalyticsPoolBusy, asyncio.TimeoutError):
+            raise HTTPException(status_code=503, detail='Prediction service is busy, try again later')
+        if not forecast:
             raise HTTPException(status_code=400, detail='Insufficient data')
 
-        prices = np.array(history['prices'], dtype=float)
-        current_price = prices[-1]
+        ticker = await bybit_service.get_current_price(symbol)
+        current_price = ticker['last_price'] if ticker else float(forecast['prices'][-1])
 
-        predictions, ensemble_confidence, details = predictor.ensemble_prediction(prices, future_steps=7)
+        predictions = forecast['predictions']
         expected_price = predictions[-1]
 
-        support, resistance = calculate_support_resistance(prices)
+        # RSI, волатильность и уровни по закрытым свечам - один расчёт на закрытие свечи
+        closed_indicators = bybit_service.get_closed_indicators(symbol, "D", forecast['prices'],
+                                                                forecast['timestamps'])
+        support, resistance = closed_indicators['support'], closed_indicators['resistance']
 
         trend = (expected_price - current_price) / current_price * 100
-        signal, signal_text, emoji = get_trading_signal(trend, prices)
+        signal, signal_text, emoji = get_trading_signal(trend, closed_indicators['rsi'])
 
-        confidence = calculate_confidence(current_price, expected_price, support, resistance, trend, prices)
+        # 🎲 Уверенность и диапазон цены - из Monte Carlo траекторий, посчитанных вместе с прогнозом
+        confidence = direction_confidence(forecast['terminal_quantiles'], current_price, expected_price)
 
         # ✨ СОХРАНЯЕМ ПРОГНОЗ В ИСТОРИЮ
         await db.save_prediction(
@@ -870,7 +890,9 @@ async def predict_price(symbol: str, request: Request):
             symbol=symbol,
             predicted_price=float(expected_price),
             confidence=float(confidence),
-            signal=signal
+            signal=signal,
+            base_price=float(current_price),
+            horizon_days=len(predictions)
         )
 
         # Получаем обновленные лимиты
@@ -890,8 +912,13 @@ async def predict_price(symbol: str, request: Request):
                 'signal_text': signal_text,
                 'signal_emoji': emoji,
                 'confidence': float(confidence),
+                'bands': format_bands(forecast['bands']),
+                'model': {
+                    'version': forecast['model_version'],
+                    'predictions': forecast['sequence_predictions'].tolist()
+                } if forecast['sequence_predictions'] is not None else None,
                 'days': 7,
-                'rmse': calculate_rmse(prices),
+                'rmse': calculate_rmse(float(current_price), closed_indicators['volatility']),
                 'limits': {
                     'daily': {
                         'used': updated_limits['predictions_used_today'],
@@ -928,6 +955,9 @@ async def get_klines(
         symbol = f"{symbol}USDT"
 
     try:
+        if not await bybit_service.is_symbol_available(symbol):
+            raise HTTPException(status_code=404, detail=f'Symbol {symbol} not found')
+
         klines = await bybit_service.get_kline_data(symbol, interval, limit)
         if not klines:
             raise HTTPException(status_code=404, detail='Failed to get klines')
@@ -959,145 +989,196 @@ async def get_klines(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ==================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ====================
+@app.get('/api/indicators/{symbol}')
+async def get_indicator_series(
+        symbol: str,
+        interval: str = Query('D', description="Интервал свечей"),
+        limit: int = Query(200, ge=1, le=1000, description="Лимит свечей")
+):
+    """Полные ряды индикаторов (SMA/EMA, MACD, RSI, Bollinger, ATR) для графиков"""
+    symbol = symbol.upper()
+    if not symbol.endswith('USDT'):
+        symbol = f"{symbol}USDT"
 
-def calculate_rsi(prices: np.ndarray, period: int = 14) -> float:
     try:
-        if len(prices) < period:
-            return 50.0
+        if not await bybit_service.is_symbol_available(symbol):
+            raise HTTPException(status_code=404, detail=f'Symbol {symbol} not found')
 
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
+        candles = await bybit_service.get_candles(symbol, interval, limit)
+        if candles is None or not len(candles):
+            raise HTTPException(status_code=404, detail='Failed to get klines')
 
-        avg_gain = np.mean(gains[-period:])
-        avg_loss = np.mean(losses[-period:])
+        series = indicators.compute_all(candles['close'], candles['high'], candles['low'])
 
-        rs = avg_gain / avg_loss if avg_loss > 0 else 0
-        rsi = 100 - (100 / (1 + rs)) if rs >= 0 else 50
+        return JSONResponse({
+            'success': True,
+            'symbol': symbol,
+            'interval': interval,
+            'timestamps': candles['timestamp'].tolist(),
+            'close': candles['close'].tolist(),
+            # NaN (недостаточно истории) -> null
+            'data': {name: [None if np.isnan(v) else round(float(v), 8) for v in values]
+                     for name, values in series.items()},
+            'count': len(candles)
+        })
 
-        return float(rsi)
-    except:
-        return 50.0
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/api/indicators/{symbol}/live')
+async def get_live_indicators(symbol: str, interval: str = Query('D', description="Интервал свечей")):
+    """Текущие значения индикаторов по живой цене (потоковое состояние)"""
+    symbol = symbol.upper()
+    if not symbol.endswith('USDT'):
+        symbol = f"{symbol}USDT"
 
-def calculate_volatility(prices: np.ndarray) -> float:
     try:
-        if len(prices) < 2:
-            return 0.0
-        returns = np.diff(prices) / prices[:-1] * 100
-        return float(np.std(returns))
-    except:
-        return 0.0
+        if not await bybit_service.is_symbol_available(symbol):
+            raise HTTPException(status_code=404, detail=f'Symbol {symbol} not found')
 
+        live = await bybit_service.get_live_indicators(symbol, interval)
+        if not live:
+            raise HTTPException(status_code=404, detail='Failed to get indicators')
 
-def calculate_trend_strength(prices: np.ndarray) -> float:
-    try:
-        if len(prices) < 2:
-            return 0.0
-        first = prices[0]
-        last = prices[-1]
-        trend = (last - first) / first * 100
-        return float(trend)
-    except:
-        return 0.0
+        return JSONResponse({
+            'success': True,
+            'symbol': symbol,
+            'interval': interval,
+            'data': live,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/api/market/indicators')
+async def get_market_indicators():
+    """Предрассчитанные индикаторы по всем USDT парам (обзор рынка)"""
+    table = bybit_service.indicator_table
+    if table is None:
+        raise HTTPException(status_code=503, detail='Indicator table is not ready yet')
 
-def calculate_support_resistance(prices: np.ndarray) -> tuple:
-    try:
-        high_20 = np.max(prices[-20:])
-        low_20 = np.min(prices[-20:])
-        return float(low_20), float(high_20)
-    except:
-        current = prices[-1]
-        return float(current * 0.95), float(current * 1.05)
+    return JSONResponse({
+        'success': True,
+        'interval': table.interval,
+        'data': table.rows(),
+        'count': len(table),
+        'age_seconds': round(table.age(), 1)
+    })
 
+@app.get('/api/screener')
+async def market_screener(
+        preset: str = Query(None, description="oversold, overbought, top_gainers, top_losers, high_volatility, breakouts"),
+        rsi_min: float = Query(None), rsi_max: float = Query(None),
+        volatility_min: float = Query(None), volatility_max: float = Query(None),
+        change_min: float = Query(None, description="Изменение за 24ч, %"), change_max: float = Query(None),
+        trend_min: float = Query(None), trend_max: float = Query(None),
+        turnover_min: float = Query(None, description="Оборот за 24ч, USDT"),
+        sort: str = Query(None, description="Колонка сортировки"),
+        order: str = Query(None, pattern='^(asc|desc)$'),
+        limit: int = Query(50, ge=1, le=500)
+):
+    """Скринер по всем USDT парам из предрассчитанной таблицы индикаторов"""
+    table = bybit_service.indicator_table
+    if table is None:
+        raise HTTPException(status_code=503, detail='Indicator table is not ready yet')
+
+    if preset is not None and preset not in table.PRESETS:
+        raise HTTPException(status_code=400, detail=f'Unknown preset {preset}')
+    if sort is not None and sort not in table.COLUMNS:
+        raise HTTPException(status_code=400, detail=f'Unknown sort column {sort}')
+
+    base = table.PRESETS.get(preset, {'filters': {}, 'sort': 'turnover_24h', 'descending': True})
+    filters = dict(base['filters'])
+    for column, low, high in (('rsi', rsi_min, rsi_max),
+                              ('volatility', volatility_min, volatility_max),
+                              ('change_24h', change_min, change_max),
+                              ('trend_strength', trend_min, trend_max),
+                              ('turnover_24h', turnover_min, None)):
+        if low is not None or high is not None:
+            filters[column] = (low, high)
+
+    descending = base['descending'] if order is None else order == 'desc'
+    rows = table.screen(filters, sort or base['sort'], descending, limit)
+
+    return JSONResponse({
+        'success': True,
+        'interval': table.interval,
+        'data': rows,
+        'count': len(rows),
+        'universe': len(table),
+        'age_seconds': round(table.age(), 1)
+    })
 
-def calculate_confidence(current_price: float, expected_price: float,
-                         support: float, resistance: float,
-                         trend: float, prices: np.ndarray) -> float:
+@app.get('/api/forecast/{symbol}/intraday')
+async def get_intraday_forecast(
+        symbol: str,
+        interval: str = Query('60', description="Интервал свечей (60, 15)"),
+        steps: int = Query(12, ge=1, le=96, description="Сколько свечей вперёд")
+):
+    """Внутридневной прогноз онлайн модели (без дообучения на запрос)"""
     try:
-        if len(prices) < 30:
-            return 25.0
-
-        returns = np.diff(prices) / prices[:-1] * 100
-        volatility = np.std(returns)
-        volatility_score = max(0, 100 - (volatility * 5))
-        volatility_score = min(100, volatility_score)
-
-        rsi = calculate_rsi(prices)
-        rsi_diff = abs(rsi - 50)
-        rsi_score = max(0, 100 - (rsi_diff * 1.5))
-        if rsi > 75 or rsi < 25:
-            rsi_score = rsi_score * 0.6
-
-        support_resistance_range = resistance - support
-        if support_resistance_range == 0:
-            sr_score = 50
-        else:
-            position = (expected_price - support) / support_resistance_range
-            if 0 <= position <= 1:
-                sr_score = 85
-            elif position > 1:
-                sr_score = 55 - (position - 1) * 10
-            else:
-                sr_score = 55 - abs(position) * 10
-            sr_score = max(20, min(100, sr_score))
-
-        trend_7 = (prices[-1] - prices[-7]) / prices[-7] * 100 if len(prices) >= 7 else 0
-        trend_14 = (prices[-1] - prices[-14]) / prices[-14] * 100 if len(prices) >= 14 else 0
-        trend_30 = (prices[-1] - prices[-30]) / prices[-30] * 100 if len(prices) >= 30 else 0
-
-        trend_consistency = 0
-        if (trend_7 > 0 and trend_14 > 0 and trend_30 > 0) or \
-                (trend_7 < 0 and trend_14 < 0 and trend_30 < 0):
-            trend_consistency = 90
-        elif (trend_7 > 0 and trend_14 > 0) or (trend_7 < 0 and trend_14 < 0):
-            trend_consistency = 70
-        else:
-            trend_consistency = 40
-
-        predicted_change = abs((expected_price - current_price) / current_price * 100)
-
-        if predicted_change < 0.5:
-            change_score = 30
-        elif predicted_change < 2:
-            change_score = 50
-        elif predicted_change < 5:
-            change_score = 75
-        else:
-            change_score = 85
-
-        trend_agreement = 0
-        if trend > 0 and expected_price > current_price:
-            trend_agreement = 90
-        elif trend < 0 and expected_price < current_price:
-            trend_agreement = 90
-        elif abs(trend) < 1:
-            trend_agreement = 70
-        else:
-            trend_agreement = 40
-
-        confidence = (
-                volatility_score * 0.20 +
-                rsi_score * 0.20 +
-                sr_score * 0.15 +
-                trend_consistency * 0.20 +
-                change_score * 0.10 +
-                trend_agreement * 0.15
-        )
+        symbol = symbol.upper()
+        if not symbol.endswith('USDT'):
+            symbol = f"{symbol}USDT"
+
+        if interval not in intraday_forecast_service.intervals:
+            raise HTTPException(status_code=400, detail=f'Interval {interval} is not supported')
 
-        confidence = max(25, min(95, confidence))
-        return float(confidence)
+        if not await bybit_service.is_symbol_available(symbol):
+            raise HTTPException(status_code=404, detail=f'Symbol {symbol} not found')
 
+        forecast = await intraday_forecast_service.get_forecast(symbol, interval, steps)
+        if forecast is None:
+            raise HTTPException(status_code=400, detail='Insufficient data')
+
+        return JSONResponse({
+            'success': True,
+            'symbol': symbol,
+            'data': forecast,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error: {e}")
-        return 50.0
+        logger.error(f"Intraday forecast error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/api/predictions/accuracy')
+async def get_prediction_accuracy(symbol: Optional[str] = Query(None, description="Символ, например BTC")):
+    """Фактическая точность сохранённых прогнозов (агрегаты resolver из памяти)"""
+    if symbol is None:
+        return JSONResponse({
+            'success': True,
+            'data': prediction_resolver.get_accuracy(),
+            'last_run': prediction_resolver.last_run
+        })
 
-def get_trading_signal(trend: float, prices: np.ndarray) -> tuple:
-    rsi = calculate_rsi(prices)
+    symbol = symbol.upper()
+    if not symbol.endswith('USDT'):
+        symbol = f"{symbol}USDT"
 
+    accuracy = prediction_resolver.get_accuracy(symbol)
+    if accuracy is None:
+        raise HTTPException(status_code=404, detail=f'No resolved predictions for {symbol}')
+
+    return JSONResponse({
+        'success': True,
+        'symbol': symbol,
+        'data': accuracy,
+        'last_run': prediction_resolver.last_run
+    })
+
+# ==================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ====================
+
+def get_trading_signal(trend: float, rsi: float) -> tuple:
     if trend > 10 and rsi < 70:
         return 'STRONG_BUY', '🟢 Сильно покупать', '🟢'
     elif trend > 3 and rsi < 70:
@@ -1112,15 +1193,8 @@ def get_trading_signal(trend: float, prices: np.ndarray) -> tuple:
         return 'HOLD', '🟡 Удерживать', '🟡'
 
 
-def calculate_rmse(prices: np.ndarray) -> float:
-    try:
-        if len(prices) < 2:
-            return 0.0
-        returns = np.diff(prices) / prices[:-1]
-        rmse = np.std(returns) * prices[-1]
-        return max(0, float(rmse))
-    except:
-        return 0.0
+def calculate_rmse(current_price: float, volatility: float) -> float:
+    return max(0.0, float(volatility) / 100 * current_price)
 
 
 if __name__ == '__main__':
@@ -43,13 +43,126 @@ ADMIN_IDS = [int(x.strip()) for x in os.getenv('ADMIN_IDS', '').split(',') if x.
 APP_PORT = int(os.getenv('APP_PORT', 5000))
 APP_HOST = os.getenv('APP_HOST', '0.0.0.0')
 
+# ======================== HTTP ========================
+# Общий пул исходящих соединений (aiohttp): keep-alive, кэш DNS, лимиты на хост
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 200))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 64))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', 300))
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 60))
+# Лимиты параллельных запросов по хостам; выше HTTP_POOL_LIMIT_PER_HOST не действуют
+HTTP_HOST_LIMITS = {
+    'api.bybit.com': 64,
+    'api.bytick.com': 64,
+    'www.googleapis.com': 10,
+    'lh3.googleusercontent.com': 10,
+    'api.coingecko.com': 4,
+}
+
 # ======================== BYBIT API ========================
 BYBIT_API_BASE = 'https://api.bybit.com'
 BYBIT_API_DEMO = 'https://api-demo.bybit.com'
 BYBIT_MAIN_NET = 'https://api.bybit.com'
 
+# Зеркала публичного API: запрос уходит на самый быстрый здоровый адрес
+BYBIT_API_ENDPOINTS = [
+    url.strip() for url in os.getenv('BYBIT_API_ENDPOINTS', f'{BYBIT_MAIN_NET},https://api.bytick.com').split(',')
+    if url.strip()
+]
+
+# Публичный WebSocket Bybit (spot tickers.*)
+BYBIT_WS_ENABLED = os.getenv('BYBIT_WS_ENABLED', 'true').lower() == 'true'
+BYBIT_WS_PUBLIC_SPOT = os.getenv('BYBIT_WS_PUBLIC_SPOT', 'wss://stream.bybit.com/v5/public/spot')
+
+# Локальная заглушка Bybit (scripts/bybit_stub_server.py): REST и WebSocket без сети
+BYBIT_STUB_URL = os.getenv('BYBIT_STUB_URL', '').rstrip('/')
+if BYBIT_STUB_URL:
+    BYBIT_API_ENDPOINTS = [BYBIT_STUB_URL]
+    BYBIT_WS_PUBLIC_SPOT = BYBIT_STUB_URL.replace('http', 'ws', 1) + '/v5/public/spot'
+BYBIT_WS_STALE_SECONDS = int(os.getenv('BYBIT_WS_STALE_SECONDS', 30))
+
+# Локальный лимит запросов к Bybit (IP лимит Bybit - 600 запросов за 5 секунд)
+BYBIT_RATE_LIMIT_PER_SECOND = float(os.getenv('BYBIT_RATE_LIMIT_PER_SECOND', 50))
+BYBIT_RATE_LIMIT_BURST = int(os.getenv('BYBIT_RATE_LIMIT_BURST', 100))
+BYBIT_RATE_LIMIT_COOLDOWN = int(os.getenv('BYBIT_RATE_LIMIT_COOLDOWN', 60))
+
+# Таймауты (секунды), повторы, хеджирование и размыкатель для запросов к Bybit
+BYBIT_DEFAULT_TIMEOUT = float(os.getenv('BYBIT_DEFAULT_TIMEOUT', 10))
+BYBIT_TIMEOUTS = {
+    '/v5/market/tickers': float(os.getenv('BYBIT_TICKERS_TIMEOUT', 5)),
+    '/v5/market/kline': float(os.getenv('BYBIT_KLINE_TIMEOUT', 8)),
+}
+BYBIT_MAX_RETRIES = int(os.getenv('BYBIT_MAX_RETRIES', 2))
+BYBIT_HEDGE_ENABLED = os.getenv('BYBIT_HEDGE_ENABLED', 'true').lower() == 'true'
+BYBIT_BREAKER_FAILURES = int(os.getenv('BYBIT_BREAKER_FAILURES', 5))
+BYBIT_BREAKER_RESET_SECONDS = int(os.getenv('BYBIT_BREAKER_RESET_SECONDS', 30))
+# Доля запросов на резервные зеркала, чтобы их задержка оставалась актуальной
+BYBIT_ENDPOINT_PROBE_RATIO = float(os.getenv('BYBIT_ENDPOINT_PROBE_RATIO', 0.05))
+
+# Общий снимок всех spot тикеров (поиск, проверка символов, цены)
+TICKER_SNAPSHOT_TTL = int(os.getenv('TICKER_SNAPSHOT_TTL', 15))
+
+# Локальное хранилище свечей (append-only файлы, читаются через memmap)
+KLINE_STORE_DIR = os.getenv('KLINE_STORE_DIR', 'data/klines')
+KLINE_BACKFILL_CONCURRENCY = int(os.getenv('KLINE_BACKFILL_CONCURRENCY', 4))
+
+# Результаты walk-forward бэктестов предсказателя (JSON на каждый запуск)
+BACKTEST_DIR = os.getenv('BACKTEST_DIR', 'data/backtests')
+
+# Обученные модели (GRU на NumPy): версии весов и registry.json по группам символов
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'data/models')
+SEQUENCE_MODEL_ENABLED = os.getenv('SEQUENCE_MODEL_ENABLED', 'true').lower() == 'true'
+
+# Таблица индикаторов по всем USDT парам (обзор рынка, скринер)
+INDICATOR_TABLE_ENABLED = os.getenv('INDICATOR_TABLE_ENABLED', 'true').lower() == 'true'
+INDICATOR_TABLE_INTERVAL = os.getenv('INDICATOR_TABLE_INTERVAL', 'D')
+INDICATOR_TABLE_REFRESH_SECONDS = int(os.getenv('INDICATOR_TABLE_REFRESH_SECONDS', 300))
+
+# Прогнозы: пересчёт популярных символов после закрытия дневной свечи (00:00 UTC)
+FORECAST_PREWARM_ENABLED = os.getenv('FORECAST_PREWARM_ENABLED', 'true').lower() == 'true'
+FORECAST_PREWARM_DELAY_SECONDS = int(os.getenv('FORECAST_PREWARM_DELAY_SECONDS', 60))
+
+# Monte Carlo полосы прогноза: bootstrap доходностей или gbm, траекторий на символ
+MONTE_CARLO_METHOD = os.getenv('MONTE_CARLO_METHOD', 'bootstrap')
+MONTE_CARLO_PATHS = int(os.getenv('MONTE_CARLO_PATHS', 5000))
+MONTE_CARLO_LOOKBACK = int(os.getenv('MONTE_CARLO_LOOKBACK', 90))
+
+# Онлайн модель (RLS по лагам доходностей) для внутридневных прогнозов
+ONLINE_MODEL_ENABLED = os.getenv('ONLINE_MODEL_ENABLED', 'true').lower() == 'true'
+ONLINE_MODEL_INTERVALS = [
+    interval.strip() for interval in os.getenv('ONLINE_MODEL_INTERVALS', '60,15').split(',') if interval.strip()
+]
+ONLINE_MODEL_LAGS = int(os.getenv('ONLINE_MODEL_LAGS', 6))
+ONLINE_MODEL_FORGETTING = float(os.getenv('ONLINE_MODEL_FORGETTING', 0.995))
+ONLINE_MODEL_CHECKPOINT_DIR = os.getenv('ONLINE_MODEL_CHECKPOINT_DIR', 'data/online_models')
+ONLINE_MODEL_CHECKPOINT_SECONDS = int(os.getenv('ONLINE_MODEL_CHECKPOINT_SECONDS', 600))
+
+# Оценка сохранённых прогнозов по фактическим ценам после наступления горизонта
+PREDICTION_RESOLVER_ENABLED = os.getenv('PREDICTION_RESOLVER_ENABLED', 'true').lower() == 'true'
+PREDICTION_RESOLVER_INTERVAL_SECONDS = int(os.getenv('PREDICTION_RESOLVER_INTERVAL_SECONDS', 3600))
+PREDICTION_RESOLVER_BATCH_SIZE = int(os.getenv('PREDICTION_RESOLVER_BATCH_SIZE', 5000))
+# Прогнозы по символам без свечей закрываются без оценки через столько дней после цели
+PREDICTION_RESOLVER_GIVE_UP_DAYS = int(os.getenv('PREDICTION_RESOLVER_GIVE_UP_DAYS', 30))
+
+# ======================== ANALYTICS POOL ========================
+# CPU-тяжёлые расчёты (прогнозы, батч индикаторов) вне event loop: process | thread | inline
+ANALYTICS_POOL_MODE = os.getenv('ANALYTICS_POOL_MODE', 'process')
+ANALYTICS_POOL_WORKERS = int(os.getenv('ANALYTICS_POOL_WORKERS', 2))
+ANALYTICS_POOL_MAX_QUEUE = int(os.getenv('ANALYTICS_POOL_MAX_QUEUE', 32))
+ANALYTICS_TASK_TIMEOUT = float(os.getenv('ANALYTICS_TASK_TIMEOUT', 10))
+# Массивы больше порога передаются процессам через shared memory, а не pickle
+ANALYTICS_SHM_MIN_BYTES = int(os.getenv('ANALYTICS_SHM_MIN_BYTES', 65536))
+
 # ======================== CACHE ========================
 CACHE_TTL = 300  # 5 минут
+# Кэш ответов API: LRU с бюджетом по числу записей и байтам (JSON), TTL по пространству имён.
+# Бюджет считается по длине JSON; сами dict в памяти занимают в несколько раз больше
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 5000))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESPONSE_CACHE_TTLS = {
+    'search': int(os.getenv('RESPONSE_CACHE_SEARCH_TTL', CACHE_TTL)),
+    'crypto': int(os.getenv('RESPONSE_CACHE_CRYPTO_TTL', CACHE_TTL)),
+    'all_cryptos': int(os.getenv('RESPONSE_CACHE_ALL_CRYPTOS_TTL', CACHE_TTL)),
+}
 
 # ======================== POPULAR CRYPTOS (Top 6) ========================
 POPULAR_CRYPTOS = [
@@ -0,0 +1,193 @@
+import json
+import time
+import logging
+import numpy as np
+from pathlib import Path
+
+from config import BACKTEST_DIR
+from models.lstm_model import predictor, ENSEMBLE_METHODS
+from models.simulation import simulation_bands, direction_confidence
+
+logger = logging.getLogger(__name__)
+
+SCORED_METHODS = ENSEMBLE_METHODS + ('ensemble',)
+# Корзины Monte Carlo уверенности, которую отдаёт /api/predict (она ограничена диапазоном 25..95)
+CONFIDENCE_BINS = (25, 40, 50, 60, 70, 80, 95.0001)
+# Окон на одну симуляцию: траектории (окна, шаги, пути) держатся в памяти целиком
+SIMULATION_CHUNK = 200
+
+
+def walk_forward_windows(prices: np.ndarray, lookback: int, horizon: int, step: int = 1) -> tuple:
+    """Окна истории (W, lookback) и реализованные цены (W, horizon) без копирования
+
+    Окно i заканчивается на свече i * step + lookback - 1, после него идут
+    horizon свечей, с которыми сравнивается прогноз.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if len(prices) < lookback + horizon:
+        return np.empty((0, lookback)), np.empty((0, horizon))
+
+    view = np.lib.stride_tricks.sliding_window_view(prices, lookback + horizon)[::step]
+    return view[:, :lookback], view[:, lookback:]
+
+
+def window_confidence(windows: np.ndarray, ensemble: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Monte Carlo уверенность в направлении по окнам - та же, что в ответе /api/predict
+
+    Базой служит последнее закрытие окна (в API - текущая цена тикера).
+    """
+    confidence = np.empty(len(windows))
+    for start in range(0, len(windows), SIMULATION_CHUNK):
+        rows = slice(start, start + SIMULATION_CHUNK)
+        _, terminal = simulation_bands(windows[rows], ensemble[rows], seed=seed + start)
+        confidence[rows] = [direction_confidence(t, base, expected)
+                            for t, base, expected in zip(terminal, windows[rows, -1], ensemble[rows, -1])]
+    return confidence
+
+
+def forecast_windows(windows: np.ndarray, horizon: int, chunk_size: int = 20000) -> dict:
+    """Прогнозы всех методов и ensemble для матрицы окон (батчами по chunk_size строк)"""
+    parts = {name: [] for name in SCORED_METHODS}
+    parts['confidence'] = []
+
+    for start in range(0, len(windows), chunk_size):
+        chunk = windows[start:start + chunk_size]
+        ensemble, _, details = predictor.batch_ensemble_prediction(chunk, horizon)
+        for name in ENSEMBLE_METHODS:
+            parts[name].append(details[name])
+        parts['ensemble'].append(ensemble)
+        parts['confidence'].append(window_confidence(chunk, ensemble, seed=start))
+
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+
+def score_forecasts(forecasts: dict, base: np.ndarray, actual: np.ndarray) -> dict:
+    """Поэлементные ошибки по каждому методу: |ошибка|, |ошибка| в %, угадано ли направление"""
+    actual_move = np.sign(actual - base[:, np.newaxis])
+    scores = {}
+    for name in SCORED_METHODS:
+        predicted = forecasts[name]
+        abs_error = np.abs(predicted - actual)
+        scores[name] = {
+            'abs_error': abs_error,
+            'pct_error': abs_error / np.abs(actual) * 100,
+            'hit': np.sign(predicted - base[:, np.newaxis]) == actual_move,
+        }
+    return scores
+
+
+def _summary(scores: dict) -> dict:
+    """Средние по окнам для каждого горизонта 1..H"""
+    return {
+        name: {
+            'mae': metrics['abs_error'].mean(axis=0).tolist(),
+            'mape': metrics['pct_error'].mean(axis=0).tolist(),
+            'directional_accuracy': (metrics['hit'].mean(axis=0) * 100).tolist(),
+        }
+        for name, metrics in scores.items()
+    }
+
+
+def calibration(confidence: np.ndarray, hit: np.ndarray) -> dict:
+    """Сравнение заявленной уверенности с долей угаданных направлений по корзинам
+
+    ece - средневзвешенный по числу окон разрыв между уверенностью и точностью (в п.п.).
+    """
+    bins = np.digitize(confidence, CONFIDENCE_BINS[1:-1])
+    counts = np.bincount(bins, minlength=len(CONFIDENCE_BINS) - 1)
+    mean_confidence = np.bincount(bins, weights=confidence, minlength=len(counts))
+    accuracy = np.bincount(bins, weights=hit.astype(float), minlength=len(counts)) * 100
+
+    rows = []
+    gap = 0.0
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        rows.append({
+            'range': [CONFIDENCE_BINS[i], round(CONFIDENCE_BINS[i + 1])],
+            'windows': int(count),
+            'mean_confidence': float(mean_confidence[i] / count),
+            'directional_accuracy': float(accuracy[i] / count),
+        })
+        gap += abs(mean_confidence[i] - accuracy[i])
+
+    return {'bins': rows, 'ece': float(gap / max(counts.sum(), 1))}
+
+
+def run_backtest(series: dict, lookback: int = 180, horizon: int = 7, step: int = 1) -> dict:
+    """Walk-forward бэктест предсказателя по рядам закрытий {символ: цены}
+
+    Все окна символа прогнозируются одним батчем, без вызова предсказателя на
+    каждом шаге. MAE считается только по символу (цены разных монет
+    несравнимы), общие метрики - MAPE и точность направления.
+    """
+    started = time.perf_counter()
+    symbols = {}
+    totals = None
+    total_windows = 0
+    confidence_parts = []
+    hit_parts = []
+
+    for symbol, prices in series.items():
+        prices = np.asarray(prices, dtype=float)
+        prices = prices[np.isfinite(prices)]
+        windows, actual = walk_forward_windows(prices, lookback, horizon, step)
+        if not len(windows):
+            logger.warning(f"⚠️ {symbol}: мало истории для бэктеста ({len(prices)} свечей)")
+            continue
+
+        forecasts = forecast_windows(windows, horizon)
+        scores = score_forecasts(forecasts, windows[:, -1], actual)
+        symbols[symbol] = {'windows': len(windows), 'methods': _summary(scores)}
+
+        # Суммы для общих метрик по всем окнам всех символов
+        if totals is None:
+            totals = {name: {'pct_error': np.zeros(horizon), 'hit': np.zeros(horizon)} for name in scores}
+        for name, metrics in scores.items():
+            totals[name]['pct_error'] += metrics['pct_error'].sum(axis=0)
+            totals[name]['hit'] += metrics['hit'].sum(axis=0)
+        total_windows += len(windows)
+
+        # Калибровка: Monte Carlo уверенность против направления на последнем шаге горизонта
+        confidence_parts.append(forecasts['confidence'])
+        hit_parts.append(scores['ensemble']['hit'][:, -1])
+
+    overall = {
+        name: {
+            'mape': (sums['pct_error'] / total_windows).tolist(),
+            'directional_accuracy': (sums['hit'] / total_windows * 100).tolist(),
+        }
+        for name, sums in (totals or {}).items()
+    }
+
+    return {
+        'created_at': time.time(),
+        'config': {'lookback': lookback, 'horizon': horizon, 'step': step},
+        'windows': total_windows,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'overall': overall,
+        'calibration': calibration(np.concatenate(confidence_parts), np.concatenate(hit_parts))
+        if confidence_parts else {'bins': [], 'ece': None},
+        'symbols': symbols,
+    }
+
+
+def save_run(result: dict, name: str = None, directory: str = BACKTEST_DIR) -> Path:
+    """Сохранить результат бэктеста в JSON; run_id - время запуска и необязательное имя"""
+    run_id = time.strftime('%Y%m%d-%H%M%S', time.gmtime(result['created_at']))
+    if name:
+        run_id = f"{run_id}-{name}"
+
+    path = Path(directory) / f"{run_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'run_id': run_id, **result}, ensure_ascii=False, indent=1))
+    return path
+
+
+def load_run(path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def list_runs(directory: str = BACKTEST_DIR) -> list:
+    """Сохранённые запуски от старых к новым"""
+    return [load_run(path) for path in sorted(Path(directory).glob('*.json'))]
@@ -160,6 +160,41 @@ class Database:
                     )
                 """)
 
+                # Исход прогноза: заполняется фоновым resolver после наступления горизонта
+                await conn.execute("""
+                    ALTER TABLE prediction_history
+                        ADD COLUMN IF NOT EXISTS base_price DECIMAL(20, 8),
+                        ADD COLUMN IF NOT EXISTS horizon_days INT DEFAULT 7,
+                        ADD COLUMN IF NOT EXISTS target_time TIMESTAMP,
+                        ADD COLUMN IF NOT EXISTS realized_price DECIMAL(20, 8),
+                        ADD COLUMN IF NOT EXISTS error_pct DECIMAL(12, 4),
+                        ADD COLUMN IF NOT EXISTS direction_hit BOOLEAN,
+                        ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP
+                """)
+
+                await conn.execute("""
+                    UPDATE prediction_history
+                    SET target_time = timestamp + make_interval(days => COALESCE(horizon_days, 7))
+                    WHERE target_time IS NULL
+                """)
+
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_prediction_history_unresolved
+                    ON prediction_history(id) WHERE resolved_at IS NULL
+                """)
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS prediction_accuracy (
+                        symbol VARCHAR(20) PRIMARY KEY,
+                        resolved INT NOT NULL DEFAULT 0,
+                        scored_direction INT NOT NULL DEFAULT 0,
+                        direction_hits INT NOT NULL DEFAULT 0,
+                        sum_abs_error_pct DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        sum_error_pct DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
                 await conn.execute("""
                     CREATE TABLE IF NOT EXISTS email_verifications (
                         id SERIAL PRIMARY KEY,
@@ -323,14 +358,16 @@ class Database:
             return None
 
     async def save_prediction(self, user_id: int, symbol: str, predicted_price: float,
-                              confidence: float, signal: str) -> bool:
+                              confidence: float, signal: str, base_price: float = None,
+                              horizon_days: int = 7) -> bool:
         try:
             async with self.pool.acquire() as conn:
                 async with conn.transaction():
                     await conn.execute("""
-                        INSERT INTO prediction_history (user_id, symbol, predicted_price, confidence, signal)
-                        VALUES ($1, $2, $3, $4, $5)
-                    """, user_id, symbol, predicted_price, confidence, signal)
+                        INSERT INTO prediction_history
+                        (user_id, symbol, predicted_price, confidence, signal, base_price, horizon_days, target_time)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, CURRENT_TIMESTAMP + make_interval(days => $7))
+                    """, user_id, symbol, predicted_price, confidence, signal, base_price, horizon_days)
 
                     await conn.execute("""
                         UPDATE prediction_limits
@@ -357,6 +394,77 @@ class Database:
             logger.error(f"❌ Ошибка истории: {e}")
             return []
 
+    # ТОЧНОСТЬ ПРОГНОЗОВ
+    async def get_due_predictions(self, after_id: int, limit: int = 5000) -> List[Dict]:
+        """Нерешённые прогнозы, у которых горизонт прошёл и дневная свеча цели закрылась
+
+        target_ms - время цели в мс UTC (timestamp хранится без зоны, в зоне сервера БД).
+        Ошибки не глушатся: их обрабатывает и показывает в /api/health фоновый resolver.
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, symbol, predicted_price::float8 AS predicted_price,
+                       base_price::float8 AS base_price,
+                       (EXTRACT(EPOCH FROM target_time AT TIME ZONE current_setting('TimeZone')) * 1000)::bigint
+                           AS target_ms
+                FROM prediction_history
+                WHERE resolved_at IS NULL AND id > $1
+                  AND target_time <= LOCALTIMESTAMP - INTERVAL '1 day'
+                ORDER BY id
+                LIMIT $2
+            """, after_id, limit)
+            return [dict(r) for r in rows]
+
+    async def resolve_predictions(self, ids: list, realized: list, errors: list, hits: list) -> int:
+        """Записать исходы пачки прогнозов и обновить агрегаты по символам одним запросом
+
+        realized None - цену узнать нельзя (символ без свечей), прогноз закрывается без оценки.
+        Ошибки пробрасываются вызывающему, как и в get_due_predictions.
+        """
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchval("""
+                WITH outcome AS (
+                    SELECT * FROM unnest($1::int[], $2::float8[], $3::float8[], $4::bool[])
+                        AS o(id, realized_price, error_pct, direction_hit)
+                ), updated AS (
+                    UPDATE prediction_history p
+                    SET realized_price = o.realized_price,
+                        error_pct = o.error_pct,
+                        direction_hit = o.direction_hit,
+                        resolved_at = CURRENT_TIMESTAMP
+                    FROM outcome o
+                    WHERE p.id = o.id AND p.resolved_at IS NULL
+                    RETURNING p.symbol, o.realized_price, o.error_pct, o.direction_hit
+                ), upserted AS (
+                    INSERT INTO prediction_accuracy AS a
+                        (symbol, resolved, scored_direction, direction_hits, sum_abs_error_pct, sum_error_pct)
+                    SELECT symbol, COUNT(*), COUNT(direction_hit), COUNT(*) FILTER (WHERE direction_hit),
+                           SUM(ABS(error_pct)), SUM(error_pct)
+                    FROM updated
+                    WHERE realized_price IS NOT NULL
+                    GROUP BY symbol
+                    ON CONFLICT (symbol) DO UPDATE SET
+                        resolved = a.resolved + EXCLUDED.resolved,
+                        scored_direction = a.scored_direction + EXCLUDED.scored_direction,
+                        direction_hits = a.direction_hits + EXCLUDED.direction_hits,
+                        sum_abs_error_pct = a.sum_abs_error_pct + EXCLUDED.sum_abs_error_pct,
+                        sum_error_pct = a.sum_error_pct + EXCLUDED.sum_error_pct,
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM updated
+            """, ids, realized, errors, hits)
+            return result or 0
+
+    async def get_prediction_accuracy(self) -> List[Dict]:
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch("SELECT * FROM prediction_accuracy ORDER BY symbol")
+                return [dict(r) for r in rows]
+        except Exception as e:
+            logger.error(f"❌ Ошибка точности: {e}")
+            return []
+
     # ПОДПИСКИ
     async def get_user_subscription(self, user_id: int) -> Optional[Dict]:
         try:
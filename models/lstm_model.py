@@ -1,174 +1,203 @@
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+ENSEMBLE_METHODS = ('polynomial', 'exponential', 'moving_average', 'linear')
+ENSEMBLE_WEIGHTS = np.array([0.35, 0.25, 0.25, 0.15])
+FEATURE_RANGE = (0.1, 0.9)
+
+
+def minmax_scale(prices: np.ndarray) -> tuple:
+    """Min/max нормализация в FEATURE_RANGE по последней оси: (значения, параметры (low, scale))
+
+    Постоянный ряд масштабируется с единичным диапазоном, как в MinMaxScaler.
+    """
+    low = prices.min(axis=-1, keepdims=True)
+    data_range = prices.max(axis=-1, keepdims=True) - low
+    data_range = np.where(data_range == 0, 1.0, data_range)
+    scale = (FEATURE_RANGE[1] - FEATURE_RANGE[0]) / data_range
+    return FEATURE_RANGE[0] + (prices - low) * scale, (low, scale)
+
+
+def minmax_inverse(values: np.ndarray, params: tuple) -> np.ndarray:
+    """Обратное преобразование minmax_scale"""
+    low, scale = params
+    return (values - FEATURE_RANGE[0]) / scale + low
+
+
+@lru_cache(maxsize=32)
+def _vandermonde_solvers(length: int, degree: int, future_steps: int) -> tuple:
+    """Псевдообратная матрица Вандермонда (общая для всех рядов длины length) и матрица будущих x
+
+    Столбцы масштабируются, как в np.polyfit, чтобы x^3 не портил обусловленность.
+    """
+    x = np.arange(length, dtype=float)
+    vander = np.vander(x, degree + 1)
+    scale = np.sqrt((vander * vander).sum(axis=0))
+    solver = np.linalg.pinv(vander / scale) / scale[:, np.newaxis]
+    future = np.vander(np.arange(length, length + future_steps, dtype=float), degree + 1)
+    return solver, future
+
+
+@lru_cache(maxsize=32)
+def _holt_weights(length: int, alpha: float, beta: float) -> np.ndarray:
+    """Матрица M (length, 2): [уровень, тренд] после сглаживания ряда x равны x @ M
+
+    Сглаживание Холта линейно: z_i = A z_(i-1) + B x_i, z_0 = (x_0, x_1 - x_0),
+    поэтому итоговое состояние - взвешенная сумма цен с весами A^k B.
+    """
+    a = np.array([[1 - alpha, 1 - alpha], [-alpha * beta, 1 - alpha * beta]])
+    b = np.array([alpha, alpha * beta])
+
+    weights = np.zeros((length, 2))
+    power = np.eye(2)  # A^(length - 1 - i) при обходе с конца
+    for i in range(length - 1, 0, -1):
+        weights[i] = power @ b
+        power = power @ a
+
+    # Вклад начального состояния через A^(length - 1)
+    weights[0] += power[:, 0] - power[:, 1]
+    weights[1] += power[:, 1]
+    return weights
+
 
 class AdvancedPricePredictor:
     """Продвинутый предсказатель цен с ensemble методами"""
 
     def __init__(self, sequence_length: int = 60):
+        # Предсказатель без изменяемого состояния: параметры нормализации
+        # возвращаются из prepare_data и передаются в denormalize явно,
+        # поэтому один экземпляр безопасен в пуле потоков
         self.sequence_length = sequence_length
-        self.scaler = MinMaxScaler(feature_range=(0.1, 0.9))
 
-    def prepare_data(self, prices: np.ndarray) -> np.ndarray:
-        """Подготовка и нормализация данных"""
+    def prepare_data(self, prices: np.ndarray) -> tuple:
+        """Подготовка и нормализация данных: (нормализованный ряд, параметры нормализации)"""
         prices = np.array(prices, dtype=float)
-
-        if np.any(np.isnan(prices)) or np.any(np.isinf(prices)):
-            prices = prices[~np.isnan(prices)]
-            prices = prices[~np.isinf(prices)]
+        prices = prices[np.isfinite(prices)]
 
         if len(prices) == 0:
             raise ValueError("Нет валидных данных")
 
-        prices_normalized = self.scaler.fit_transform(prices.reshape(-1, 1)).flatten()
-        return prices_normalized
+        return minmax_scale(prices)
 
-    def denormalize(self, values: np.ndarray) -> np.ndarray:
+    def denormalize(self, values: np.ndarray, params: tuple) -> np.ndarray:
         """Денормализация данных"""
-        return self.scaler.inverse_transform(values.reshape(-1, 1)).flatten()
+        return minmax_inverse(np.asarray(values, dtype=float), params)
 
-    def polynomial_prediction(self, prices: np.ndarray, future_steps: int = 7, degree: int = 3) -> np.ndarray:
-        """Полиномиальная регрессия"""
+    def ensemble_prediction(self, prices: np.ndarray, future_steps: int = 7) -> tuple:
+        """Ensemble прогноз - комбинирует все методы"""
         try:
-            x = np.arange(len(prices))
-            y = prices
-
-            coeffs = np.polyfit(x, y, degree)
-            poly = np.poly1d(coeffs)
-
-            future_x = np.arange(len(prices), len(prices) + future_steps)
-            predictions = poly(future_x)
+            if len(prices) < 10:
+                logger.warning("Недостаточно данных")
+                return np.array([prices[-1]] * future_steps), 30.0, {}
 
-            min_val = np.min(prices)
-            max_val = np.max(prices)
-            margin = (max_val - min_val) * 0.15
-            predictions = np.clip(predictions, min_val - margin, max_val + margin)
+            prices = np.array(prices, dtype=float)
+            valid = prices[np.isfinite(prices)]
+            if len(valid) < 10:
+                raise ValueError("Нет валидных данных")
 
-            return predictions
-        except Exception as e:
-            logger.warning(f"Ошибка полинома: {e}")
-            return np.array([prices[-1]] * future_steps)
+            predictions, confidence, details = self.batch_ensemble_prediction(valid[np.newaxis, :], future_steps)
 
-    def exponential_smoothing(self, prices: np.ndarray, future_steps: int = 7, alpha: float = 0.3) -> np.ndarray:
-        """Экспоненциальное сглаживание"""
-        try:
-            s = prices[0]
-            trend = prices[1] - prices[0]
-            predictions = []
+            # Для уверенности, как и раньше, берём среднюю цену исходного ряда
+            confidence = float(np.clip(100 - details['std_agreement'][0] / np.mean(np.abs(prices)) * 500, 40, 90))
 
-            for i in range(1, len(prices)):
-                s_new = alpha * prices[i] + (1 - alpha) * (s + trend)
-                trend = 0.2 * (s_new - s) + 0.8 * trend
-                s = s_new
+            method_details = {name: details[name][0].tolist() for name in ENSEMBLE_METHODS}
+            method_details['std_agreement'] = float(details['std_agreement'][0])
+            method_details['weights'] = ENSEMBLE_WEIGHTS.tolist()
 
-            for i in range(future_steps):
-                s = s + trend
-                trend = trend * 0.95
-                predictions.append(s)
+            return predictions[0], confidence, method_details
 
-            return np.array(predictions)
         except Exception as e:
-            logger.warning(f"Ошибка экспоненциального сглаживания: {e}")
-            return np.array([prices[-1]] * future_steps)
-
-    def moving_average_prediction(self, prices: np.ndarray, future_steps: int = 7) -> np.ndarray:
-        """Прогноз на основе скользящих средних"""
-        try:
-            ma_short = np.mean(prices[-7:]) if len(prices) >= 7 else np.mean(prices)
-            ma_medium = np.mean(prices[-14:]) if len(prices) >= 14 else np.mean(prices)
-            ma_long = np.mean(prices[-30:]) if len(prices) >= 30 else np.mean(prices)
-
-            weighted_ma = (ma_short * 0.5 + ma_medium * 0.3 + ma_long * 0.2)
-            recent_trend = (prices[-1] - prices[-7]) / max(abs(prices[-7]), 0.001) if len(prices) >= 7 else 0
-
-            predictions = []
-            current = weighted_ma
-
-            for i in range(future_steps):
-                decay = 0.95 ** (i + 1)
-                pred = current + (recent_trend * decay)
-                predictions.append(pred)
+            logger.error(f"Ошибка ensemble: {e}")
+            return np.array([prices[-1]] * future_steps), 30.0, {}
 
-            return np.array(predictions)
-        except Exception as e:
-            logger.warning(f"Ошибка MA: {e}")
-            return np.array([prices[-1]] * future_steps)
+    def batch_ensemble_prediction(self, prices: np.ndarray, future_steps: int = 7) -> tuple:
+        """Ensemble прогноз сразу для N рядов: prices (N, T) -> (прогнозы (N, steps), уверенность (N,), детали)
+
+        Ряды должны быть одной длины (T >= 10) без пропусков. Полином и линейная
+        регрессия решаются одной псевдообратной матрицей Вандермонда на все ряды,
+        сглаживание идёт по времени векторно по всем рядам сразу.
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        n, length = prices.shape
+        if length < 10:
+            raise ValueError("Недостаточно данных")
+        if not np.isfinite(prices).all():
+            raise ValueError("Нет валидных данных")
 
-    def linear_regression_trend(self, prices: np.ndarray, future_steps: int = 7) -> np.ndarray:
-        """Линейная регрессия с корректировкой"""
-        try:
-            x = np.arange(len(prices))
-            y = prices
+        # Нормализация в FEATURE_RANGE по каждому ряду
+        norm, scaling = minmax_scale(prices)
 
-            coeffs = np.polyfit(x, y, 1)
-            slope = coeffs[0]
-            intercept = coeffs[1]
+        forecasts = np.stack([
+            self._batch_polynomial(norm, future_steps),
+            self._batch_exponential_smoothing(norm, future_steps),
+            self._batch_moving_average(norm, future_steps),
+            self._batch_linear(norm, future_steps),
+        ])
+        forecasts = minmax_inverse(forecasts, scaling)
 
-            residuals = y - (slope * x + intercept)
-            volatility = np.std(residuals) / np.mean(np.abs(y))
+        ensemble = np.tensordot(ENSEMBLE_WEIGHTS, forecasts, axes=1)
+        std_agreement = forecasts.std(axis=0).mean(axis=1)
+        confidence = np.clip(100 - std_agreement / np.abs(prices).mean(axis=1) * 500, 40, 90)
 
-            if volatility > 0.05:
-                slope = slope * (1 - volatility)
+        details = dict(zip(ENSEMBLE_METHODS, forecasts))
+        details['std_agreement'] = std_agreement
+        details['weights'] = ENSEMBLE_WEIGHTS
+        return ensemble, confidence, details
 
-            future_x = np.arange(len(prices), len(prices) + future_steps)
-            predictions = slope * future_x + intercept
+    @staticmethod
+    def _batch_polynomial(norm: np.ndarray, future_steps: int, degree: int = 3) -> np.ndarray:
+        solver, future = _vandermonde_solvers(norm.shape[1], degree, future_steps)
+        predictions = (norm @ solver.T) @ future.T
 
-            return predictions
-        except Exception as e:
-            logger.warning(f"Ошибка линейной регрессии: {e}")
-            return np.array([prices[-1]] * future_steps)
+        low = norm.min(axis=1, keepdims=True)
+        high = norm.max(axis=1, keepdims=True)
+        margin = (high - low) * 0.15
+        return np.clip(predictions, low - margin, high + margin)
 
-    def ensemble_prediction(self, prices: np.ndarray, future_steps: int = 7) -> tuple:
-        """Ensemble прогноз - комбинирует все методы"""
-        try:
-            if len(prices) < 10:
-                logger.warning("Недостаточно данных")
-                return np.array([prices[-1]] * future_steps), 30.0, {}
+    @staticmethod
+    def _batch_linear(norm: np.ndarray, future_steps: int) -> np.ndarray:
+        length = norm.shape[1]
+        solver, future = _vandermonde_solvers(length, 1, future_steps)
+        coeffs = norm @ solver.T
+        slope, intercept = coeffs[:, :1], coeffs[:, 1:]
 
-            prices_norm = self.prepare_data(prices)
+        residuals = norm - (slope * np.arange(length) + intercept)
+        volatility = residuals.std(axis=1, keepdims=True) / np.abs(norm).mean(axis=1, keepdims=True)
+        slope = np.where(volatility > 0.05, slope * (1 - volatility), slope)
 
-            poly_pred = self.polynomial_prediction(prices_norm, future_steps, degree=3)
-            exp_pred = self.exponential_smoothing(prices_norm, future_steps)
-            ma_pred = self.moving_average_prediction(prices_norm, future_steps)
-            linear_pred = self.linear_regression_trend(prices_norm, future_steps)
+        return slope * future[:, 0] + intercept
 
-            poly_denorm = self.denormalize(poly_pred)
-            exp_denorm = self.denormalize(exp_pred)
-            ma_denorm = self.denormalize(ma_pred)
-            linear_denorm = self.denormalize(linear_pred)
+    @staticmethod
+    def _batch_exponential_smoothing(norm: np.ndarray, future_steps: int, alpha: float = 0.3) -> np.ndarray:
+        level, trend = (norm @ _holt_weights(norm.shape[1], alpha, 0.2)).T
 
-            weights = np.array([0.35, 0.25, 0.25, 0.15])
+        # s_k = s + trend * (1 + 0.95 + ... + 0.95^(k-1))
+        damping = np.cumsum(0.95 ** np.arange(future_steps))
+        return level[:, np.newaxis] + trend[:, np.newaxis] * damping
 
-            ensemble_pred = (
-                    poly_denorm * weights[0] +
-                    exp_denorm * weights[1] +
-                    ma_denorm * weights[2] +
-                    linear_denorm * weights[3]
-            )
+    @staticmethod
+    def _batch_moving_average(norm: np.ndarray, future_steps: int) -> np.ndarray:
+        weighted_ma = (norm[:, -7:].mean(axis=1) * 0.5 +
+                       norm[:, -14:].mean(axis=1) * 0.3 +
+                       norm[:, -30:].mean(axis=1) * 0.2)
+        recent_trend = (norm[:, -1] - norm[:, -7]) / np.maximum(np.abs(norm[:, -7]), 0.001)
 
-            predictions_all = np.array([poly_denorm, exp_denorm, ma_denorm, linear_denorm])
-            std_agreement = np.std(predictions_all, axis=0).mean()
+        decay = 0.95 ** np.arange(1, future_steps + 1)
+        return weighted_ma[:, np.newaxis] + recent_trend[:, np.newaxis] * decay
 
-            confidence = max(40, 100 - (std_agreement / np.mean(np.abs(prices)) * 500))
-            confidence = min(90, confidence)
 
-            method_details = {
-                'polynomial': poly_denorm.tolist(),
-                'exponential': exp_denorm.tolist(),
-                'moving_average': ma_denorm.tolist(),
-                'linear': linear_denorm.tolist(),
-                'std_agreement': float(std_agreement),
-                'weights': weights.tolist()
-            }
+predictor = AdvancedPricePredictor()
 
-            return ensemble_pred, confidence, method_details
 
-        except Exception as e:
-            logger.error(f"Ошибка ensemble: {e}")
-            return np.array([prices[-1]] * future_steps), 30.0, {}
+def ensemble_forecast(prices: np.ndarray, future_steps: int = 7) -> tuple:
+    """ensemble_prediction модульного предсказателя (для пула процессов)"""
+    return predictor.ensemble_prediction(prices, future_steps)
 
 
-predictor = AdvancedPricePredictor()
\ No newline at end of file
+def batch_ensemble_forecast(prices: np.ndarray, future_steps: int = 7) -> tuple:
+    """(прогнозы, уверенность) batch_ensemble_prediction для пула процессов"""
+    predictions, confidence, _ = predictor.batch_ensemble_prediction(prices, future_steps)
+    return predictions, confidence
@@ -0,0 +1,185 @@
+import os
+import logging
+import numpy as np
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Доходности храним в процентах: так P в RLS остаётся хорошо обусловленной
+RETURN_SCALE = 100.0
+Z_90 = 1.6449  # 5% и 95% квантили нормального распределения
+
+
+class OnlineRLS:
+    """Рекурсивные наименьшие квадраты по лагам лог-доходностей одного ряда
+
+    r_t = theta . [1, r_(t-1), ..., r_(t-lags)] + e_t. Каждая закрытая свеча
+    обновляет theta и ковариацию P за O(lags^2) без перерасчёта истории;
+    forgetting < 1 постепенно забывает старые свечи. Дисперсия ошибки
+    ведётся экспоненциально (не медленнее 0.99) и задаёт ширину полосы.
+    Если известен interval_ms, пропуск свечей (рестарт со старой контрольной
+    точки, разрыв в хранилище) сбрасывает лаги: доходность через разрыв не
+    подаётся как одношаговая.
+    """
+
+    def __init__(self, lags: int = 6, forgetting: float = 0.995, delta: float = 100.0, interval_ms: int = None):
+        self.lags = lags
+        self.forgetting = forgetting
+        self.delta = delta
+        self.interval_ms = interval_ms
+        self.theta = np.zeros(lags + 1)
+        self.P = np.eye(lags + 1) * delta
+        self.recent = np.zeros(lags)  # последние доходности, новые сначала
+        self.last_close = None
+        self.last_timestamp = None
+        self.updates = 0
+        self.residual_var = 0.0
+
+    def update(self, timestamp: int, close: float):
+        """Учесть закрытую свечу"""
+        if close <= 0 or not np.isfinite(close):
+            return
+        if self.last_close is None:
+            self.last_close, self.last_timestamp = close, timestamp
+            return
+        if self.interval_ms and timestamp != self.last_timestamp + self.interval_ms:
+            # Ряд не непрерывен - лаги начинаются заново с этой свечи, theta и P сохраняются
+            self.recent = np.zeros(self.lags)
+            self.updates = 0
+            self.last_close, self.last_timestamp = close, timestamp
+            return
+
+        r = np.log(close / self.last_close) * RETURN_SCALE
+        self.last_close, self.last_timestamp = close, timestamp
+
+        if self.updates >= self.lags:
+            x = np.concatenate(([1.0], self.recent))
+            error = r - self.theta @ x
+            px = self.P @ x
+            gain = px / (self.forgetting + x @ px)
+            self.theta += gain * error
+            self.P = (self.P - np.outer(gain, px)) / self.forgetting
+
+            # Без новой информации P растёт как 1/forgetting^n - ограничиваем
+            if np.trace(self.P) > 1e6 * self.delta:
+                self.P = np.eye(self.lags + 1) * self.delta
+
+            decay = min(self.forgetting, 0.99)
+            self.residual_var = decay * self.residual_var + (1 - decay) * error * error
+
+        self.recent = np.roll(self.recent, 1)
+        self.recent[0] = r
+        self.updates += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.updates > 2 * (self.lags + 1)
+
+    def forecast(self, steps: int) -> dict:
+        """Прогноз цен закрытия следующих steps свечей без дообучения
+
+        Доходности прогнозируются рекурсивно (прогноз подставляется в лаги),
+        полоса p5/p95 - накопленная дисперсия ошибки в лог-пространстве.
+        """
+        x = np.concatenate(([1.0], self.recent))
+        returns = np.empty(steps)
+        for i in range(steps):
+            returns[i] = self.theta @ x
+            x[2:] = x[1:-1].copy()
+            x[1] = returns[i]
+
+        log_path = np.cumsum(returns) / RETURN_SCALE
+        spread = Z_90 * np.sqrt(self.residual_var * np.arange(1, steps + 1)) / RETURN_SCALE
+        return {
+            'predictions': self.last_close * np.exp(log_path),
+            'lower': self.last_close * np.exp(log_path - spread),
+            'upper': self.last_close * np.exp(log_path + spread),
+        }
+
+
+class OnlineModelRegistry:
+    """Модели OnlineRLS по (символ, интервал) с сохранением состояния на диск
+
+    Контрольная точка - один .npz на интервал: состояния всех символов
+    упакованы в массивы, запись атомарная (временный файл + replace).
+    """
+
+    WARMUP_CANDLES = 1000
+
+    def __init__(self, lags: int = 6, forgetting: float = 0.995):
+        self.lags = lags
+        self.forgetting = forgetting
+        self._models = {}
+
+    def __len__(self):
+        return len(self._models)
+
+    def get(self, symbol: str, interval: str):
+        return self._models.get((symbol, interval))
+
+    def symbols(self, interval: str) -> list:
+        return [symbol for symbol, model_interval in self._models if model_interval == interval]
+
+    def sync(self, symbol: str, interval: str, closed_candles, interval_ms: int = None) -> OnlineRLS:
+        """Догнать модель по закрытым свечам; обрабатываются только свечи новее последней"""
+        key = (symbol, interval)
+        model = self._models.get(key)
+        if model is None:
+            model = OnlineRLS(self.lags, self.forgetting)
+            self._models[key] = model
+            closed_candles = closed_candles[-self.WARMUP_CANDLES:]
+        if interval_ms is not None:
+            model.interval_ms = interval_ms
+
+        if model.last_timestamp is not None:
+            closed_candles = closed_candles[closed_candles['timestamp'] > model.last_timestamp]
+
+        for timestamp, close in zip(closed_candles['timestamp'].tolist(), closed_candles['close'].tolist()):
+            model.update(timestamp, close)
+        return model
+
+    def save(self, directory, interval: str) -> int:
+        items = [(symbol, model) for (symbol, model_interval), model in self._models.items()
+                 if model_interval == interval and model.last_close is not None]
+        if not items:
+            return 0
+
+        path = Path(directory) / f"rls_{interval}.npz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez(
+            tmp_path,
+            symbols=np.array([symbol for symbol, _ in items], dtype=str),
+            params=np.array([self.lags, self.forgetting]),
+            theta=np.array([model.theta for _, model in items]),
+            P=np.array([model.P for _, model in items]),
+            recent=np.array([model.recent for _, model in items]),
+            last_close=np.array([model.last_close for _, model in items]),
+            last_timestamp=np.array([model.last_timestamp for _, model in items], dtype=np.int64),
+            updates=np.array([model.updates for _, model in items], dtype=np.int64),
+            residual_var=np.array([model.residual_var for _, model in items]),
+        )
+        os.replace(tmp_path, path)
+        return len(items)
+
+    def load(self, directory, interval: str) -> int:
+        path = Path(directory) / f"rls_{interval}.npz"
+        if not path.exists():
+            return 0
+
+        with np.load(path) as data:
+            if int(data['params'][0]) != self.lags or float(data['params'][1]) != self.forgetting:
+                logger.warning(f"⚠️ Контрольная точка {path.name} с другими параметрами модели - пропускаем")
+                return 0
+
+            for i, symbol in enumerate(data['symbols'].tolist()):
+                model = OnlineRLS(self.lags, self.forgetting)
+                model.theta = data['theta'][i].copy()
+                model.P = data['P'][i].copy()
+                model.recent = data['recent'][i].copy()
+                model.last_close = float(data['last_close'][i])
+                model.last_timestamp = int(data['last_timestamp'][i])
+                model.updates = int(data['updates'][i])
+                model.residual_var = float(data['residual_var'][i])
+                self._models[(symbol, interval)] = model
+            return len(data['symbols'])
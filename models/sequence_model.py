@@ -0,0 +1,242 @@
+import os
+import json
+import threading
+import logging
+import numpy as np
+from pathlib import Path
+
+from config import MODEL_REGISTRY_DIR
+
+logger = logging.getLogger(__name__)
+
+# Порядок и форма параметров GRU во flat файле весов
+GRU_PARAMS = ('W', 'U_zr', 'U_n', 'b', 'W_out', 'b_out')
+
+
+def gru_shapes(inputs: int, hidden: int, outputs: int) -> dict:
+    return {
+        'W': (inputs, 3 * hidden),      # вход -> [z, r, n]
+        'U_zr': (hidden, 2 * hidden),   # скрытое состояние -> [z, r]
+        'U_n': (hidden, hidden),        # (r * h) -> n
+        'b': (3 * hidden,),
+        'W_out': (hidden, outputs),
+        'b_out': (outputs,),
+    }
+
+
+def window_features(prices: np.ndarray, lookback: int) -> tuple:
+    """Вход модели из закрытий (N, >= lookback + 1): доходности (N, lookback, 1) и их масштаб (N, 1)
+
+    Лог-доходности окна делятся на их std, поэтому одна модель обслуживает
+    монеты с разной ценой и волатильностью.
+    """
+    returns = np.diff(np.log(prices[:, -lookback - 1:]), axis=1)
+    scale = returns.std(axis=1, keepdims=True)
+    scale = np.where(scale > 0, scale, 1e-6)
+    return (returns / scale)[:, :, np.newaxis], scale
+
+
+def _sigmoid(x: np.ndarray, out: np.ndarray) -> np.ndarray:
+    np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1
+    return np.reciprocal(out, out=out)
+
+
+class GRUForecaster:
+    """Прямой проход GRU на NumPy по весам из memmap
+
+    Веса - представления (views) одного memmap файла, без копирования. Буферы
+    под батч заданного размера выделяются один раз и переиспользуются;
+    проход защищён блокировкой, так как буферы общие.
+    """
+
+    def __init__(self, manifest: dict, weights: np.ndarray):
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.lookback = manifest['lookback']
+        self.horizon = manifest['horizon']
+        self.hidden = manifest['hidden']
+        self.params = {}
+        for name in GRU_PARAMS:
+            offset, shape = manifest['layout'][name]
+            size = int(np.prod(shape))
+            self.params[name] = weights[offset:offset + size].reshape(shape)
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _buffers_for(self, n: int) -> dict:
+        buffers = self._buffers.get(n)
+        if buffers is None:
+            h = self.hidden
+            dtype = self.params['W'].dtype
+            buffers = {
+                'xw': np.empty((self.lookback, n, 3 * h), dtype=dtype),
+                'h': np.empty((n, h), dtype=dtype),
+                'hu': np.empty((n, 2 * h), dtype=dtype),
+                'zr': np.empty((n, 2 * h), dtype=dtype),
+                'rh': np.empty((n, h), dtype=dtype),
+                'cand': np.empty((n, h), dtype=dtype),
+                'tmp': np.empty((n, 2 * h), dtype=dtype),
+            }
+            self._buffers = {n: buffers}  # держим буферы только последнего размера батча
+        return buffers
+
+    def forward(self, features: np.ndarray) -> np.ndarray:
+        """features (N, lookback, 1) -> нормированные накопленные доходности (N, horizon)"""
+        p = self.params
+        h_size = self.hidden
+        n = features.shape[0]
+
+        with self._lock:
+            buf = self._buffers_for(n)
+            xw, h, hu, zr, rh, cand, tmp = (buf[k] for k in ('xw', 'h', 'hu', 'zr', 'rh', 'cand', 'tmp'))
+
+            # Входные проекции всех шагов - одно матричное умножение
+            np.matmul(features.transpose(1, 0, 2).astype(xw.dtype, copy=False), p['W'], out=xw)
+            xw += p['b']
+            h.fill(0)
+
+            for t in range(self.lookback):
+                np.matmul(h, p['U_zr'], out=hu)
+                np.add(xw[t, :, :2 * h_size], hu, out=zr)
+                _sigmoid(zr, tmp)
+                z, r = tmp[:, :h_size], tmp[:, h_size:]
+
+                np.multiply(r, h, out=rh)
+                np.matmul(rh, p['U_n'], out=cand)
+                cand += xw[t, :, 2 * h_size:]
+                np.tanh(cand, out=cand)
+
+                # h = (1 - z) * n + z * h = n + z * (h - n)
+                h -= cand
+                h *= z
+                h += cand
+
+            return h @ p['W_out'] + p['b_out']
+
+    def predict(self, prices: np.ndarray) -> np.ndarray:
+        """Закрытия (N, T >= lookback + 1) -> прогноз цен (N, horizon)"""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        features, scale = window_features(prices, self.lookback)
+        cumulative = self.forward(features).astype(float) * scale
+        return prices[:, -1:] * np.exp(cumulative)
+
+
+class ModelRegistry:
+    """Версии обученных моделей по группам символов на диске
+
+    <base>/registry.json: {"groups": {группа: {"active": версия, "symbols": [...],
+    "versions": {версия: сводка}}}}; <base>/<группа>/<версия>/ - manifest.json
+    и weights.npy. Символ без своей группы обслуживает группа default.
+    Модели загружаются лениво (memmap) и кэшируются до смены активной версии.
+    """
+
+    def __init__(self, base_dir: str = MODEL_REGISTRY_DIR):
+        self.base_dir = Path(base_dir)
+        self._registry = None
+        self._mtime = None
+        self._models = {}
+
+    def _index(self) -> dict:
+        path = self.base_dir / 'registry.json'
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return {'groups': {}}
+        if mtime != self._mtime:
+            self._registry = json.loads(path.read_text())
+            self._mtime = mtime
+        return self._registry
+
+    def groups(self) -> dict:
+        return self._index()['groups']
+
+    def group_for(self, symbol: str):
+        groups = self.groups()
+        for name, group in groups.items():
+            if symbol in group.get('symbols', ()):
+                return name
+        return 'default' if 'default' in groups else None
+
+    def register(self, group: str, version: str, summary: dict, symbols: list, activate: bool = True):
+        index = self._index()
+        entry = index['groups'].setdefault(group, {'active': None, 'symbols': [], 'versions': {}})
+        entry['versions'][version] = summary
+        if group != 'default':
+            entry['symbols'] = sorted(symbols)
+        if activate:
+            entry['active'] = version
+
+        path = self.base_dir / 'registry.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(index, ensure_ascii=False, indent=1))
+        os.replace(tmp_path, path)
+
+    def save_version(self, group: str, version: str, manifest: dict, params: dict) -> Path:
+        """Записать веса одним flat .npy (float32) и manifest со смещениями"""
+        directory = self.base_dir / group / version
+        directory.mkdir(parents=True, exist_ok=True)
+
+        layout = {}
+        offset = 0
+        for name in GRU_PARAMS:
+            layout[name] = (offset, list(params[name].shape))
+            offset += params[name].size
+        flat = np.concatenate([params[name].ravel() for name in GRU_PARAMS]).astype(np.float32)
+
+        np.save(directory / 'weights.npy', flat)
+        (directory / 'manifest.json').write_text(json.dumps({**manifest, 'version': version, 'group': group,
+                                                             'layout': layout}, indent=1))
+        return directory
+
+    def load(self, group: str, version: str = None):
+        version = version or self._index()['groups'].get(group, {}).get('active')
+        if version is None:
+            return None
+
+        key = (group, version)
+        model = self._models.get(key)
+        if model is None:
+            directory = self.base_dir / group / version
+            manifest = json.loads((directory / 'manifest.json').read_text())
+            weights = np.load(directory / 'weights.npy', mmap_mode='r')
+            model = GRUForecaster(manifest, weights)
+            self._models = {k: v for k, v in self._models.items() if k[0] != group}
+            self._models[key] = model
+            logger.info(f"✅ Модель {group}/{version} загружена")
+        return model
+
+
+model_registry = ModelRegistry()
+
+
+def sequence_forecast(symbols: list, prices: np.ndarray, interval: str = 'D') -> tuple:
+    """Прогноз GRU для рядов одной длины (N, T) (для пула процессов)
+
+    Символы одной группы считаются одним батчем. Модель, обученная на другом
+    интервале свечей, не используется. Возвращает (прогнозы (N, horizon)
+    или строки NaN для символов без модели, версии моделей).
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    groups = {}
+    for i, symbol in enumerate(symbols):
+        groups.setdefault(model_registry.group_for(symbol), []).append(i)
+
+    results = {}
+    versions = [None] * len(symbols)
+    for group, rows in groups.items():
+        model = model_registry.load(group) if group is not None else None
+        if model is None or model.manifest.get('interval') != interval or prices.shape[1] < model.lookback + 1:
+            continue
+        predictions = model.predict(prices[rows])
+        for j, i in enumerate(rows):
+            results[i] = predictions[j]
+            versions[i] = f"{group}/{model.version}"
+
+    horizon = max((len(v) for v in results.values()), default=0)
+    output = np.full((len(symbols), horizon), np.nan)
+    for i, values in results.items():
+        output[i, :len(values)] = values
+    return output, versions
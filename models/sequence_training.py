@@ -0,0 +1,154 @@
+import time
+import logging
+import numpy as np
+
+from models.backtest import walk_forward_windows
+from models.sequence_model import GRU_PARAMS, gru_shapes, window_features
+
+logger = logging.getLogger(__name__)
+
+
+def build_dataset(series: dict, lookback: int, horizon: int, step: int = 1) -> tuple:
+    """Обучающие пары из рядов закрытий {символ: цены}
+
+    X (M, lookback, 1) - нормированные доходности окна, Y (M, horizon) -
+    накопленные лог-доходности следующих horizon свечей в том же масштабе.
+    Третий массив - маска валидации: последние 20% окон каждого символа по времени.
+    """
+    features, targets, is_tail = [], [], []
+    for prices in series.values():
+        prices = np.asarray(prices, dtype=float)
+        prices = prices[np.isfinite(prices) & (prices > 0)]
+        windows, actual = walk_forward_windows(prices, lookback + 1, horizon, step)
+        if not len(windows):
+            continue
+
+        x, scale = window_features(windows, lookback)
+        features.append(x)
+        targets.append(np.log(actual / windows[:, -1:]) / scale)
+        tail = np.zeros(len(windows), dtype=bool)
+        tail[int(len(windows) * 0.8):] = True
+        is_tail.append(tail)
+
+    if not features:
+        raise ValueError("Недостаточно истории для обучения")
+    return np.concatenate(features), np.concatenate(targets), np.concatenate(is_tail)
+
+
+class GRUTrainer:
+    """Обучение GRU (та же архитектура, что в GRUForecaster) на NumPy: BPTT + Adam"""
+
+    def __init__(self, lookback: int = 60, horizon: int = 7, hidden: int = 32, seed: int = 0):
+        self.lookback = lookback
+        self.horizon = horizon
+        self.hidden = hidden
+        rng = np.random.default_rng(seed)
+        self.params = {}
+        for name, shape in gru_shapes(1, hidden, horizon).items():
+            if name.startswith('b'):
+                self.params[name] = np.zeros(shape)
+            else:
+                self.params[name] = rng.normal(0, 1 / np.sqrt(shape[0]), shape)
+
+    def forward(self, x: np.ndarray) -> tuple:
+        """x (N, T, 1) -> (выход (N, horizon), промежуточные значения для backward)"""
+        p = self.params
+        h_size = self.hidden
+        n, steps, _ = x.shape
+        xw = np.einsum('ntd,dk->tnk', x, p['W']) + p['b']
+
+        hs = np.zeros((steps + 1, n, h_size))
+        zs = np.empty((steps, n, h_size))
+        rs = np.empty((steps, n, h_size))
+        ns = np.empty((steps, n, h_size))
+        for t in range(steps):
+            zr = 1 / (1 + np.exp(-(xw[t, :, :2 * h_size] + hs[t] @ p['U_zr'])))
+            zs[t], rs[t] = zr[:, :h_size], zr[:, h_size:]
+            ns[t] = np.tanh(xw[t, :, 2 * h_size:] + (rs[t] * hs[t]) @ p['U_n'])
+            hs[t + 1] = (1 - zs[t]) * ns[t] + zs[t] * hs[t]
+
+        return hs[-1] @ p['W_out'] + p['b_out'], (x, hs, zs, rs, ns)
+
+    def backward(self, d_out: np.ndarray, cache: tuple) -> dict:
+        p = self.params
+        h_size = self.hidden
+        x, hs, zs, rs, ns = cache
+        grads = {name: np.zeros_like(value) for name, value in p.items()}
+
+        grads['W_out'] = hs[-1].T @ d_out
+        grads['b_out'] = d_out.sum(axis=0)
+        dh = d_out @ p['W_out'].T
+
+        for t in range(len(zs) - 1, -1, -1):
+            h_prev, z, r, n = hs[t], zs[t], rs[t], ns[t]
+            dn_pre = dh * (1 - z) * (1 - n * n)
+            dz_pre = dh * (h_prev - n) * z * (1 - z)
+            d_rh = dn_pre @ p['U_n'].T
+            dr_pre = d_rh * h_prev * r * (1 - r)
+            d_zr = np.concatenate([dz_pre, dr_pre], axis=1)
+
+            grads['U_n'] += (r * h_prev).T @ dn_pre
+            grads['U_zr'] += h_prev.T @ d_zr
+            d_gates = np.concatenate([d_zr, dn_pre], axis=1)
+            grads['W'] += x[:, t].T @ d_gates
+            grads['b'] += d_gates.sum(axis=0)
+
+            dh = dh * z + d_rh * r + d_zr @ p['U_zr'].T
+
+        return grads
+
+    def loss(self, x: np.ndarray, y: np.ndarray) -> float:
+        return float(np.mean((self.forward(x)[0] - y) ** 2))
+
+    def fit(self, x: np.ndarray, y: np.ndarray, epochs: int = 20, batch_size: int = 256,
+            learning_rate: float = 1e-3, clip: float = 5.0, validation: tuple = None, seed: int = 0) -> list:
+        """Mini-batch Adam по MSE; возвращает историю (эпоха, train, val)"""
+        rng = np.random.default_rng(seed)
+        moments = {name: (np.zeros_like(v), np.zeros_like(v)) for name, v in self.params.items()}
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+        history = []
+
+        for epoch in range(1, epochs + 1):
+            started = time.perf_counter()
+            order = rng.permutation(len(x))
+            total = 0.0
+            for start in range(0, len(x), batch_size):
+                batch = order[start:start + batch_size]
+                output, cache = self.forward(x[batch])
+                error = output - y[batch]
+                total += float((error ** 2).sum())
+                grads = self.backward(2 * error / error.size, cache)
+
+                # Общая норма градиента ограничивается - RNN склонны к взрывам
+                norm = np.sqrt(sum(float((g * g).sum()) for g in grads.values()))
+                factor = min(1.0, clip / (norm + 1e-12))
+
+                step += 1
+                for name in GRU_PARAMS:
+                    m, v = moments[name]
+                    g = grads[name] * factor
+                    m *= beta1
+                    m += (1 - beta1) * g
+                    v *= beta2
+                    v += (1 - beta2) * g * g
+                    m_hat = m / (1 - beta1 ** step)
+                    v_hat = v / (1 - beta2 ** step)
+                    self.params[name] -= learning_rate * m_hat / (np.sqrt(v_hat) + eps)
+
+            train_loss = total / y.size
+            val_loss = self.loss(*validation) if validation is not None else None
+            history.append((epoch, train_loss, val_loss))
+            val_text = f", val {val_loss:.4f}" if val_loss is not None else ""
+            logger.info(f"Эпоха {epoch}: train {train_loss:.4f}{val_text} ({time.perf_counter() - started:.1f}с)")
+
+        return history
+
+
+def evaluate(predicted: np.ndarray, target: np.ndarray) -> dict:
+    """Метрики на нормированных накопленных доходностях по горизонтам против наивного прогноза (0)"""
+    return {
+        'mse': ((predicted - target) ** 2).mean(axis=0).tolist(),
+        'naive_mse': (target ** 2).mean(axis=0).tolist(),
+        'directional_accuracy': ((np.sign(predicted) == np.sign(target)).mean(axis=0) * 100).tolist(),
+    }
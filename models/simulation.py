@@ -0,0 +1,106 @@
+import numpy as np
+import logging
+
+from config import MONTE_CARLO_PATHS, MONTE_CARLO_LOOKBACK, MONTE_CARLO_METHOD
+from models.lstm_model import ensemble_forecast, batch_ensemble_forecast
+
+logger = logging.getLogger(__name__)
+
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+# Сетка квантилей цены на последнем шаге: по ней вероятность выше/ниже любой цены - интерполяция
+TERMINAL_GRID = np.arange(101)
+
+
+def _log_paths(prices: np.ndarray, center: np.ndarray, paths: int, lookback: int, method: str,
+               seed: int) -> tuple:
+    """(последние цены (N, 1), лог-доходность траекторий к последней цене (N, steps, paths))
+
+    Шоки - лог-доходности последних lookback свечей без среднего: bootstrap
+    выбирает их случайно с возвращением, gbm - нормальные с той же дисперсией.
+    Снос задаёт прогноз center (N, steps), поэтому медиана траекторий идёт по нему.
+    """
+    prices = np.atleast_2d(prices)
+    center = np.atleast_2d(center)
+    n, steps = center.shape
+
+    returns = np.diff(np.log(prices[:, -lookback - 1:]), axis=1)
+    returns = returns - returns.mean(axis=1, keepdims=True)
+    rng = np.random.default_rng(seed)
+
+    if method == 'bootstrap':
+        picks = rng.integers(0, returns.shape[1], size=(n, steps, paths))
+        shocks = returns[np.arange(n)[:, np.newaxis, np.newaxis], picks]
+    elif method == 'gbm':
+        sigma = returns.std(axis=1, ddof=1)
+        shocks = rng.standard_normal((n, steps, paths)) * sigma[:, np.newaxis, np.newaxis]
+    else:
+        raise ValueError(f"Unknown simulation method {method}")
+
+    last = prices[:, -1:]
+    drift = np.log(center / last)
+    return last, np.cumsum(shocks, axis=1) + drift[:, :, np.newaxis]
+
+
+def simulation_bands(prices: np.ndarray, center: np.ndarray, paths: int = MONTE_CARLO_PATHS,
+                     lookback: int = MONTE_CARLO_LOOKBACK, method: str = MONTE_CARLO_METHOD,
+                     seed: int = None) -> tuple:
+    """(полосы (N, steps, 5) для BAND_PERCENTILES, квантили последнего шага (N, 101))
+
+    Траектории сортируются один раз по непрерывной оси; квантили - линейная
+    интерполяция порядковых статистик лог-цены, экспонента берётся только от них.
+    """
+    last, log_paths = _log_paths(prices, center, paths, lookback, method, seed)
+    log_paths.sort(axis=2)
+
+    def quantiles(values: np.ndarray, q: np.ndarray) -> np.ndarray:
+        position = q / 100 * (values.shape[-1] - 1)
+        low = np.floor(position).astype(int)
+        high = np.minimum(low + 1, values.shape[-1] - 1)
+        fraction = position - low
+        return values[..., low] * (1 - fraction) + values[..., high] * fraction
+
+    bands = last[:, :, np.newaxis] * np.exp(quantiles(log_paths, np.asarray(BAND_PERCENTILES, dtype=float)))
+    terminal = last * np.exp(quantiles(log_paths[:, -1], TERMINAL_GRID.astype(float)))
+    return bands, terminal
+
+
+def probability_above(terminal: np.ndarray, price: float) -> float:
+    """Доля траекторий, закончившихся выше price, по сетке квантилей"""
+    return 1.0 - float(np.interp(price, terminal, TERMINAL_GRID / 100, left=0.0, right=1.0))
+
+
+def direction_confidence(terminal: np.ndarray, base: float, expected: float) -> float:
+    """Уверенность в направлении, %: доля траекторий по ту же сторону от base, что и прогноз (25..95)"""
+    above = probability_above(terminal, base)
+    probability = above if expected >= base else 1 - above
+    return float(min(95, max(25, probability * 100)))
+
+
+def format_bands(bands: np.ndarray) -> dict:
+    """{'p5': [...], ...} по дням прогноза"""
+    return {f"p{q}": bands[:, i].tolist() for i, q in enumerate(BAND_PERCENTILES)}
+
+
+def simulated_forecast(prices: np.ndarray, future_steps: int = 7, seed: int = None) -> tuple:
+    """Ensemble прогноз и Monte Carlo полосы одного ряда (для пула процессов)
+
+    (прогноз (steps,), уверенность, полосы (steps, 5), квантили последнего шага (101,))
+    """
+    prices = np.asarray(prices, dtype=float)
+    prices = prices[np.isfinite(prices)]
+    predictions, confidence, _ = ensemble_forecast(prices, future_steps)
+    predictions = np.asarray(predictions, dtype=float)
+
+    if len(prices) < 3:
+        flat = np.repeat(predictions[:, np.newaxis], len(BAND_PERCENTILES), axis=1)
+        return predictions, confidence, flat, np.full(len(TERMINAL_GRID), predictions[-1])
+
+    bands, terminal = simulation_bands(prices[np.newaxis], predictions[np.newaxis], seed=seed)
+    return predictions, confidence, bands[0], terminal[0]
+
+
+def batch_simulated_forecast(prices: np.ndarray, future_steps: int = 7, seed: int = None) -> tuple:
+    """То же для матрицы рядов одной длины (N, T): все траектории одним вызовом"""
+    predictions, confidence = batch_ensemble_forecast(prices, future_steps)
+    bands, terminal = simulation_bands(prices, predictions, seed=seed)
+    return predictions, confidence, bands, terminal
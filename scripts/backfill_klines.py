@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Глубокая загрузка истории свечей Bybit в локальное хранилище (data/klines)
+
+ПРИМЕР:
+    python scripts/backfill_klines.py --interval 60 --days 730 BTCUSDT ETHUSDT
+    python scripts/backfill_klines.py --popular --interval D --days 1825
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)  # Родитель папки scripts/
+sys.path.insert(0, project_root)
+
+from config import POPULAR_CRYPTOS, KLINE_BACKFILL_CONCURRENCY
+from services import bybit_service, http_transport
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def backfill(symbols: list, interval: str, days: int, concurrency: int):
+    """Загрузить историю по каждому символу"""
+
+    print("\n" + "=" * 70)
+    print(f"📥 BACKFILL СВЕЧЕЙ: интервал {interval}, {days} дней, {len(symbols)} символов")
+    print("=" * 70 + "\n")
+
+    try:
+        total = 0
+        for symbol in symbols:
+            added = await bybit_service.backfill_klines(symbol, interval, days, concurrency)
+            total += added
+            print(f"   ✅ {symbol:12} +{added} свечей")
+
+        print(f"\n✅ Добавлено {total} свечей")
+        return True
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}\n")
+        return False
+
+    finally:
+        await bybit_service.close_session()
+        await http_transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Bybit klines into the local store")
+    parser.add_argument('symbols', nargs='*', help="Символы, например BTCUSDT")
+    parser.add_argument('--popular', action='store_true', help="Добавить POPULAR_CRYPTOS")
+    parser.add_argument('--interval', default='60', help="Интервал Bybit (1, 5, 15, 60, 240, D, W)")
+    parser.add_argument('--days', type=int, default=365, help="Глубина истории в днях")
+    parser.add_argument('--concurrency', type=int, default=KLINE_BACKFILL_CONCURRENCY)
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.popular:
+        symbols += [c['symbol'] for c in POPULAR_CRYPTOS if c['symbol'] not in symbols]
+
+    if not symbols:
+        parser.error("Укажите символы или --popular")
+
+    success = asyncio.run(backfill(symbols, args.interval, args.days, args.concurrency))
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка Bybit v5 для нагрузочного тестирования без сети
+
+Отдаёт /v5/market/tickers, /v5/market/kline и публичный WebSocket
+/v5/public/spot. Данные - детерминированный синтетический путь цены
+(зависит только от --seed, свечи всех интервалов и тикеры согласованы)
+или записанные ответы настоящего Bybit.
+Можно добавить задержку, долю ошибок и лимит запросов с заголовками
+X-Bapi-Limit-*.
+
+ЗАПУСК:
+    python scripts/bybit_stub_server.py --port 8900 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+    python scripts/bybit_stub_server.py --mode record --recordings data/bybit_recordings
+    python scripts/bybit_stub_server.py --mode replay --recordings data/bybit_recordings
+
+ПРИЛОЖЕНИЕ НА ЗАГЛУШКЕ:
+    BYBIT_STUB_URL=http://127.0.0.1:8900 uvicorn api.web_app_api:app
+"""
+
+import sys
+import os
+import json
+import time
+import zlib
+import random
+import asyncio
+import hashlib
+import argparse
+import logging
+import numpy as np
+from pathlib import Path
+from aiohttp import web, WSMsgType, ClientSession, ClientTimeout
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)  # Родитель папки scripts/
+sys.path.insert(0, project_root)
+
+from config import POPULAR_CRYPTOS
+from services.kline_store import INTERVAL_MS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ORIGIN_MS = 1704067200000  # 2024-01-01 UTC: начало всех синтетических рядов
+YEAR_MS = 365 * 86_400_000
+
+
+class SyntheticMarket:
+    """Детерминированный ценовой путь символа, общий для тикеров и свечей всех интервалов
+
+    Путь задан на трёх уровнях: дневные закрытия - GBM, часовые внутри дня и
+    минутные внутри часа - броуновские мосты между закрытиями уровня выше.
+    Закрытие в любой момент одинаково на всех уровнях, поэтому свечи любого
+    интервала - это агрегация одного и того же пути, а тикер (минутный
+    уровень) совпадает с закрытием текущей свечи. Шум генерируется блоками
+    со своим генератором: цена зависит только от (seed, символ, момент).
+    """
+
+    BLOCK = 4096
+    # уровень -> (родительский уровень, дочерних точек на родительскую, минут в точке)
+    LEVELS = {'D': (None, None, 1440), '60': ('D', 24, 60), '1': ('60', 60, 1)}
+
+    def __init__(self, seed: int, symbols: list, drift: float = 0.05, volatility: float = 0.8):
+        self.seed = seed
+        self.symbols = symbols
+        self.drift = drift
+        self.volatility = volatility
+        self._levels = {}
+        self._blocks = {}
+
+    def _rng(self, *parts):
+        return np.random.default_rng([self.seed] + [zlib.crc32(str(p).encode()) for p in parts])
+
+    def _base_price(self, symbol: str) -> float:
+        return float(np.exp(self._rng(symbol, 'base').uniform(np.log(0.01), np.log(50_000))))
+
+    def _sigma(self, level: str) -> float:
+        return self.volatility * np.sqrt(self.LEVELS[level][2] * 60_000 / YEAR_MS)
+
+    def _block(self, symbol: str, level: str, block: int, shape: tuple, mu: float = 0.0) -> np.ndarray:
+        key = (symbol, level, block)
+        if key not in self._blocks:
+            if len(self._blocks) > 4096:
+                self._blocks.clear()
+            self._blocks[key] = self._rng(symbol, level, block).normal(mu, self._sigma(level), shape)
+        return self._blocks[key]
+
+    def _daily_block_level(self, symbol: str, block: int) -> float:
+        """Лог-цена перед первым днём блока"""
+        dt = 1440 * 60_000 / YEAR_MS
+        mu = (self.drift - 0.5 * self.volatility ** 2) * dt
+        levels = self._levels.setdefault(symbol, [np.log(self._base_price(symbol))])
+        while len(levels) <= block:
+            b = len(levels) - 1
+            levels.append(levels[-1] + float(self._block(symbol, 'D', b, (self.BLOCK,), mu).sum()))
+        return levels[block]
+
+    def path(self, symbol: str, level: str, first: int, last: int) -> np.ndarray:
+        """Лог-закрытия точек уровня с индексами first..last; индекс -1 - начальная цена"""
+        if first < 0:
+            head = np.array([self._daily_block_level(symbol, 0)])
+            return np.concatenate([head, self.path(symbol, level, 0, last)]) if last >= 0 else head
+
+        parent, ratio, _ = self.LEVELS[level]
+        if parent is None:
+            dt = 1440 * 60_000 / YEAR_MS
+            mu = (self.drift - 0.5 * self.volatility ** 2) * dt
+            parts = []
+            for block in range(first // self.BLOCK, last // self.BLOCK + 1):
+                values = self._daily_block_level(symbol, block) + np.cumsum(
+                    self._block(symbol, 'D', block, (self.BLOCK,), mu))
+                lo = max(first - block * self.BLOCK, 0)
+                hi = min(last - block * self.BLOCK, self.BLOCK - 1)
+                parts.append(values[lo:hi + 1])
+            return np.concatenate(parts)
+
+        # Мост между закрытиями родителя p - 1 и p: накопленный шум минус линейная поправка на конец
+        p_first, p_last = first // ratio, last // ratio
+        anchors = self.path(symbol, parent, p_first - 1, p_last)
+        per_block = max(self.BLOCK // ratio, 1)
+        noise = np.concatenate([
+            self._block(symbol, level, block, (per_block, ratio))
+            for block in range(p_first // per_block, p_last // per_block + 1)
+        ])[p_first % per_block:][:p_last - p_first + 1]
+        walk = np.cumsum(noise, axis=1)
+        correction = walk[:, -1] - np.diff(anchors)
+        values = anchors[:-1, np.newaxis] + walk - np.arange(1, ratio + 1) / ratio * correction[:, np.newaxis]
+        offset = p_first * ratio
+        return values.ravel()[first - offset:last - offset + 1]
+
+    def _now_minute(self) -> int:
+        return (int(time.time() * 1000) - ORIGIN_MS) // 60_000
+
+    def klines(self, symbol: str, interval: str, limit: int, start: int = None, end: int = None) -> list:
+        interval_ms = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        last = (min(end, now_ms) if end else now_ms) - ORIGIN_MS
+        last //= interval_ms
+        first = max(last - limit + 1, 0)
+        if start:
+            first = max(first, -(-(start - ORIGIN_MS) // interval_ms))
+        if last < 0 or first > last:
+            return []
+
+        # Свечи от часа и выше собираются из часовых закрытий, более мелкие - из минутных
+        minutes = interval_ms // 60_000
+        level = '60' if minutes >= 60 else '1'
+        step = minutes // self.LEVELS[level][2]
+        count = last - first + 1
+        values = self.path(symbol, level, first * step - 1, (last + 1) * step - 1)
+        opens = values[:-1:step][:count]
+        points = values[1:].reshape(count, step)
+
+        # Незакрытая свеча: точки уровня после текущей минуты ещё не наступили
+        now_minute = self._now_minute()
+        elapsed = now_minute // self.LEVELS[level][2] - last * step
+        points = points.copy()
+        if elapsed < step:
+            current = self.path(symbol, '1', now_minute, now_minute)[0]
+            points[-1, max(elapsed, 0):] = current
+        closes = np.exp(points[:, -1])
+        opens = np.exp(opens)
+
+        wick = self._rng(symbol, interval, 'wick', first).uniform(0, 0.002, (2, count))
+        highs = np.maximum(np.exp(points.max(axis=1)), opens) * (1 + wick[0])
+        lows = np.minimum(np.exp(points.min(axis=1)), opens) * (1 - wick[1])
+        volumes = self._rng(symbol, interval, 'volume', first).lognormal(8, 1, count)
+
+        rows = []
+        for i in range(count - 1, -1, -1):
+            ts = ORIGIN_MS + (first + i) * interval_ms
+            rows.append([str(ts), f"{opens[i]:.8g}", f"{highs[i]:.8g}", f"{lows[i]:.8g}",
+                         f"{closes[i]:.8g}", f"{volumes[i]:.6g}", f"{volumes[i] * closes[i]:.6g}"])
+        return rows
+
+    def ticker(self, symbol: str) -> dict:
+        """Тикер по минутному уровню пути: последняя цена и статистика за 24 часа"""
+        now_index = self._now_minute()
+        closes = np.exp(self.path(symbol, '1', max(now_index - 1440, 0), now_index))
+        last, prev = closes[-1], closes[0]
+        volume = float(self._rng(symbol, 'volume24h', now_index // 60).lognormal(12, 1))
+        return {
+            'symbol': symbol,
+            'lastPrice': f"{last:.8g}",
+            'prevPrice24h': f"{prev:.8g}",
+            'price24hPcnt': f"{last / prev - 1:.4f}",
+            'highPrice24h': f"{closes.max():.8g}",
+            'lowPrice24h': f"{closes.min():.8g}",
+            'volume24h': f"{volume:.6g}",
+            'turnover24h': f"{volume * last:.6g}",
+        }
+
+
+class StubBybit:
+    """HTTP/WebSocket сервер заглушки с инъекцией задержек, ошибок и лимитов"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        symbols = [c['symbol'] for c in POPULAR_CRYPTOS]
+        symbols += [f"SYN{i:03d}USDT" for i in range(max(args.symbols - len(symbols), 0))]
+        self.market = SyntheticMarket(args.seed, symbols[:args.symbols])
+        self.recordings = Path(args.recordings) if args.recordings else None
+        self.window_start = time.time()
+        self.window_count = 0
+        self.stats = {'requests': 0, 'errors_injected': 0, 'rate_limited': 0, 'replayed': 0, 'recorded': 0}
+        self.session = None
+
+    def _recording_path(self, request: web.Request) -> Path:
+        params = json.dumps(sorted(request.query.items()))
+        digest = hashlib.sha1(params.encode()).hexdigest()[:16]
+        return self.recordings / f"{request.path.strip('/').replace('/', '_')}__{digest}.json"
+
+    def _rate_limit_headers(self) -> tuple:
+        """(превышен ли лимит, заголовки X-Bapi-Limit-*) для окна в 5 секунд"""
+        now = time.time()
+        if now - self.window_start >= 5:
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+
+        limit = self.args.rate_limit
+        headers = {}
+        if limit:
+            headers = {
+                'X-Bapi-Limit': str(limit),
+                'X-Bapi-Limit-Status': str(max(limit - self.window_count, 0)),
+                'X-Bapi-Limit-Reset-Timestamp': str(int((self.window_start + 5) * 1000)),
+            }
+        return bool(limit) and self.window_count > limit, headers
+
+    @web.middleware
+    async def faults(self, request: web.Request, handler):
+        if not request.path.startswith('/v5/market'):
+            return await handler(request)
+
+        self.stats['requests'] += 1
+        exceeded, headers = self._rate_limit_headers()
+
+        if self.args.latency_ms or self.args.jitter_ms:
+            delay = max(self.rng.gauss(self.args.latency_ms, self.args.jitter_ms), 0)
+            await asyncio.sleep(delay / 1000)
+
+        if exceeded:
+            self.stats['rate_limited'] += 1
+            return web.json_response({'retCode': 10006, 'retMsg': 'Too many visits!'}, status=429, headers=headers)
+
+        if self.rng.random() < self.args.error_rate:
+            self.stats['errors_injected'] += 1
+            return web.json_response({'retCode': 10016, 'retMsg': 'Internal error'}, status=502, headers=headers)
+
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def _from_recordings(self, request: web.Request):
+        if self.args.mode == 'record':
+            if self.session is None:
+                self.session = ClientSession(timeout=ClientTimeout(total=15))
+            async with self.session.get(f"{self.args.upstream}{request.path}", params=request.query) as response:
+                data = await response.json(content_type=None)
+            if response.status == 200:
+                self.recordings.mkdir(parents=True, exist_ok=True)
+                self._recording_path(request).write_text(json.dumps(data), encoding='utf-8')
+                self.stats['recorded'] += 1
+            return data
+
+        if self.args.mode == 'replay':
+            path = self._recording_path(request)
+            if path.exists():
+                self.stats['replayed'] += 1
+                return json.loads(path.read_text(encoding='utf-8'))
+
+        return None
+
+    @staticmethod
+    def _ok(result: dict) -> web.Response:
+        return web.json_response({'retCode': 0, 'retMsg': 'OK', 'result': result, 'time': int(time.time() * 1000)})
+
+    async def tickers(self, request: web.Request):
+        recorded = await self._from_recordings(request)
+        if recorded is not None:
+            return web.json_response(recorded)
+
+        symbol = request.query.get('symbol')
+        if symbol:
+            rows = [self.market.ticker(symbol)] if symbol in self.market.symbols else []
+        else:
+            rows = [self.market.ticker(s) for s in self.market.symbols]
+        return self._ok({'category': 'spot', 'list': rows})
+
+    async def kline(self, request: web.Request):
+        recorded = await self._from_recordings(request)
+        if recorded is not None:
+            return web.json_response(recorded)
+
+        symbol = request.query.get('symbol', '')
+        interval = request.query.get('interval', '60')
+        if symbol not in self.market.symbols or interval not in INTERVAL_MS:
+            return web.json_response({'retCode': 10001, 'retMsg': 'Not supported symbols', 'result': {}})
+
+        limit = min(int(request.query.get('limit', 200)), 1000)
+        start = int(request.query['start']) if 'start' in request.query else None
+        end = int(request.query['end']) if 'end' in request.query else None
+        rows = self.market.klines(symbol, interval, limit, start, end)
+        return self._ok({'category': 'spot', 'symbol': symbol, 'list': rows})
+
+    async def stats_handler(self, request: web.Request):
+        return web.json_response(self.stats)
+
+    async def websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        topics = set()
+
+        async def push():
+            while not ws.closed:
+                for topic in list(topics):
+                    symbol = topic.split('.', 1)[1]
+                    if symbol in self.market.symbols:
+                        await ws.send_str(json.dumps({
+                            'topic': topic, 'type': 'snapshot', 'ts': int(time.time() * 1000),
+                            'data': self.market.ticker(symbol)
+                        }))
+                await asyncio.sleep(self.args.ws_interval)
+
+        pusher = asyncio.create_task(push())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                message = json.loads(msg.data)
+                if message.get('op') == 'ping':
+                    await ws.send_str(json.dumps({'op': 'pong', 'success': True, 'ret_msg': 'pong'}))
+                elif message.get('op') == 'subscribe':
+                    topics.update(message.get('args', []))
+                    await ws.send_str(json.dumps({'op': 'subscribe', 'success': True, 'ret_msg': ''}))
+        finally:
+            pusher.cancel()
+        return ws
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_get('/v5/market/tickers', self.tickers)
+        app.router.add_get('/v5/market/kline', self.kline)
+        app.router.add_get('/v5/public/spot', self.websocket)
+        app.router.add_get('/stub/stats', self.stats_handler)
+
+        async def close_session(_):
+            if self.session:
+                await self.session.close()
+
+        app.on_cleanup.append(close_session)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bybit v5 stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--mode', choices=['synthetic', 'record', 'replay'], default='synthetic')
+    parser.add_argument('--recordings', default='data/bybit_recordings', help="Каталог записанных ответов")
+    parser.add_argument('--upstream', default='https://api.bybit.com', help="Bybit для режима record")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--symbols', type=int, default=50, help="Количество синтетических USDT пар")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 502")
+    parser.add_argument('--rate-limit', type=int, default=600, help="Запросов за 5 секунд (0 - без лимита)")
+    parser.add_argument('--ws-interval', type=float, default=1.0, help="Период push тикеров в WebSocket, с")
+    args = parser.parse_args()
+
+    stub = StubBybit(args)
+    print("\n" + "=" * 70)
+    print(f"🧪 BYBIT STUB: http://{args.host}:{args.port} (режим {args.mode}, {len(stub.market.symbols)} пар)")
+    print("=" * 70 + "\n")
+    web.run_app(stub.build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
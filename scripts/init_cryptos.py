@@ -8,11 +8,17 @@
 """
 
 import asyncio
-import httpx
 import json
+import os
 from pathlib import Path
 import sys
 
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)  # Родитель папки scripts/
+sys.path.insert(0, project_root)
+
+from services.http_client import http_transport
+
 DATA_DIR = Path('data')
 CRYPTOS_FILE = DATA_DIR / 'cryptos.json'
 
@@ -27,15 +33,15 @@ async def download_all_cryptos():
     try:
         print("📥 Подключаемся к CoinGecko API...")
 
-        async with httpx.AsyncClient(timeout=30) as client:
+        try:
             # Загружаем список всех криптовалют
-            response = await client.get(
+            status, coins_list = await http_transport.get_json(
                 'https://api.coingecko.com/api/v3/coins/list',
-                headers={'User-Agent': 'CryptoBot/1.0'}
+                headers={'User-Agent': 'CryptoBot/1.0'},
+                timeout=30
             )
 
-            if response.status_code == 200:
-                coins_list = response.json()
+            if status == 200:
                 print(f"✅ Получено {len(coins_list)} криптовалют\n")
 
                 # Преобразуем в удобный формат
@@ -85,15 +91,18 @@ async def download_all_cryptos():
 
                 return True
 
-            elif response.status_code == 429:
+            elif status == 429:
                 print("❌ 429 Too Many Requests")
                 print("\nСервер CoinGecko переполнен. Попробуй позже.\n")
                 return False
 
             else:
-                print(f"❌ Ошибка API: {response.status_code}\n")
+                print(f"❌ Ошибка API: {status}\n")
                 return False
 
+        finally:
+            await http_transport.close()
+
     except Exception as e:
         print(f"❌ Ошибка: {e}\n")
         return False
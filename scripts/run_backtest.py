@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Walk-forward бэктест предсказателя цен по свечам из локального хранилища (data/klines)
+
+ПРИМЕР:
+    python scripts/backfill_klines.py --popular --interval D --days 1825
+    python scripts/run_backtest.py --popular --lookback 180 --horizon 7 --name baseline
+    python scripts/run_backtest.py --list
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)  # Родитель папки scripts/
+sys.path.insert(0, project_root)
+
+from config import POPULAR_CRYPTOS, BACKTEST_DIR
+from models.backtest import run_backtest, save_run, list_runs
+from services.kline_store import kline_store
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def print_result(result: dict):
+    horizon = result['config']['horizon']
+    print(f"\n📊 Окон: {result['windows']}, символов: {len(result['symbols'])}, "
+          f"время: {result['elapsed_seconds']} с\n")
+
+    print(f"{'Метод':16} {'MAPE h1':>9} {f'MAPE h{horizon}':>9} {'Dir h1':>8} {f'Dir h{horizon}':>8}")
+    for name, metrics in result['overall'].items():
+        mape, direction = metrics['mape'], metrics['directional_accuracy']
+        print(f"{name:16} {mape[0]:8.2f}% {mape[-1]:8.2f}% {direction[0]:7.1f}% {direction[-1]:7.1f}%")
+
+    print(f"\n🎯 Калибровка Monte Carlo уверенности (ECE {result['calibration']['ece']:.1f} п.п.)")
+    for row in result['calibration']['bins']:
+        low, high = row['range']
+        print(f"   {low:>3}-{high:<3} окон {row['windows']:>7}  "
+              f"уверенность {row['mean_confidence']:5.1f}%  точность {row['directional_accuracy']:5.1f}%")
+
+
+def print_runs(directory: str):
+    runs = list_runs(directory)
+    if not runs:
+        print("Сохранённых запусков нет")
+        return
+
+    print(f"{'Запуск':32} {'Окон':>8} {'H':>3} {'MAPE ens':>9} {'Dir ens':>8} {'ECE':>6}")
+    for run in runs:
+        ensemble = run['overall'].get('ensemble')
+        if not ensemble:
+            continue
+        ece = run['calibration']['ece'] or 0
+        print(f"{run['run_id']:32} {run['windows']:>8} {run['config']['horizon']:>3} "
+              f"{ensemble['mape'][-1]:8.2f}% {ensemble['directional_accuracy'][-1]:7.1f}% {ece:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the price predictor")
+    parser.add_argument('symbols', nargs='*', help="Символы, например BTCUSDT")
+    parser.add_argument('--popular', action='store_true', help="Добавить POPULAR_CRYPTOS")
+    parser.add_argument('--interval', default='D', help="Интервал свечей в хранилище")
+    parser.add_argument('--lookback', type=int, default=180, help="Длина окна истории")
+    parser.add_argument('--horizon', type=int, default=7, help="Горизонт прогноза в свечах")
+    parser.add_argument('--step', type=int, default=1, help="Шаг между окнами")
+    parser.add_argument('--name', help="Метка запуска в имени файла")
+    parser.add_argument('--output', default=BACKTEST_DIR, help="Каталог результатов")
+    parser.add_argument('--list', action='store_true', help="Показать сохранённые запуски")
+    args = parser.parse_args()
+
+    if args.list:
+        print_runs(args.output)
+        return
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.popular:
+        symbols += [c['symbol'] for c in POPULAR_CRYPTOS if c['symbol'] not in symbols]
+
+    if not symbols:
+        parser.error("Укажите символы или --popular")
+
+    series = {}
+    for symbol in symbols:
+        candles = kline_store.read(symbol, args.interval)
+        if not len(candles):
+            print(f"   ⚠️ {symbol}: нет свечей {args.interval} в хранилище (scripts/backfill_klines.py)")
+            continue
+        series[symbol] = candles['close']
+
+    if not series:
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print(f"🔁 BACKTEST: интервал {args.interval}, окно {args.lookback}, "
+          f"горизонт {args.horizon}, {len(series)} символов")
+    print("=" * 70)
+
+    result = run_backtest(series, args.lookback, args.horizon, args.step)
+    if not result['windows']:
+        print(f"\n⚠️ Ни у одного символа нет {args.lookback + args.horizon} свечей - окон для проверки нет")
+        sys.exit(1)
+    result['config']['interval'] = args.interval
+    print_result(result)
+
+    path = save_run(result, args.name, args.output)
+    print(f"\n✅ Результат сохранён: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Обучение GRU модели прогноза по дневным свечам из локального хранилища (data/klines)
+
+Веса сохраняются новой версией в data/models/<группа>/<версия>/ и
+регистрируются в data/models/registry.json (активной, если не --no-activate).
+
+ПРИМЕР:
+    python scripts/backfill_klines.py --popular --interval D --days 1825
+    python scripts/train_sequence_model.py --popular --group default --epochs 30
+    python scripts/train_sequence_model.py --list
+"""
+
+import sys
+import os
+import time
+import argparse
+import logging
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)  # Родитель папки scripts/
+sys.path.insert(0, project_root)
+
+from config import POPULAR_CRYPTOS
+from models.sequence_model import model_registry
+from models.sequence_training import GRUTrainer, build_dataset, evaluate
+from services.kline_store import kline_store
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def print_registry():
+    groups = model_registry.groups()
+    if not groups:
+        print("Зарегистрированных моделей нет")
+        return
+
+    for name, group in groups.items():
+        symbols = ', '.join(group['symbols']) or 'все остальные символы'
+        print(f"\n📦 {name} ({symbols})")
+        for version, summary in group['versions'].items():
+            marker = '✅' if version == group['active'] else '  '
+            metrics = summary['metrics']
+            print(f"   {marker} {version}  val mse h{summary['horizon']}: {metrics['mse'][-1]:.4f} "
+                  f"(наивный {metrics['naive_mse'][-1]:.4f}), направление {metrics['directional_accuracy'][-1]:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the NumPy GRU forecaster")
+    parser.add_argument('symbols', nargs='*', help="Символы, например BTCUSDT")
+    parser.add_argument('--popular', action='store_true', help="Добавить POPULAR_CRYPTOS")
+    parser.add_argument('--group', default='default', help="Группа символов в registry")
+    parser.add_argument('--interval', default='D', help="Интервал свечей в хранилище")
+    parser.add_argument('--lookback', type=int, default=60)
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--hidden', type=int, default=32)
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--learning-rate', type=float, default=1e-3)
+    parser.add_argument('--step', type=int, default=1, help="Шаг между обучающими окнами")
+    parser.add_argument('--no-activate', action='store_true', help="Не делать версию активной")
+    parser.add_argument('--list', action='store_true', help="Показать registry")
+    args = parser.parse_args()
+
+    if args.list:
+        print_registry()
+        return
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.popular:
+        symbols += [c['symbol'] for c in POPULAR_CRYPTOS if c['symbol'] not in symbols]
+
+    if not symbols:
+        parser.error("Укажите символы или --popular")
+
+    series = {}
+    for symbol in symbols:
+        candles = kline_store.read(symbol, args.interval)
+        if not len(candles):
+            print(f"   ⚠️ {symbol}: нет свечей {args.interval} в хранилище (scripts/backfill_klines.py)")
+            continue
+        series[symbol] = candles['close']
+
+    if not series:
+        sys.exit(1)
+
+    x, y, validation = build_dataset(series, args.lookback, args.horizon, args.step)
+
+    print("\n" + "=" * 70)
+    print(f"🧠 ОБУЧЕНИЕ GRU: {len(series)} символов, {int((~validation).sum())} окон, "
+          f"валидация {int(validation.sum())}")
+    print("=" * 70 + "\n")
+
+    trainer = GRUTrainer(args.lookback, args.horizon, args.hidden)
+    history = trainer.fit(x[~validation], y[~validation], args.epochs, args.batch_size, args.learning_rate,
+                          validation=(x[validation], y[validation]))
+    metrics = evaluate(trainer.forward(x[validation])[0], y[validation])
+
+    version = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    summary = {
+        'created_at': time.time(),
+        'interval': args.interval,
+        'lookback': args.lookback,
+        'horizon': args.horizon,
+        'hidden': args.hidden,
+        'epochs': args.epochs,
+        'samples': int((~validation).sum()),
+        'metrics': metrics,
+    }
+    directory = model_registry.save_version(args.group, version, {**summary, 'history': history,
+                                                                  'symbols': sorted(series)}, trainer.params)
+    model_registry.register(args.group, version, summary, list(series), activate=not args.no_activate)
+
+    print(f"\n📊 val mse h{args.horizon}: {metrics['mse'][-1]:.4f} (наивный {metrics['naive_mse'][-1]:.4f}), "
+          f"направление {metrics['directional_accuracy'][-1]:.1f}%")
+    print(f"✅ Версия {args.group}/{version} сохранена: {directory}")
+    if args.interval != 'D':
+        print(f"   ⚠️ Прогнозы API используют только модели интервала D - версия {args.interval} не обслуживается")
+
+
+if __name__ == '__main__':
+    main()
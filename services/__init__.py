@@ -1,3 +1,4 @@
+from services.http_client import http_transport
 from services.bybit_service import bybit_service
 
-__all__ = ['bybit_service']
\ No newline at end of file
+__all__ = ['bybit_service', 'http_transport']
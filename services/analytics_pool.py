@@ -0,0 +1,211 @@
+import time
+import asyncio
+import logging
+import importlib
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+from config import (ANALYTICS_POOL_MODE, ANALYTICS_POOL_WORKERS, ANALYTICS_POOL_MAX_QUEUE,
+                    ANALYTICS_TASK_TIMEOUT, ANALYTICS_SHM_MIN_BYTES)
+from services.resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsPoolBusy(Exception):
+    """Очередь пула заполнена - задачу не принимаем"""
+
+
+class _SharedArray:
+    """Описание массива в shared memory: процесс-воркер подключается по имени без копирования через pickle"""
+
+    __slots__ = ('name', 'shape', 'dtype')
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+
+def _detach(value):
+    """Копии массивов результата - они не должны ссылаться на shared memory"""
+    if isinstance(value, np.ndarray):
+        return np.array(value)
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, list):
+        return [_detach(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _detach(v) for k, v in value.items()}
+    return value
+
+
+def _invoke(fn, args: tuple, kwargs: dict):
+    """Выполняется в воркере: подключает shared memory, вызывает fn, отдаёт независимый результат"""
+    handles = []
+    resolved = []
+    for arg in args:
+        if isinstance(arg, _SharedArray):
+            shm = shared_memory.SharedMemory(name=arg.name)
+            handles.append(shm)
+            resolved.append(np.ndarray(arg.shape, dtype=arg.dtype, buffer=shm.buf))
+        else:
+            resolved.append(arg)
+
+    try:
+        return _detach(fn(*resolved, **kwargs))
+    finally:
+        del resolved
+        for shm in handles:
+            shm.close()
+
+
+def _warmup(modules: tuple):
+    """Импорт модулей аналитики в воркере заранее, чтобы первая задача не платила за запуск"""
+    for module in modules:
+        importlib.import_module(module)
+    return True
+
+
+class AnalyticsPool:
+    """Пул для CPU-тяжёлой аналитики вне event loop
+
+    mode: process - ProcessPoolExecutor (spawn), крупные NumPy массивы передаются
+    через shared memory; thread - ThreadPoolExecutor (NumPy отпускает GIL);
+    inline - синхронно в текущем потоке (скрипты, отладка). Число задач в
+    работе ограничено max_queue, каждая ждёт не дольше timeout.
+    """
+
+    PRELOAD_MODULES = ('services.indicators', 'models.lstm_model', 'models.simulation', 'models.sequence_model')
+
+    def __init__(self, mode: str = ANALYTICS_POOL_MODE, workers: int = ANALYTICS_POOL_WORKERS,
+                 max_queue: int = ANALYTICS_POOL_MAX_QUEUE, timeout: float = ANALYTICS_TASK_TIMEOUT,
+                 shm_min_bytes: int = ANALYTICS_SHM_MIN_BYTES):
+        if mode not in ('process', 'thread', 'inline'):
+            raise ValueError(f"Unknown analytics pool mode {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.shm_min_bytes = shm_min_bytes
+        self._executor = None
+        self.in_flight = 0
+        self.latency = LatencyTracker(size=500, min_samples=1)
+        self.stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0,
+            'rejected': 0, 'timeouts': 0, 'shm_bytes': 0
+        }
+
+    def start(self):
+        if self._executor is None and self.mode != 'inline':
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                for _ in range(self.workers):
+                    self._executor.submit(_warmup, self.PRELOAD_MODULES)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analytics')
+            logger.info(f"✅ Пул аналитики: {self.mode}, {self.workers} воркеров")
+        return self._executor
+
+    async def close(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    def _share(self, args: tuple) -> tuple:
+        """Крупные массивы копируются в shared memory один раз; воркер читает их без pickle"""
+        shared = []
+        prepared = []
+        for arg in args:
+            if (self.mode == 'process' and isinstance(arg, np.ndarray)
+                    and arg.nbytes >= self.shm_min_bytes and arg.dtype != object):
+                shm = shared_memory.SharedMemory(create=True, size=arg.nbytes)
+                np.ndarray(arg.shape, dtype=arg.dtype, buffer=shm.buf)[...] = arg
+                shared.append(shm)
+                prepared.append(_SharedArray(shm.name, arg.shape, arg.dtype.str))
+                self.stats['shm_bytes'] += arg.nbytes
+            else:
+                prepared.append(arg)
+        return tuple(prepared), shared
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        """Выполнить fn(*args, **kwargs) в пуле
+
+        fn должна быть функцией уровня модуля (для режима process).
+        AnalyticsPoolBusy - очередь заполнена, asyncio.TimeoutError - задача не
+        уложилась в timeout (в режиме process она доработает в фоне).
+        """
+        if self.mode == 'inline':
+            started = time.perf_counter()
+            self.stats['submitted'] += 1
+            result = fn(*args, **kwargs)
+            self.stats['completed'] += 1
+            self.latency.add(time.perf_counter() - started)
+            return result
+
+        if self.in_flight >= self.max_queue:
+            self.stats['rejected'] += 1
+            raise AnalyticsPoolBusy(f"Analytics queue is full ({self.in_flight} tasks)")
+
+        executor = self.start()
+        prepared, shared = self._share(args)
+        started = time.perf_counter()
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, _invoke, fn, prepared, kwargs)
+        except BaseException:
+            self._release(shared)
+            raise
+
+        self.in_flight += 1
+        self.stats['submitted'] += 1
+
+        def on_done(done: asyncio.Future):
+            # Место в очереди и shared memory освобождаются, только когда воркер реально закончил
+            self.in_flight -= 1
+            self._release(shared)
+            if done.cancelled() or done.exception() is not None:
+                self.stats['failed'] += 1
+            else:
+                self.stats['completed'] += 1
+                self.latency.add(time.perf_counter() - started)
+
+        future.add_done_callback(on_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            logger.warning(f"⚠️ Задача аналитики {getattr(fn, '__name__', fn)} не уложилась в таймаут")
+            raise
+
+    @staticmethod
+    def _release(shared: list):
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+    def get_stats(self) -> dict:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            **self.stats,
+            'mode': self.mode,
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'max_queue': self.max_queue,
+            'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+
+analytics_pool = AnalyticsPool()
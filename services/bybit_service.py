@@ -1,64 +1,402 @@
 import aiohttp
 import asyncio
+import json
 import logging
 import numpy as np
 from datetime import datetime, timedelta
 import time
-
-from config import BYBIT_API_BASE
+from collections import OrderedDict
+
+from config import (BYBIT_API_ENDPOINTS, BYBIT_WS_PUBLIC_SPOT, BYBIT_WS_STALE_SECONDS, TICKER_SNAPSHOT_TTL,
+                    KLINE_BACKFILL_CONCURRENCY, BYBIT_RATE_LIMIT_PER_SECOND, BYBIT_RATE_LIMIT_BURST,
+                    BYBIT_RATE_LIMIT_COOLDOWN, BYBIT_TIMEOUTS, BYBIT_DEFAULT_TIMEOUT, BYBIT_MAX_RETRIES,
+                    BYBIT_HEDGE_ENABLED, BYBIT_BREAKER_FAILURES, BYBIT_BREAKER_RESET_SECONDS,
+                    BYBIT_ENDPOINT_PROBE_RATIO, INDICATOR_TABLE_INTERVAL, INDICATOR_TABLE_REFRESH_SECONDS)
+from services.http_client import http_transport
+from services.ticker_snapshot import TickerSnapshot
+from services.resilience import EndpointPool, LatencyTracker, backoff_delay
+from services.rate_limiter import RateLimiter, PRIORITY_USER, PRIORITY_BACKGROUND
+from services.kline_store import kline_store, parse_bybit_klines, INTERVAL_MS, KLINE_DTYPE
+from services import indicators
+from services.streaming_indicators import StreamingIndicatorRegistry, HISTORY_WINDOW
+from services.indicator_table import IndicatorTable
+from services.indicator_cache import IndicatorCache
+from services.analytics_pool import analytics_pool
 
 logger = logging.getLogger(__name__)
 
 
+def parse_ticker(symbol: str, ticker_data: dict) -> dict:
+    """Привести тикер Bybit (REST или WebSocket) к формату приложения"""
+    return {
+        'symbol': symbol,
+        'last_price': float(ticker_data.get('lastPrice', 0)),
+        'change_24h': float(ticker_data.get('price24hPcnt', 0)) * 100,
+        'high_24h': float(ticker_data.get('highPrice24h', 0)),
+        'low_24h': float(ticker_data.get('lowPrice24h', 0)),
+        'volume_24h': float(ticker_data.get('volume24h', 0)),
+        'turnover_24h': float(ticker_data.get('turnover24h', 0))
+    }
+
+
+class BybitTickerStream:
+    """Подписка на публичный WebSocket Bybit (spot tickers.*) с таблицей последних тикеров"""
+
+    PING_INTERVAL = 20
+    SUBSCRIBE_BATCH = 10  # Bybit spot принимает не более 10 топиков за запрос
+
+    def __init__(self, ws_url: str = BYBIT_WS_PUBLIC_SPOT, stale_after: int = BYBIT_WS_STALE_SECONDS):
+        self.ws_url = ws_url
+        self.stale_after = stale_after
+        self.tickers = {}
+        self.symbols = set()
+        self.last_message_at = 0
+        self.listeners = []  # callback(symbol, ticker) на каждое обновление
+        self._ws = None
+        self._task = None
+
+    @property
+    def is_live(self) -> bool:
+        """Поток жив, если сообщения (включая pong) приходили недавно"""
+        return self._ws is not None and (time.time() - self.last_message_at) < self.stale_after
+
+    def get_ticker(self, symbol: str):
+        """Тикер из таблицы или None, если поток устарел или символ ещё не приходил"""
+        if not self.is_live:
+            return None
+        return self.tickers.get(symbol)
+
+    def get_all_tickers(self):
+        """Все тикеры из таблицы или None, если поток устарел"""
+        if not self.is_live or not self.tickers:
+            return None
+        return list(self.tickers.values())
+
+    def start(self, session: aiohttp.ClientSession, symbols):
+        self.symbols.update(symbols)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(session))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def subscribe(self, symbols):
+        new_symbols = [s for s in symbols if s not in self.symbols]
+        self.symbols.update(new_symbols)
+        if self._ws is not None and new_symbols:
+            await self._send_subscribe(self._ws, new_symbols)
+
+    async def _send_subscribe(self, ws, symbols):
+        symbols = sorted(symbols)
+        for i in range(0, len(symbols), self.SUBSCRIBE_BATCH):
+            batch = symbols[i:i + self.SUBSCRIBE_BATCH]
+            await ws.send_str(json.dumps({
+                'op': 'subscribe',
+                'args': [f"tickers.{symbol}" for symbol in batch]
+            }))
+
+    async def _run(self, session: aiohttp.ClientSession):
+        backoff = 1
+        while True:
+            try:
+                async with session.ws_connect(self.ws_url) as ws:
+                    self._ws = ws
+                    self.last_message_at = time.time()
+                    logger.info(f"✅ WebSocket Bybit подключен, подписка на {len(self.symbols)} тикеров")
+                    await self._send_subscribe(ws, self.symbols)
+                    backoff = 1
+                    await self._read_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket error: {e}")
+            finally:
+                self._ws = None
+
+            logger.warning(f"⚠️ WebSocket Bybit отключен, переподключение через {backoff}с")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _read_loop(self, ws):
+        last_ping = time.time()
+        while True:
+            # Bybit разрывает соединение без ping дольше 20 секунд
+            if time.time() - last_ping >= self.PING_INTERVAL:
+                await ws.send_str(json.dumps({'op': 'ping'}))
+                last_ping = time.time()
+
+            try:
+                msg = await ws.receive(timeout=self.PING_INTERVAL)
+            except asyncio.TimeoutError:
+                continue
+
+            if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                return
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+
+            self.last_message_at = time.time()
+            self._handle_message(json.loads(msg.data))
+
+    def _handle_message(self, message: dict):
+        topic = message.get('topic', '')
+        if not topic.startswith('tickers.'):
+            if message.get('op') == 'subscribe' and not message.get('success', True):
+                logger.warning(f"Подписка отклонена: {message.get('ret_msg')}")
+            return
+
+        data = message.get('data') or {}
+        symbol = data.get('symbol') or topic.split('.', 1)[1]
+        try:
+            ticker = parse_ticker(symbol, data)
+        except (TypeError, ValueError):
+            return
+
+        self.tickers[symbol] = ticker
+        for listener in self.listeners:
+            listener(symbol, ticker)
+
+
 class BybitService:
-    def __init__(self):
-        self.base_url = BYBIT_API_BASE
-        self.session = None
+    LAST_GOOD_SIZE = 1000
+
+    def __init__(self, base_urls: list = None):
+        self.endpoints = EndpointPool(base_urls or BYBIT_API_ENDPOINTS,
+                                      BYBIT_BREAKER_FAILURES, BYBIT_BREAKER_RESET_SECONDS, BYBIT_ENDPOINT_PROBE_RATIO)
+        self.ticker_stream = BybitTickerStream()
+        self.ticker_snapshot = None
+        self._snapshot_lock = asyncio.Lock()
+        self._inflight = {}
+        self.rate_limiter = RateLimiter(BYBIT_RATE_LIMIT_PER_SECOND, BYBIT_RATE_LIMIT_BURST, BYBIT_RATE_LIMIT_COOLDOWN)
+        self.request_stats = {
+            'requests': 0, 'upstream': 0, 'coalesced': 0,
+            'retries': 0, 'hedged': 0, 'breaker_rejected': 0, 'stale_served': 0, 'rate_limited': 0
+        }
+        self._latency = {}
+        self._last_good = OrderedDict()
+        self._kline_depth = {}
+        self.streaming_indicators = StreamingIndicatorRegistry()
+        self.indicator_table = None
+        self.indicator_cache = IndicatorCache()
+        self._indicator_table_task = None
+        self.ticker_stream.listeners.append(self._on_ticker)
+
+    def _on_ticker(self, symbol: str, ticker: dict):
+        self.streaming_indicators.on_tick(symbol, ticker['last_price'])
 
     async def get_session(self):
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        return await http_transport.get_session()
 
     async def close_session(self):
-        if self.session:
-            await self.session.close()
-            self.session = None
-
-    async def make_request(self, endpoint: str, params: dict = None):
+        """Остановить WebSocket и фоновые задачи; сам пул соединений закрывает владелец http_transport"""
+        if self._indicator_table_task:
+            self._indicator_table_task.cancel()
+            try:
+                await self._indicator_table_task
+            except asyncio.CancelledError:
+                pass
+            self._indicator_table_task = None
+        await self.ticker_stream.stop()
+
+    async def start_ticker_stream(self, symbols):
+        """Запустить WebSocket подписку на тикеры переданных USDT пар"""
+        session = await self.get_session()
+        self.ticker_stream.start(session, symbols)
+
+    def get_request_stats(self) -> dict:
+        """Счётчики запросов к Bybit для мониторинга"""
+        return {
+            **self.request_stats,
+            'inflight': len(self._inflight),
+            'endpoints': self.endpoints.stats(),
+            'endpoint_probes': self.endpoints.probes,
+            'p95_ms': {
+                endpoint: round(tracker.percentile(95) * 1000, 1)
+                for endpoint, tracker in self._latency.items()
+                if tracker.percentile(95) is not None
+            },
+            'rate_limiter': self.rate_limiter.get_stats(),
+            'streaming_indicators': len(self.streaming_indicators),
+            'indicator_cache': self.indicator_cache.get_stats()
+        }
+
+    async def make_request(self, endpoint: str, params: dict = None, priority: int = PRIORITY_USER):
+        """GET к Bybit; одинаковые одновременные запросы ждут один upstream вызов
+
+        priority определяет очередь в RateLimiter: пользовательские чтения
+        уходят раньше фоновых задач (backfill).
+        """
+        key = (endpoint, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        self.request_stats['requests'] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.request_stats['coalesced'] += 1
+        else:
+            self.request_stats['upstream'] += 1
+            task = asyncio.ensure_future(self._resilient_request(key, endpoint, params, priority))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+
+        # shield: отмена одного из ожидающих не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    async def _resilient_request(self, key: tuple, endpoint: str, params: dict, priority: int):
+        """Повторы с джиттером, хеджирование и переключение между зеркалами API
+
+        Если все адреса недоступны (размыкатели открыты) или попытки
+        исчерпаны, отдаём последний удачный ответ на этот же запрос.
+        """
+        timeout = BYBIT_TIMEOUTS.get(endpoint, BYBIT_DEFAULT_TIMEOUT)
+        failed = set()
+
+        for attempt in range(BYBIT_MAX_RETRIES + 1):
+            # Повтор уходит на другой адрес, если такой есть
+            upstream = self.endpoints.choose(exclude=failed) or self.endpoints.choose()
+            if upstream is None:
+                self.request_stats['breaker_rejected'] += 1
+                break
+
+            if attempt:
+                self.request_stats['retries'] += 1
+                await asyncio.sleep(backoff_delay(attempt - 1))
+
+            if priority == PRIORITY_USER:
+                data, retryable = await self._hedged_fetch(upstream, endpoint, params, priority, timeout)
+            else:
+                data, retryable = await self._fetch(upstream, endpoint, params, priority, timeout)
+
+            if data is not None:
+                self._last_good[key] = data
+                self._last_good.move_to_end(key)
+                if len(self._last_good) > self.LAST_GOOD_SIZE:
+                    self._last_good.popitem(last=False)
+                return data
+
+            failed.add(upstream)
+            if not retryable:
+                break
+
+        return self._serve_last_good(key)
+
+    def _serve_last_good(self, key: tuple):
+        data = self._last_good.get(key)
+        if data is not None:
+            self.request_stats['stale_served'] += 1
+            logger.warning(f"⚠️ Bybit недоступен, отдаём последние данные для {key[0]}")
+        return data
+
+    async def _hedged_fetch(self, upstream, endpoint: str, params: dict, priority: int, timeout: float):
+        """Если ответа нет дольше p95, отправляем копию запроса (по возможности на другой адрес)"""
+        first = asyncio.ensure_future(self._fetch(upstream, endpoint, params, priority, timeout))
+
+        tracker = self._latency.get(endpoint)
+        hedge_after = tracker.percentile(95) if tracker else None
+        if not BYBIT_HEDGE_ENABLED or hedge_after is None or hedge_after >= timeout:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        self.request_stats['hedged'] += 1
+        hedge_upstream = self.endpoints.choose(exclude={upstream}) or upstream
+        pending = {first, asyncio.ensure_future(self._fetch(hedge_upstream, endpoint, params, priority, timeout))}
+        result = (None, True)
         try:
-            session = await self.get_session()
-            url = f"{self.base_url}{endpoint}"
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result[0] is not None:
+                        return result
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch(self, upstream, endpoint: str, params: dict, priority: int, timeout: float):
+        """Одна попытка запроса к одному адресу: (данные или None, можно ли повторить)"""
+        try:
+            # Для пользовательских запросов ожидание в очереди входит в бюджет запроса:
+            # после паузы (403/429) лучше отдать последние данные, чем ждать дольше таймаута.
+            # Фоновые задачи ждут разрешения сколько потребуется
+            queued = time.monotonic()
+            if not await self.rate_limiter.acquire(priority, timeout if priority == PRIORITY_USER else None):
+                self.request_stats['rate_limited'] += 1
+                logger.warning(f"⚠️ Rate limiter: нет разрешения за {timeout}s для {endpoint}")
+                return None, False
+
+            url = f"{upstream.url}{endpoint}"
+            started = time.monotonic()
+            remaining = timeout if priority != PRIORITY_USER else max(timeout - (started - queued), 0.1)
+
+            async with http_transport.get(url, params=params, timeout=aiohttp.ClientTimeout(total=remaining)) as response:
+                self.rate_limiter.update_from_response(response.status, response.headers)
 
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
                 if response.status == 200:
                     data = await response.json()
-                    return data
+                    elapsed = time.monotonic() - started
+                    upstream.record_success(elapsed)
+                    self._latency.setdefault(endpoint, LatencyTracker()).add(elapsed)
+                    return data, False
+
+                upstream.record_failure()
+                if response.status in (403, 429):
+                    # Повтор после паузы RateLimiter; при бане IP (403) повторять бессмысленно
+                    logger.error(f"API rate limit {response.status} on {upstream.url}{endpoint}")
+                    return None, response.status == 429
                 else:
-                    logger.error(f"API error {response.status}")
-                    return None
+                    logger.error(f"API error {response.status} on {upstream.url}")
+                    return None, response.status >= 500
 
         except asyncio.TimeoutError:
-            logger.error(f"Timeout")
-            return None
+            upstream.record_failure()
+            logger.error(f"Timeout {upstream.url}{endpoint} ({timeout}s)")
+            return None, True
+        except asyncio.CancelledError:
+            # Проигравшая хедж-копия: результат не нужен, в ошибки не записываем
+            upstream.breaker.record_cancel()
+            raise
         except Exception as e:
+            upstream.record_failure()
             logger.error(f"Request error: {e}")
-            return None
+            return None, True
+
+    async def get_ticker_snapshot(self):
+        """Общий снимок всех тикеров, обновляется не чаще раза в TICKER_SNAPSHOT_TTL"""
+        snapshot = self.ticker_snapshot
+        if snapshot is not None and snapshot.age() < TICKER_SNAPSHOT_TTL:
+            return snapshot
+
+        async with self._snapshot_lock:
+            # Пока ждали блокировку, снимок мог обновить другой запрос
+            snapshot = self.ticker_snapshot
+            if snapshot is not None and snapshot.age() < TICKER_SNAPSHOT_TTL:
+                return snapshot
+
+            data = await self.make_request("/v5/market/tickers", {"category": "spot"})
+            if data and 'result' in data and 'list' in data['result']:
+                self.ticker_snapshot = TickerSnapshot.from_bybit_list(data['result']['list'])
+            elif snapshot is not None:
+                logger.warning(f"⚠️ Не удалось обновить снимок тикеров, используем данные {snapshot.age():.0f}с назад")
+
+            return self.ticker_snapshot
 
     async def get_all_available_symbols(self):
         """Получить список всех доступных символов на Bybit"""
         try:
-            data = await self.make_request("/v5/market/tickers", {"category": "spot"})
-
-            if not data or 'result' not in data or 'list' not in data['result']:
+            snapshot = await self.get_ticker_snapshot()
+            if snapshot is None:
                 return set()
 
-            symbols = set()
-            for symbol_data in data['result']['list']:
-                symbol = symbol_data.get('symbol', '')
-                if symbol.endswith('USDT'):
-                    symbols.add(symbol)
-
+            symbols = snapshot.usdt_symbols()
             logger.info(f"✅ Загружено {len(symbols)} доступных символов с Bybit")
             return symbols
 
@@ -66,34 +404,27 @@ class BybitService:
             logger.error(f"Error getting available symbols: {e}")
             return set()
 
+    async def is_symbol_available(self, symbol: str) -> bool:
+        """Проверка символа по снимку; без снимка считаем символ допустимым"""
+        snapshot = await self.get_ticker_snapshot()
+        return snapshot is None or symbol in snapshot
+
     async def search_cryptocurrencies(self, query: str):
         try:
-            data = await self.make_request("/v5/market/tickers", {"category": "spot"})
+            query = query.upper()
 
-            if not data or 'result' not in data or 'list' not in data['result']:
-                return []
+            # Сначала ищем в живой таблице WebSocket, затем в общем снимке
+            live_tickers = self.ticker_stream.get_all_tickers()
+            if live_tickers is not None:
+                results = [t for t in live_tickers if query in t['symbol']]
+                results.sort(key=lambda t: t['symbol'])
+                return results[:20]
 
-            all_symbols = data['result']['list']
-            query = query.upper()
+            snapshot = await self.get_ticker_snapshot()
+            if snapshot is None:
+                return []
 
-            results = []
-            for symbol_data in all_symbols:
-                symbol = symbol_data.get('symbol', '')
-                if query in symbol and symbol.endswith('USDT'):
-                    results.append({
-                        'symbol': symbol,
-                        'last_price': float(symbol_data.get('lastPrice', 0)),
-                        'change_24h': float(symbol_data.get('price24hPcnt', 0)) * 100,
-                        'high_24h': float(symbol_data.get('highPrice24h', 0)),
-                        'low_24h': float(symbol_data.get('lowPrice24h', 0)),
-                        'volume_24h': float(symbol_data.get('volume24h', 0)),
-                        'turnover_24h': float(symbol_data.get('turnover24h', 0))
-                    })
-
-                    if len(results) >= 20:
-                        break
-
-            return results
+            return snapshot.search(query, limit=20)
 
         except Exception as e:
             logger.error(f"Search error: {e}")
@@ -101,6 +432,18 @@ class BybitService:
 
     async def get_current_price(self, symbol: str):
         try:
+            live_ticker = self.ticker_stream.get_ticker(symbol)
+            if live_ticker:
+                return dict(live_ticker)
+
+            snapshot = await self.get_ticker_snapshot()
+            if snapshot is not None:
+                ticker = snapshot.get(symbol)
+                # Символ существует - дальше его цену будет обновлять WebSocket
+                if ticker and self.ticker_stream.is_live:
+                    await self.ticker_stream.subscribe([symbol])
+                return ticker
+
             data = await self.make_request("/v5/market/tickers", {
                 "category": "spot",
                 "symbol": symbol
@@ -114,28 +457,27 @@ class BybitService:
             if not ticker_data:
                 return None
 
-            return {
-                'symbol': symbol,
-                'last_price': float(ticker_data.get('lastPrice', 0)),
-                'change_24h': float(ticker_data.get('price24hPcnt', 0)) * 100,
-                'high_24h': float(ticker_data.get('highPrice24h', 0)),
-                'low_24h': float(ticker_data.get('lowPrice24h', 0)),
-                'volume_24h': float(ticker_data.get('volume24h', 0)),
-                'turnover_24h': float(ticker_data.get('turnover24h', 0))
-            }
+            return parse_ticker(symbol, ticker_data)
 
         except Exception as e:
             logger.error(f"Price error: {e}")
             return None
 
-    async def get_kline_data(self, symbol: str, interval: str = "60", limit: int = 200):
+    async def get_kline_data(self, symbol: str, interval: str = "60", limit: int = 200,
+                             start: int = None, end: int = None, priority: int = PRIORITY_USER):
         try:
-            data = await self.make_request("/v5/market/kline", {
+            params = {
                 "category": "spot",
                 "symbol": symbol,
                 "interval": interval,
                 "limit": limit
-            })
+            }
+            if start is not None:
+                params["start"] = start
+            if end is not None:
+                params["end"] = end
+
+            data = await self.make_request("/v5/market/kline", params, priority)
 
             if not data or 'result' not in data or 'list' not in data['result']:
                 return None
@@ -146,132 +488,298 @@ class BybitService:
             logger.error(f"Kline error: {e}")
             return None
 
-    async def get_price_history(self, symbol: str, days: int = 90):
-        try:
-            limit = min(days * 2, 1000)
-
-            klines = await self.get_kline_data(symbol, "D", limit)
+    async def get_candles(self, symbol: str, interval: str, limit: int, priority: int = PRIORITY_USER):
+        """Последние limit свечей: закрытые из локального хранилища + текущая незакрытая
+
+        После первого заполнения хранилища с Bybit докачиваются только свечи
+        начиная с последней сохранённой - обычно это одна текущая незакрытая
+        свеча. Разрыв больше одной страницы докачивается окнами; сохранённая
+        история никогда не перезаписывается. Если Bybit не ответил, отдаются
+        только закрытые свечи.
+        """
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            klines = await self.get_kline_data(symbol, interval, limit, priority=priority)
+            return parse_bybit_klines(klines)[-limit:] if klines else None
+
+        key = (symbol, interval)
+        open_candle = np.empty(0, dtype=KLINE_DTYPE)
+        async with kline_store.lock(symbol, interval):
+            now_ms = int(time.time() * 1000)
+            stored = kline_store.read(symbol, interval)
+
+            if not len(stored) or (self._kline_depth.get(key, 0) < limit and len(stored) < limit - 1):
+                # Хранилище пустое или неглубокое - загружаем последние limit свечей целиком
+                fetched = await self._fetch_candles(symbol, interval, min(limit, 1000), priority=priority)
+                if fetched is None:
+                    return np.asarray(stored[-limit:]) if len(stored) else None
+
+                if len(stored) and len(fetched) and fetched['timestamp'][0] > stored['timestamp'][-1] + interval_ms:
+                    # Между сохранёнными и загруженными свечами разрыв - докачиваем его окнами
+                    gap = await self._fetch_range(symbol, interval, int(stored['timestamp'][-1]) + interval_ms,
+                                                  int(fetched['timestamp'][0]) - interval_ms, priority)
+                    if gap is None:
+                        # Без разрыва ряд не сохраняем, ответ - прямо из загруженных свечей
+                        return np.asarray(fetched[-limit:])
+                    fetched = np.concatenate([gap, fetched])
+
+                open_candle = self._store_closed(symbol, interval, fetched, now_ms, interval_ms, seed=True)
+                self._kline_depth[key] = limit
+
+            else:
+                # Свечи с последней сохранённой: новые закрытые (если есть) и текущая
+                start = int(stored['timestamp'][-1]) + interval_ms
+                missing = (now_ms - start) // interval_ms + 1
+                if missing > 1000:
+                    fetched = await self._fetch_range(symbol, interval, start, start + (missing - 1) * interval_ms, priority)
+                else:
+                    fetched = await self._fetch_candles(symbol, interval, missing, start=start, priority=priority)
+                if fetched is not None:
+                    open_candle = self._store_closed(symbol, interval, fetched, now_ms, interval_ms)
+
+            stored = kline_store.read(symbol, interval)
+
+        keep = max(limit - len(open_candle), 0)
+        candles = np.concatenate([stored[max(len(stored) - keep, 0):], open_candle])
+        return candles if len(candles) else None
+
+    async def _fetch_candles(self, symbol: str, interval: str, limit: int, start: int = None,
+                             priority: int = PRIORITY_USER):
+        klines = await self.get_kline_data(symbol, interval, limit, start=start, priority=priority)
+        return parse_bybit_klines(klines) if klines else None
+
+    @staticmethod
+    def _windows(start_ms: int, end_ms: int, interval_ms: int) -> list:
+        """Окна [start, end] по 1000 свечей от новых к старым"""
+        page = 1000 * interval_ms
+        windows = []
+        window_end = end_ms
+        while window_end >= start_ms:
+            windows.append((max(start_ms, window_end - page + interval_ms), window_end))
+            window_end -= page
+        return windows
+
+    async def _fetch_windows(self, symbol: str, interval: str, windows: list, priority: int,
+                             concurrency: int = KLINE_BACKFILL_CONCURRENCY) -> list:
+        """Загрузить окна (от новых к старым) параллельно, не больше concurrency одновременно
+
+        На месте не загруженного окна - None. Пустое окно значит, что символ
+        тогда ещё не торговался: более старые окна не запрашиваются и считаются пустыми.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        listed_after = [windows[-1][0] if windows else 0]  # старше этой границы у символа свечей нет
+
+        async def fetch_window(window_start: int, window_stop: int):
+            async with semaphore:
+                if window_stop < listed_after[0]:
+                    return np.empty(0, dtype=KLINE_DTYPE)
+                klines = await self.get_kline_data(symbol, interval, 1000, start=window_start, end=window_stop,
+                                                   priority=priority)
+                if klines is None:
+                    logger.warning(f"⚠️ Klines {symbol} {interval}: окно {window_start}-{window_stop} не загружено")
+                    return None
+                candles = parse_bybit_klines(klines)
+                if not len(candles):
+                    listed_after[0] = max(listed_after[0], window_stop)
+                return candles
+
+        return await asyncio.gather(*(fetch_window(ws, we) for ws, we in windows))
+
+    async def _fetch_range(self, symbol: str, interval: str, start_ms: int, end_ms: int,
+                           priority: int = PRIORITY_USER):
+        """Все свечи с start_ms по end_ms по возрастанию или None, если хоть одно окно не загрузилось"""
+        pages = await self._fetch_windows(symbol, interval, self._windows(start_ms, end_ms, INTERVAL_MS[interval]),
+                                          priority)
+        if any(page is None for page in pages):
+            return None
 
-            if not klines:
+        candles = np.concatenate(pages[::-1]) if pages else np.empty(0, dtype=KLINE_DTYPE)
+        _, unique_index = np.unique(candles['timestamp'], return_index=True)
+        return candles[unique_index]
+
+    @staticmethod
+    def _store_closed(symbol: str, interval: str, candles: np.ndarray, now_ms: int, interval_ms: int,
+                      seed: bool = False) -> np.ndarray:
+        """Сохранить закрытые свечи, вернуть текущую незакрытую (0 или 1 элемент)
+
+        seed - загрузка последних свечей целиком: сливается с историей, а не дописывается в конец.
+        """
+        is_closed = candles['timestamp'] + interval_ms <= now_ms
+        closed = candles[is_closed]
+
+        if len(closed) and seed:
+            kline_store.merge(symbol, interval, closed)
+        elif len(closed):
+            kline_store.append(symbol, interval, closed)
+
+        return candles[~is_closed][-1:]
+
+    async def backfill_klines(self, symbol: str, interval: str = "60", days: int = 365,
+                              concurrency: int = KLINE_BACKFILL_CONCURRENCY) -> int:
+        """Догрузить историю в локальное хранилище на days дней назад
+
+        Окна по 1000 свечей идут назад от самой старой сохранённой свечи и
+        запрашиваются параллельно (не больше concurrency одновременно).
+        Возвращает количество добавленных свечей.
+        """
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            raise ValueError(f"Interval {interval} is not supported by the kline store")
+
+        # Сначала докачиваем свежие свечи, чтобы ряд был непрерывным до текущего момента
+        await self.get_candles(symbol, interval, 2)
+
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - days * 86_400_000
+        first_ts = kline_store.read(symbol, interval)['timestamp'][:1]
+        end_ms = int(first_ts[0]) - interval_ms if len(first_ts) else now_ms - now_ms % interval_ms - interval_ms
+
+        windows = self._windows(start_ms, end_ms, interval_ms)
+        if not windows:
+            return 0
+
+        pages = await self._fetch_windows(symbol, interval, windows, PRIORITY_BACKGROUND, concurrency)
+        pages = [p for p in pages if p is not None and len(p)]
+        if not pages:
+            return 0
+
+        candles = np.concatenate(pages)
+        _, unique_index = np.unique(candles['timestamp'], return_index=True)
+        candles = candles[unique_index]
+        candles = candles[candles['timestamp'] + interval_ms <= now_ms]
+
+        async with kline_store.lock(symbol, interval):
+            added = kline_store.merge(symbol, interval, candles)
+
+        logger.info(f"✅ Backfill {symbol} {interval}: +{added} свечей ({len(windows)} окон)")
+        return added
+
+    async def get_live_indicators(self, symbol: str, interval: str = "D"):
+        """Текущие индикаторы из потокового состояния (O(1) на тик и закрытую свечу)
+
+        Пока WebSocket жив и свеча не закрылась, ответ строится без запросов к
+        Bybit. Иначе состояние догоняется по закрытым свечам из хранилища.
+        """
+        try:
+            interval_ms = INTERVAL_MS.get(interval)
+            state = self.streaming_indicators.get(symbol, interval)
+            if (state is not None and interval_ms is not None and state.last_timestamp is not None
+                    and self.ticker_stream.get_ticker(symbol) and not state.is_stale()):
+                return state.snapshot()
+
+            candles = await self.get_candles(symbol, interval, HISTORY_WINDOW)
+            if candles is None or not len(candles):
                 return None
 
-            prices = []
-            timestamps = []
-
-            for kline in reversed(klines):
-                try:
-                    timestamp = int(kline[0])
-                    close_price = float(kline[4])
-
-                    prices.append(close_price)
-                    timestamps.append(timestamp)
-
-                except (IndexError, ValueError) as e:
-                    continue
+            if interval_ms is not None:
+                closed = kline_store.read(symbol, interval)
+                if len(closed):
+                    open_candles = candles[candles['timestamp'] > closed['timestamp'][-1]]
+                else:
+                    closed, open_candles = candles[:-1], candles[-1:]
+            else:
+                closed, open_candles = candles[:-1], candles[-1:]
 
-            return {
-                'prices': prices,
-                'timestamps': timestamps
-            }
+            state = self.streaming_indicators.sync(symbol, interval, closed, interval_ms)
+            if len(open_candles):
+                state.on_tick(float(open_candles['close'][-1]))
+            return state.snapshot()
 
         except Exception as e:
-            logger.error(f"History error: {e}")
+            logger.error(f"Live indicators error: {e}")
             return None
 
-    async def calculate_technical_indicators(self, prices: list):
-        try:
-            if len(prices) < 2:
-                return {
-                    'sma_20': prices[-1] if prices else 0,
-                    'ema_12': prices[-1] if prices else 0,
-                    'rsi': 50,
-                    'macd': 0,
-                    'signal': 0,
-                    'histogram': 0
-                }
-
-            prices_array = np.array(prices, dtype=float)
-
-            sma_20 = np.mean(prices_array[-20:]) if len(prices_array) >= 20 else np.mean(prices_array)
-            ema_12 = self.calculate_ema(prices_array, 12)
-            rsi = self.calculate_rsi(prices_array)
-            macd, signal, histogram = self.calculate_macd(prices_array)
-
-            return {
-                'sma_20': float(sma_20),
-                'ema_12': float(ema_12),
-                'rsi': float(rsi),
-                'macd': float(macd),
-                'signal': float(signal),
-                'histogram': float(histogram)
-            }
-
-        except Exception as e:
-            logger.error(f"Indicators error: {e}")
-            return {
-                'sma_20': prices[-1] if prices else 0,
-                'ema_12': prices[-1] if prices else 0,
-                'rsi': 50,
-                'macd': 0,
-                'signal': 0,
-                'histogram': 0
-            }
-
-    def calculate_ema(self, prices: np.ndarray, period: int) -> float:
-        if len(prices) < period:
-            return float(prices[-1]) if len(prices) > 0 else 0
-
-        weights = np.exp(np.linspace(-1, 0, period))
-        weights /= weights.sum()
-
-        return float(np.convolve(prices, weights, mode='valid')[-1])
-
-    def calculate_rsi(self, prices: np.ndarray, period: int = 14) -> float:
-        if len(prices) < period + 1:
-            return 50.0
-
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-
-        avg_gain = np.mean(gains[-period:])
-        avg_loss = np.mean(losses[-period:])
-
-        if avg_loss == 0:
-            return 100.0 if avg_gain > 0 else 50.0
-
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-
-        return float(rsi)
-
-    def calculate_macd(self, prices: np.ndarray) -> tuple:
-        if len(prices) < 26:
-            return 0, 0, 0
+    def get_closed_indicators(self, symbol: str, interval: str, prices: np.ndarray, timestamps: np.ndarray) -> dict:
+        """Метрики batch_metrics по закрытым свечам истории, один расчёт на закрытие свечи
+
+        Незакрытая текущая свеча в расчёт не входит, поэтому результат кэшируется
+        по времени последней закрытой свечи и делится между эндпоинтами.
+        """
+        def compute(closes: np.ndarray) -> dict:
+            metrics = indicators.batch_metrics(closes[np.newaxis, :])
+            return {name: float(values[0]) for name, values in metrics.items()}
+
+        interval_ms = INTERVAL_MS.get(interval)
+        closed = timestamps + interval_ms <= time.time() * 1000 if interval_ms else np.zeros(len(prices), bool)
+        if not closed.any():
+            return compute(np.asarray(prices, dtype=float))
+
+        closes = np.asarray(prices[closed], dtype=float)
+        last_closed = int(timestamps[closed][-1])
+        return self.indicator_cache.get_or_compute(symbol, interval, last_closed, lambda: compute(closes))
+
+    async def build_indicator_table(self, interval: str = INDICATOR_TABLE_INTERVAL, window: int = HISTORY_WINDOW):
+        """Пересчитать таблицу индикаторов по всем USDT парам одним векторным проходом
+
+        Свечи берутся через get_candles (хранилище + докачка только новых) с
+        фоновым приоритетом, поэтому пользовательские запросы идут вперёд.
+        """
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            raise ValueError(f"Interval {interval} is not supported by the kline store")
+
+        snapshot = await self.get_ticker_snapshot()
+        if snapshot is None:
+            return None
 
-        ema_12 = self.calculate_ema(prices, 12)
-        ema_26 = self.calculate_ema(prices, 26)
+        symbols = sorted(snapshot.usdt_symbols())
+        semaphore = asyncio.Semaphore(KLINE_BACKFILL_CONCURRENCY)
+
+        async def load(symbol: str):
+            async with semaphore:
+                return await self.get_candles(symbol, interval, window, priority=PRIORITY_BACKGROUND)
+
+        results = await asyncio.gather(*(load(symbol) for symbol in symbols), return_exceptions=True)
+        candles = {
+            symbol: result for symbol, result in zip(symbols, results)
+            if isinstance(result, np.ndarray) and len(result)
+        }
+
+        # Батч метрик по всей вселенной считается в пуле аналитики, не блокируя event loop
+        table_symbols, closes = IndicatorTable.align(candles, interval_ms, window)
+        metrics = await analytics_pool.run(indicators.batch_metrics, closes)
+        table = IndicatorTable.from_metrics(table_symbols, metrics, interval, tickers=snapshot)
+        self.indicator_table = table
+        return table
+
+    async def _indicator_table_loop(self, interval: str, refresh_seconds: int):
+        while True:
+            try:
+                started = time.time()
+                table = await self.build_indicator_table(interval)
+                if table is not None:
+                    logger.info(f"✅ Таблица индикаторов {interval}: {len(table)} символов "
+                                f"за {time.time() - started:.1f}с")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Indicator table error: {e}")
+
+            await asyncio.sleep(refresh_seconds)
+
+    def start_indicator_table_job(self, interval: str = INDICATOR_TABLE_INTERVAL,
+                                  refresh_seconds: int = INDICATOR_TABLE_REFRESH_SECONDS):
+        """Фоновое обновление таблицы индикаторов раз в refresh_seconds"""
+        if self._indicator_table_task is None or self._indicator_table_task.done():
+            self._indicator_table_task = asyncio.create_task(self._indicator_table_loop(interval, refresh_seconds))
 
-        macd_line = ema_12 - ema_26
+    async def get_price_history(self, symbol: str, days: int = 90):
+        try:
+            limit = min(days * 2, 1000)
 
-        macd_values = []
-        for i in range(min(9, len(prices))):
-            start_idx = max(0, len(prices) - 26 - i)
-            end_idx = len(prices) - i
-            if end_idx - start_idx >= 26:
-                window_prices = prices[start_idx:end_idx]
-                window_ema_12 = self.calculate_ema(window_prices, 12)
-                window_ema_26 = self.calculate_ema(window_prices, 26)
-                macd_values.append(window_ema_12 - window_ema_26)
+            candles = await self.get_candles(symbol, "D", limit)
 
-        if macd_values:
-            signal_line = np.mean(macd_values)
-        else:
-            signal_line = macd_line
+            if candles is None or not len(candles):
+                return None
 
-        histogram = macd_line - signal_line
+            return {
+                'prices': np.ascontiguousarray(candles['close']),
+                'timestamps': np.ascontiguousarray(candles['timestamp'])
+            }
 
-        return macd_line, signal_line, histogram
+        except Exception as e:
+            logger.error(f"History error: {e}")
+            return None
 
 
 bybit_service = BybitService()
\ No newline at end of file
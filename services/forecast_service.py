@@ -0,0 +1,180 @@
+import time
+import asyncio
+import logging
+import numpy as np
+
+from config import POPULAR_CRYPTOS, FORECAST_PREWARM_DELAY_SECONDS, SEQUENCE_MODEL_ENABLED
+from models.simulation import simulated_forecast, batch_simulated_forecast
+from models.sequence_model import model_registry, sequence_forecast
+from services.analytics_pool import analytics_pool
+from services.bybit_service import bybit_service
+from services.kline_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = INTERVAL_MS['D']
+
+
+class ForecastService:
+    """Ensemble прогнозы по закрытым дневным свечам
+
+    Вход прогноза меняется раз в сутки, поэтому результат хранится по ключу
+    (символ, время последней закрытой дневной свечи) вместе с Monte Carlo
+    полосами (p5..p95 по дням) и прогнозом обученной GRU модели, если для
+    группы символа есть активная версия. Популярные символы
+    пересчитываются одним батчем сразу после закрытия дня, остальные - лениво
+    при первом запросе.
+    """
+
+    HISTORY_DAYS = 90
+    FUTURE_STEPS = 7
+
+    def __init__(self):
+        self._forecasts = {}
+        self._prewarm_task = None
+        self.stats = {'hits': 0, 'misses': 0, 'prewarmed': 0}
+
+    @staticmethod
+    def expected_last_closed(now_ms: int = None) -> int:
+        """Время открытия последней закрытой дневной свечи (UTC)"""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return (now_ms // DAY_MS - 1) * DAY_MS
+
+    async def _closed_history(self, symbol: str):
+        history = await bybit_service.get_price_history(symbol, days=self.HISTORY_DAYS)
+        if not history or not len(history['prices']):
+            return None
+
+        closed = history['timestamps'] + DAY_MS <= time.time() * 1000
+        if not closed.any():
+            return None
+        return history['prices'][closed], history['timestamps'][closed]
+
+    @staticmethod
+    def _entry(prices: np.ndarray, timestamps: np.ndarray, predictions: np.ndarray, confidence: float,
+               bands: np.ndarray, terminal: np.ndarray, sequence: np.ndarray = None,
+               model_version: str = None) -> dict:
+        return {
+            'prices': prices,
+            'timestamps': timestamps,
+            'last_closed': int(timestamps[-1]),
+            'predictions': np.asarray(predictions, dtype=float),
+            'confidence': float(confidence),
+            'bands': bands,
+            'terminal_quantiles': terminal,
+            'sequence_predictions': sequence,
+            'model_version': model_version,
+            'created_at': time.time(),
+        }
+
+    @staticmethod
+    def _seed(last_closed: int) -> int:
+        """Симуляция воспроизводима для одной и той же закрытой свечи"""
+        return last_closed // DAY_MS
+
+    @staticmethod
+    async def _sequence_forecast(symbols: list, matrix: np.ndarray) -> tuple:
+        """Прогнозы GRU (строка None - у символа нет модели); без моделей пул не трогаем
+
+        Стадия необязательная: ошибка registry или файлов модели не должна
+        отменять уже посчитанный ensemble прогноз.
+        """
+        empty = [None] * len(symbols), [None] * len(symbols)
+        try:
+            if not SEQUENCE_MODEL_ENABLED or all(model_registry.group_for(symbol) is None for symbol in symbols):
+                return empty
+
+            predictions, versions = await analytics_pool.run(sequence_forecast, symbols, matrix)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Sequence model error: {e}")
+            return empty
+
+        rows = [None if version is None else predictions[i] for i, version in enumerate(versions)]
+        return rows, versions
+
+    async def get_forecast(self, symbol: str):
+        """Прогноз по закрытым свечам: из памяти, пока не закрылась новая дневная свеча"""
+        entry = self._forecasts.get(symbol)
+        if entry is not None and entry['last_closed'] >= self.expected_last_closed():
+            self.stats['hits'] += 1
+            return entry
+
+        closed = await self._closed_history(symbol)
+        if closed is None:
+            return entry
+
+        prices, timestamps = closed
+        entry = self._forecasts.get(symbol)
+        if entry is not None and entry['last_closed'] == int(timestamps[-1]):
+            # Новая свеча на бирже ещё не появилась - прогноз прежний
+            self.stats['hits'] += 1
+            return entry
+
+        self.stats['misses'] += 1
+        predictions, confidence, bands, terminal = await analytics_pool.run(
+            simulated_forecast, prices, self.FUTURE_STEPS, self._seed(int(timestamps[-1])))
+        sequence, versions = await self._sequence_forecast([symbol], prices[np.newaxis])
+        entry = self._entry(prices, timestamps, predictions, confidence, bands, terminal, sequence[0], versions[0])
+        self._forecasts[symbol] = entry
+        return entry
+
+    async def prewarm(self, symbols: list) -> int:
+        """Пересчитать прогнозы символов батчем (ряды одинаковой длины - одним вызовом)"""
+        histories = await asyncio.gather(*(self._closed_history(symbol) for symbol in symbols))
+
+        groups = {}
+        for symbol, closed in zip(symbols, histories):
+            if closed is not None and len(closed[0]) >= 10:
+                groups.setdefault(len(closed[0]), []).append((symbol, closed))
+
+        warmed = 0
+        for items in groups.values():
+            matrix = np.vstack([prices for _, (prices, _) in items])
+            seed = self._seed(max(int(timestamps[-1]) for _, (_, timestamps) in items))
+            predictions, confidence, bands, terminal = await analytics_pool.run(
+                batch_simulated_forecast, matrix, self.FUTURE_STEPS, seed)
+            sequence, versions = await self._sequence_forecast([symbol for symbol, _ in items], matrix)
+            for i, (symbol, (prices, timestamps)) in enumerate(items):
+                self._forecasts[symbol] = self._entry(prices, timestamps, predictions[i], confidence[i],
+                                                      bands[i], terminal[i], sequence[i], versions[i])
+                warmed += 1
+
+        self.stats['prewarmed'] += warmed
+        return warmed
+
+    async def _prewarm_loop(self, symbols: list):
+        while True:
+            try:
+                warmed = await self.prewarm(symbols)
+                logger.info(f"✅ Прогнозы пересчитаны для {warmed} символов")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Forecast prewarm error: {e}")
+
+            # Следующий пересчёт - после закрытия дневной свечи (00:00 UTC)
+            now_ms = time.time() * 1000
+            next_close_ms = (now_ms // DAY_MS + 1) * DAY_MS
+            await asyncio.sleep((next_close_ms - now_ms) / 1000 + FORECAST_PREWARM_DELAY_SECONDS)
+
+    def start_prewarm_job(self, symbols: list = None):
+        symbols = symbols or [crypto['symbol'] for crypto in POPULAR_CRYPTOS]
+        if self._prewarm_task is None or self._prewarm_task.done():
+            self._prewarm_task = asyncio.create_task(self._prewarm_loop(symbols))
+
+    async def stop(self):
+        if self._prewarm_task:
+            self._prewarm_task.cancel()
+            try:
+                await self._prewarm_task
+            except asyncio.CancelledError:
+                pass
+            self._prewarm_task = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'cached': len(self._forecasts)}
+
+
+forecast_service = ForecastService()
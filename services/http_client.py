@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import aiohttp
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from config import (HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_HOST_LIMITS,
+                    HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+class HttpTransport:
+    """Общий пул HTTP соединений для всех исходящих запросов приложения
+
+    Одна aiohttp.ClientSession: keep-alive, кэш DNS и лимиты соединений на
+    хост. Создаётся в lifespan FastAPI (или лениво - в скриптах и боте).
+    """
+
+    def __init__(self):
+        self.session = None
+        self._host_limits = {}
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+            logger.info("✅ HTTP пул соединений создан")
+        return self.session
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            await self.start()
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def _host_semaphore(self, url: str):
+        host = urlsplit(url).hostname or ''
+        limit = HTTP_HOST_LIMITS.get(host)
+        if limit is None:
+            return None
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(limit)
+        return self._host_limits[host]
+
+    @asynccontextmanager
+    async def get(self, url: str, **kwargs):
+        """GET через общий пул; для хостов из HTTP_HOST_LIMITS - свой лимит параллельных запросов"""
+        session = await self.get_session()
+        semaphore = self._host_semaphore(url)
+
+        if semaphore is None:
+            async with session.get(url, **kwargs) as response:
+                yield response
+        else:
+            async with semaphore:
+                async with session.get(url, **kwargs) as response:
+                    yield response
+
+    async def get_json(self, url: str, params: dict = None, timeout: float = 10, headers: dict = None):
+        """(status, json или None)"""
+        async with self.get(url, params=params, headers=headers,
+                            timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            data = await response.json(content_type=None) if response.status == 200 else None
+            return response.status, data
+
+    async def get_bytes(self, url: str, timeout: float = 10):
+        """(status, содержимое или None)"""
+        async with self.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            data = await response.read() if response.status == 200 else None
+            return response.status, data
+
+
+http_transport = HttpTransport()
@@ -0,0 +1,49 @@
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class IndicatorCache:
+    """Индикаторы по закрытым свечам, общие для всех эндпоинтов
+
+    Ключ - (символ, интервал, время последней закрытой свечи). Пока новая свеча
+    не закрылась, результат не меняется и берётся из памяти; закрытие свечи
+    меняет ключ, и старое значение просто вытесняется.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, symbol: str, interval: str, last_closed: int):
+        entry = self._entries.get((symbol, interval))
+        if entry is None or entry[0] != last_closed:
+            return None
+        self._entries.move_to_end((symbol, interval))
+        return entry[1]
+
+    def put(self, symbol: str, interval: str, last_closed: int, value):
+        self._entries[(symbol, interval)] = (last_closed, value)
+        self._entries.move_to_end((symbol, interval))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, symbol: str, interval: str, last_closed: int, compute):
+        value = self.get(symbol, interval, last_closed)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.put(symbol, interval, last_closed, value)
+        return value
+
+    def get_stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
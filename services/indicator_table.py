@@ -0,0 +1,127 @@
+import time
+import logging
+import numpy as np
+
+from services.indicators import BATCH_METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class IndicatorTable:
+    """Предрассчитанные индикаторы по всем USDT парам одного интервала
+
+    Закрытия всех символов собираются в матрицу (N, T), выровненную по времени,
+    и метрики считаются одним векторным вызовом batch_metrics. Обзор рынка и
+    скринер читают готовую таблицу из памяти. Для каждой колонки заранее
+    построен отсортированный индекс: диапазонный фильтр - это searchsorted,
+    сортировка - готовая перестановка.
+    """
+
+    TICKER_COLUMNS = ('change_24h', 'volume_24h', 'turnover_24h')
+    COLUMNS = BATCH_METRICS + TICKER_COLUMNS
+
+    # Готовые сценарии скринера: фильтры {колонка: (min, max)} и сортировка
+    PRESETS = {
+        'oversold': {'filters': {'rsi': (None, 30)}, 'sort': 'rsi', 'descending': False},
+        'overbought': {'filters': {'rsi': (70, None)}, 'sort': 'rsi', 'descending': True},
+        'top_gainers': {'filters': {}, 'sort': 'change_24h', 'descending': True},
+        'top_losers': {'filters': {}, 'sort': 'change_24h', 'descending': False},
+        'high_volatility': {'filters': {}, 'sort': 'volatility', 'descending': True},
+        'breakouts': {'filters': {'trend_strength': (0, None)}, 'sort': 'volatility', 'descending': True},
+    }
+
+    def __init__(self, symbols: np.ndarray, values: np.ndarray, interval: str, created_at: float = None):
+        self.symbols = symbols
+        self.values = values
+        self.interval = interval
+        self.created_at = created_at or time.time()
+        self._index = {symbol: i for i, symbol in enumerate(symbols.tolist())}
+
+        self._order = {}
+        self._sorted = {}
+        for j, name in enumerate(self.COLUMNS):
+            order = np.argsort(values[:, j], kind='stable')
+            self._order[name] = order
+            self._sorted[name] = values[order, j]
+
+    @staticmethod
+    def align(candles: dict, interval_ms: int, window: int) -> tuple:
+        """(символы, закрытия (N, window)) на общей сетке времени; пропуски - NaN
+
+        candles: {символ: массив KLINE_DTYPE по возрастанию времени}
+        """
+        symbols = sorted(symbol for symbol, rows in candles.items() if rows is not None and len(rows))
+        closes = np.full((len(symbols), window), np.nan)
+
+        if symbols:
+            end_ts = max(int(candles[symbol]['timestamp'][-1]) for symbol in symbols)
+            grid_start = end_ts - (window - 1) * interval_ms
+            for i, symbol in enumerate(symbols):
+                rows = candles[symbol]
+                column = (rows['timestamp'] - grid_start) // interval_ms
+                inside = (column >= 0) & (column < window)
+                closes[i, column[inside]] = rows['close'][inside]
+
+        return symbols, closes
+
+    @classmethod
+    def from_metrics(cls, symbols: list, metrics: dict, interval: str, tickers=None) -> 'IndicatorTable':
+        """Таблица из результата batch_metrics (дополняется полями тикеров)"""
+        for name in cls.TICKER_COLUMNS:
+            metrics[name] = np.zeros(len(symbols))
+            if tickers is not None and len(tickers):
+                # Символы снимка отсортированы - сопоставляем бинарным поиском
+                positions = np.minimum(np.searchsorted(tickers.symbols, symbols), len(tickers) - 1)
+                found = tickers.symbols[positions] == np.array(symbols, dtype=str)
+                metrics[name][found] = tickers.column(name)[positions[found]]
+
+        values = np.column_stack([metrics[name] for name in cls.COLUMNS]) if symbols \
+            else np.empty((0, len(cls.COLUMNS)))
+
+        # Символы, у которых в окне нет ни одной свечи, в таблицу не попадают
+        valid = ~np.isnan(values).any(axis=1)
+        return cls(np.array(symbols, dtype=str)[valid], values[valid], interval)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str):
+        return symbol in self._index
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.COLUMNS.index(name)]
+
+    def _row(self, i: int) -> dict:
+        row = {'symbol': str(self.symbols[i])}
+        row.update(zip(self.COLUMNS, self.values[i].tolist()))
+        return row
+
+    def screen(self, filters: dict = None, sort: str = 'turnover_24h', descending: bool = True,
+               limit: int = 50) -> list:
+        """Строки, прошедшие фильтры {колонка: (min, max)}, отсортированные по sort
+
+        Границы включительные, None - без ограничения. Каждый фильтр - два
+        бинарных поиска по отсортированному индексу колонки.
+        """
+        n = len(self.symbols)
+        mask = np.ones(n, dtype=bool)
+
+        for name, (low, high) in (filters or {}).items():
+            sorted_values = self._sorted[name]
+            left = np.searchsorted(sorted_values, low, side='left') if low is not None else 0
+            right = np.searchsorted(sorted_values, high, side='right') if high is not None else n
+            selected = np.zeros(n, dtype=bool)
+            selected[self._order[name][left:right]] = True
+            mask &= selected
+
+        order = self._order[sort]
+        if descending:
+            order = order[::-1]
+        return self.rows(order[mask[order]][:limit])
+
+    def rows(self, indices=None) -> list:
+        indices = range(len(self.symbols)) if indices is None else indices
+        return [self._row(i) for i in indices]
@@ -0,0 +1,167 @@
+"""
+Векторный движок технических индикаторов
+
+Все функции считают полный ряд за один проход и работают по последней оси:
+на вход можно подать одну серию (T,) или матрицу (N, T) с выровненными рядами.
+Значения, для которых не хватает истории, равны NaN. Рекурсивные фильтры
+(EMA, сглаживание Уайлдера) считаются через scipy.signal.lfilter.
+"""
+
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+
+def _recursive_mean(values: np.ndarray, alpha: float, period: int, start: int = 0) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1], начальное значение - SMA первых period точек"""
+    out = np.full(values.shape, np.nan)
+    first = start + period - 1
+    if values.shape[-1] <= first:
+        return out
+
+    seed = values[..., start:first + 1].mean(axis=-1)
+    out[..., first] = seed
+
+    rest = values[..., first + 1:]
+    if rest.shape[-1]:
+        zi = np.asarray((1 - alpha) * seed)[..., np.newaxis]
+        out[..., first + 1:], _ = lfilter([alpha], [1, alpha - 1], rest, axis=-1, zi=zi)
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < period:
+        return out
+
+    csum = np.cumsum(values, axis=-1)
+    out[..., period - 1] = csum[..., period - 1]
+    out[..., period:] = csum[..., period:] - csum[..., :-period]
+    return out / period
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return _recursive_mean(values, 2.0 / (period + 1), period)
+
+
+def macd(values: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
+    """(линия MACD, сигнальная линия EMA-9 от MACD, гистограмма)"""
+    values = np.asarray(values, dtype=float)
+    macd_line = ema(values, fast) - ema(values, slow)
+    signal_line = _recursive_mean(np.nan_to_num(macd_line), 2.0 / (signal + 1), signal, start=slow - 1)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI Уайлдера (сглаживание 1/period)"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] <= period:
+        return out
+
+    deltas = np.diff(values, axis=-1)
+    avg_gain = _recursive_mean(np.clip(deltas, 0, None), 1.0 / period, period)
+    avg_loss = _recursive_mean(np.clip(-deltas, 0, None), 1.0 / period, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi_values = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi_values = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi_values)
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, rsi_values)
+    return out
+
+
+def bollinger_bands(values: np.ndarray, period: int = 20, num_std: float = 2.0) -> tuple:
+    """(средняя, верхняя, нижняя полоса)"""
+    values = np.asarray(values, dtype=float)
+    middle = sma(values, period)
+    deviation = np.full(values.shape, np.nan)
+    if values.shape[-1] >= period:
+        deviation[..., period - 1:] = sliding_window_view(values, period, axis=-1).std(axis=-1)
+    return middle, middle + num_std * deviation, middle - num_std * deviation
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average True Range со сглаживанием Уайлдера"""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    true_range = high - low
+    if close.shape[-1] > 1:
+        prev_close = close[..., :-1]
+        true_range[..., 1:] = np.maximum.reduce([
+            high[..., 1:] - low[..., 1:],
+            np.abs(high[..., 1:] - prev_close),
+            np.abs(low[..., 1:] - prev_close),
+        ])
+    return _recursive_mean(true_range, 1.0 / period, period)
+
+
+def compute_all(close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None) -> dict:
+    """Все ряды индикаторов для графиков одним вызовом"""
+    macd_line, signal_line, histogram = macd(close)
+    middle, upper, lower = bollinger_bands(close)
+    series = {
+        'sma_20': sma(close, 20),
+        'ema_12': ema(close, 12),
+        'ema_26': ema(close, 26),
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_histogram': histogram,
+        'rsi': rsi(close),
+        'bb_middle': middle,
+        'bb_upper': upper,
+        'bb_lower': lower,
+    }
+    if high is not None and low is not None:
+        series['atr'] = atr(high, low, close)
+    return series
+
+
+BATCH_METRICS = ('price', 'rsi', 'volatility', 'trend_strength', 'ma_7', 'ma_25', 'ma_50', 'support', 'resistance')
+
+
+def batch_metrics(closes: np.ndarray, levels_window: int = 20) -> dict:
+    """Метрики get_crypto_data для N символов сразу: closes (N, T) -> {метрика: (N,)}
+
+    Ряды выровнены по времени справа; у символов с короткой историей начало
+    заполнено NaN. Для RSI пропуски заменяются первой известной ценой
+    (нулевые изменения), остальные метрики считаются только по известным точкам.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=float))
+    n, length = closes.shape
+    rows = np.arange(n)
+
+    known = ~np.isnan(closes)
+    has_data = known.any(axis=1)
+    first_index = np.argmax(known, axis=1)
+    first = closes[rows, first_index]
+    last = closes[rows, length - 1 - np.argmax(known[:, ::-1], axis=1)]
+
+    filled = np.where(known, closes, first[:, np.newaxis])
+    rsi_values = rsi(filled)[:, -1] if length else np.full(n, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        returns = np.diff(closes, axis=1) / closes[:, :-1] * 100
+        metrics = {
+            'price': last,
+            'rsi': np.where(np.isnan(rsi_values), 50.0, rsi_values),
+            'volatility': np.nan_to_num(np.nanstd(returns, axis=1)) if length > 1 else np.zeros(n),
+            'trend_strength': np.nan_to_num((last - first) / first * 100),
+            'ma_7': np.nanmean(closes[:, -7:], axis=1),
+            'ma_25': np.nanmean(closes[:, -25:], axis=1),
+            'ma_50': np.nanmean(closes[:, -50:], axis=1),
+            'support': np.nanmin(closes[:, -levels_window:], axis=1),
+            'resistance': np.nanmax(closes[:, -levels_window:], axis=1),
+        }
+
+    # Символы без данных в хвосте окна получают последнюю известную цену
+    for name in ('ma_7', 'ma_25', 'ma_50', 'support', 'resistance'):
+        metrics[name] = np.where(np.isnan(metrics[name]), last, metrics[name])
+    for name in metrics:
+        metrics[name][~has_data] = np.nan
+    return metrics
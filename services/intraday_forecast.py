@@ -0,0 +1,146 @@
+import time
+import asyncio
+import logging
+
+from config import (POPULAR_CRYPTOS, KLINE_BACKFILL_CONCURRENCY, ONLINE_MODEL_INTERVALS, ONLINE_MODEL_LAGS,
+                    ONLINE_MODEL_FORGETTING, ONLINE_MODEL_CHECKPOINT_DIR, ONLINE_MODEL_CHECKPOINT_SECONDS)
+from models.online_model import OnlineModelRegistry
+from services.bybit_service import bybit_service
+from services.kline_store import kline_store, INTERVAL_MS
+from services.rate_limiter import PRIORITY_USER, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class IntradayForecastService:
+    """Внутридневные прогнозы онлайн моделью RLS (1h, 15m)
+
+    Модель каждого символа обновляется за O(1) на закрытую свечу: после
+    закрытия свечи фоновая задача докачивает только новые свечи в хранилище и
+    подаёт их в модели отслеживаемых символов. Прогноз на запрос - несколько
+    скалярных произведений без дообучения. Состояние периодически
+    сохраняется на диск и поднимается при старте.
+    """
+
+    CLOSE_DELAY_SECONDS = 5
+
+    def __init__(self, intervals: list = ONLINE_MODEL_INTERVALS, directory: str = ONLINE_MODEL_CHECKPOINT_DIR):
+        self.intervals = [interval for interval in intervals if interval in INTERVAL_MS]
+        self.directory = directory
+        self.models = OnlineModelRegistry(ONLINE_MODEL_LAGS, ONLINE_MODEL_FORGETTING)
+        self._task = None
+        self._last_checkpoint = time.time()
+        self.stats = {'forecasts': 0, 'syncs': 0, 'refreshed': 0, 'checkpoints': 0}
+
+    async def _sync(self, symbol: str, interval: str, priority: int = PRIORITY_USER):
+        """Догнать модель по хранилищу (get_candles докачивает только новые закрытые свечи)"""
+        await bybit_service.get_candles(symbol, interval, self.models.WARMUP_CANDLES, priority=priority)
+        closed = kline_store.read(symbol, interval)
+        if not len(closed):
+            return None
+        self.stats['syncs'] += 1
+        return self.models.sync(symbol, interval, closed, INTERVAL_MS[interval])
+
+    async def get_forecast(self, symbol: str, interval: str = '60', steps: int = 12):
+        """Прогноз закрытий следующих steps свечей; None - модели не хватает истории"""
+        if interval not in self.intervals:
+            raise ValueError(f"Interval {interval} is not served by the online model")
+
+        interval_ms = INTERVAL_MS[interval]
+        model = self.models.get(symbol, interval)
+        if model is None or model.last_timestamp + 2 * interval_ms <= time.time() * 1000:
+            model = await self._sync(symbol, interval)
+        if model is None or not model.ready:
+            return None
+
+        self.stats['forecasts'] += 1
+        forecast = model.forecast(steps)
+        return {
+            'interval': interval,
+            'last_closed': model.last_timestamp,
+            'last_close': model.last_close,
+            'timestamps': [model.last_timestamp + interval_ms * (i + 1) for i in range(steps)],
+            'predictions': forecast['predictions'].tolist(),
+            'lower': forecast['lower'].tolist(),
+            'upper': forecast['upper'].tolist(),
+            'updates': model.updates,
+        }
+
+    async def refresh(self, interval: str, symbols: list = None) -> int:
+        """Подать новые закрытые свечи в модели символов интервала (фоновый приоритет)"""
+        symbols = symbols or sorted(set(self.models.symbols(interval)) |
+                                    {crypto['symbol'] for crypto in POPULAR_CRYPTOS})
+        semaphore = asyncio.Semaphore(KLINE_BACKFILL_CONCURRENCY)
+
+        async def sync(symbol: str):
+            async with semaphore:
+                return await self._sync(symbol, interval, PRIORITY_BACKGROUND)
+
+        results = await asyncio.gather(*(sync(symbol) for symbol in symbols), return_exceptions=True)
+        refreshed = sum(1 for result in results if result is not None and not isinstance(result, Exception))
+        self.stats['refreshed'] += refreshed
+        return refreshed
+
+    def load_checkpoints(self) -> int:
+        loaded = 0
+        for interval in self.intervals:
+            try:
+                loaded += self.models.load(self.directory, interval)
+            except Exception as e:
+                logger.error(f"Online model checkpoint load error ({interval}): {e}")
+        if loaded:
+            logger.info(f"✅ Онлайн модели загружены: {loaded}")
+        return loaded
+
+    def save_checkpoints(self) -> int:
+        saved = 0
+        for interval in self.intervals:
+            try:
+                saved += self.models.save(self.directory, interval)
+            except Exception as e:
+                logger.error(f"Online model checkpoint save error ({interval}): {e}")
+        self._last_checkpoint = time.time()
+        self.stats['checkpoints'] += 1
+        return saved
+
+    async def _loop(self):
+        step_ms = min(INTERVAL_MS[interval] for interval in self.intervals)
+        while True:
+            try:
+                now_ms = time.time() * 1000
+                for interval in self.intervals:
+                    # Обновляем интервалы, у которых только что закрылась свеча
+                    if now_ms % INTERVAL_MS[interval] < step_ms:
+                        await self.refresh(interval)
+
+                if time.time() - self._last_checkpoint >= ONLINE_MODEL_CHECKPOINT_SECONDS:
+                    self.save_checkpoints()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Online model refresh error: {e}")
+
+            now_ms = time.time() * 1000
+            next_close_ms = (now_ms // step_ms + 1) * step_ms
+            await asyncio.sleep((next_close_ms - now_ms) / 1000 + self.CLOSE_DELAY_SECONDS)
+
+    def start_job(self):
+        if self.intervals and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if len(self.models):
+            self.save_checkpoints()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'models': len(self.models), 'intervals': self.intervals}
+
+
+intraday_forecast_service = IntradayForecastService()
@@ -0,0 +1,134 @@
+import os
+import asyncio
+import logging
+import numpy as np
+from pathlib import Path
+
+from config import KLINE_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Одна свеча - одна запись фиксированного размера, файл читается через memmap
+KLINE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Длительность свечи в мс; у месячных свечей длина плавает, их не храним
+INTERVAL_MS = {
+    '1': 60_000,
+    '3': 180_000,
+    '5': 300_000,
+    '15': 900_000,
+    '30': 1_800_000,
+    '60': 3_600_000,
+    '120': 7_200_000,
+    '240': 14_400_000,
+    '360': 21_600_000,
+    '720': 43_200_000,
+    'D': 86_400_000,
+    'W': 604_800_000,
+}
+
+
+def parse_bybit_klines(klines: list) -> np.ndarray:
+    """Свечи Bybit (новые сначала, строки) -> структурированный массив по возрастанию времени"""
+    candles = np.empty(len(klines), dtype=KLINE_DTYPE)
+    count = 0
+
+    for kline in reversed(klines):
+        try:
+            candles[count] = (int(kline[0]), float(kline[1]), float(kline[2]),
+                              float(kline[3]), float(kline[4]), float(kline[5]))
+            count += 1
+        except (IndexError, ValueError, TypeError):
+            continue
+
+    return candles[:count]
+
+
+class KlineStore:
+    """Локальное хранилище закрытых свечей: один append-only файл на (символ, интервал)"""
+
+    def __init__(self, base_dir: str = KLINE_STORE_DIR):
+        self.base_dir = Path(base_dir)
+        self._maps = {}
+        self._locks = {}
+
+    def _path(self, symbol: str, interval: str) -> Path:
+        return self.base_dir / f"{symbol}_{interval}.bin"
+
+    def lock(self, symbol: str, interval: str) -> asyncio.Lock:
+        """Блокировка на ключ: обновления одного символа не пересекаются"""
+        key = (symbol, interval)
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    def read(self, symbol: str, interval: str) -> np.ndarray:
+        """Все сохранённые свечи (memmap только для чтения) или пустой массив"""
+        path = self._path(symbol, interval)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+        if size < KLINE_DTYPE.itemsize:
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+        key = (symbol, interval)
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+
+        candles = np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(size // KLINE_DTYPE.itemsize,))
+        self._maps[key] = (size, candles)
+        return candles
+
+    def last_timestamp(self, symbol: str, interval: str):
+        candles = self.read(symbol, interval)
+        return int(candles['timestamp'][-1]) if len(candles) else None
+
+    def append(self, symbol: str, interval: str, candles: np.ndarray) -> int:
+        """Дописать свечи новее последней сохранённой, вернуть количество"""
+        last_ts = self.last_timestamp(symbol, interval)
+        if last_ts is not None:
+            candles = candles[candles['timestamp'] > last_ts]
+        if not len(candles):
+            return 0
+
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._path(symbol, interval), 'ab') as f:
+            f.write(np.ascontiguousarray(candles, dtype=KLINE_DTYPE).tobytes())
+
+        self._maps.pop((symbol, interval), None)
+        return len(candles)
+
+    def merge(self, symbol: str, interval: str, candles: np.ndarray) -> int:
+        """Слить свечи с сохранёнными (в т.ч. более старые), файл переписывается атомарно"""
+        stored = self.read(symbol, interval)
+        combined = np.concatenate([np.asarray(stored), candles.astype(KLINE_DTYPE)])
+
+        # При совпадении времени приоритет у новых данных
+        _, last_index = np.unique(combined['timestamp'][::-1], return_index=True)
+        merged = combined[::-1][last_index]
+
+        self.write(symbol, interval, merged)
+        return len(merged) - len(stored)
+
+    def write(self, symbol: str, interval: str, candles: np.ndarray):
+        """Атомарно заменить файл свечей"""
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(symbol, interval)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(candles, dtype=KLINE_DTYPE).tobytes())
+        self._maps.pop((symbol, interval), None)
+        os.replace(tmp_path, path)
+
+
+kline_store = KlineStore()
@@ -0,0 +1,217 @@
+import time
+import asyncio
+import logging
+import numpy as np
+
+from config import (PREDICTION_RESOLVER_INTERVAL_SECONDS, PREDICTION_RESOLVER_BATCH_SIZE,
+                    PREDICTION_RESOLVER_GIVE_UP_DAYS, KLINE_BACKFILL_CONCURRENCY)
+from services.bybit_service import bybit_service
+from services.kline_store import kline_store, INTERVAL_MS
+from services.rate_limiter import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = INTERVAL_MS['D']
+
+
+def score_predictions(target_ms: np.ndarray, predicted: np.ndarray, base: np.ndarray,
+                      candles: np.ndarray, now_ms: int) -> tuple:
+    """Исходы прогнозов одного символа по дневным свечам
+
+    Фактическая цена - закрытие дневной свечи, в которую попадает время цели.
+    Возвращает (маска оценённых, цена, ошибка в %, угадано ли направление;
+    NaN в base - направление не оценивается).
+    """
+    timestamps = candles['timestamp']
+    position = np.searchsorted(timestamps, target_ms, side='right') - 1
+    found = position >= 0
+    position = np.maximum(position, 0)
+    if len(timestamps):
+        open_ts = timestamps[position]
+        found &= (open_ts + DAY_MS > target_ms) & (open_ts + DAY_MS <= now_ms)
+    else:
+        found[:] = False
+
+    realized = candles['close'][position] if len(timestamps) else np.full(len(target_ms), np.nan)
+    error_pct = (predicted - realized) / realized * 100
+    hit = np.sign(predicted - base) == np.sign(realized - base)
+    return found, realized, error_pct, hit
+
+
+class PredictionResolver:
+    """Фоновая оценка prediction_history по фактическим ценам
+
+    Прогнозы с прошедшим горизонтом выбираются пачками, сопоставляются с
+    дневными свечами локального хранилища (searchsorted по символу) и
+    записываются одним set-based UPDATE на пачку вместе с агрегатами
+    prediction_accuracy. Агрегаты держатся в памяти для API.
+    """
+
+    def __init__(self, batch_size: int = PREDICTION_RESOLVER_BATCH_SIZE,
+                 interval_seconds: int = PREDICTION_RESOLVER_INTERVAL_SECONDS,
+                 give_up_days: int = PREDICTION_RESOLVER_GIVE_UP_DAYS):
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.give_up_days = give_up_days
+        self.db = None
+        self.accuracy = {}
+        self.last_run = None
+        self.last_error = None  # последняя ошибка прохода, видна в /api/health
+        self._task = None
+        self.stats = {'runs': 0, 'resolved': 0, 'expired': 0, 'pending': 0, 'errors': 0}
+
+    async def _load_candles(self, symbols: list, oldest_ms: int) -> dict:
+        """Дневные свечи символов с докачкой хвоста хранилища (фоновый приоритет)"""
+        limit = min(int((time.time() * 1000 - oldest_ms) // DAY_MS) + 3, 1000)
+        semaphore = asyncio.Semaphore(KLINE_BACKFILL_CONCURRENCY)
+
+        async def load(symbol: str):
+            async with semaphore:
+                try:
+                    await bybit_service.get_candles(symbol, 'D', limit, priority=PRIORITY_BACKGROUND)
+                except Exception as e:
+                    logger.warning(f"⚠️ Свечи {symbol} для оценки прогнозов: {e}")
+                return kline_store.read(symbol, 'D')
+
+        results = await asyncio.gather(*(load(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    async def resolve_batch(self, rows: list) -> int:
+        now_ms = int(time.time() * 1000)
+        ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        symbols = np.array([row['symbol'] for row in rows], dtype=str)
+        target_ms = np.array([row['target_ms'] for row in rows], dtype=np.int64)
+        predicted = np.array([row['predicted_price'] for row in rows], dtype=float)
+        base = np.array([np.nan if row['base_price'] is None else row['base_price'] for row in rows])
+
+        unique, inverse = np.unique(symbols, return_inverse=True)
+        candles = await self._load_candles(unique.tolist(), int(target_ms.min()))
+
+        resolved = np.zeros(len(rows), dtype=bool)
+        realized = np.full(len(rows), np.nan)
+        error_pct = np.full(len(rows), np.nan)
+        hit = np.zeros(len(rows), dtype=bool)
+
+        for i, symbol in enumerate(unique.tolist()):
+            rows_of = np.flatnonzero(inverse == i)
+            found, price, error, direction = score_predictions(
+                target_ms[rows_of], predicted[rows_of], base[rows_of], candles[symbol], now_ms)
+            resolved[rows_of] = found
+            realized[rows_of] = price
+            error_pct[rows_of] = error
+            hit[rows_of] = direction
+
+        # Цели без свечи спустя give_up_days закрываются без оценки, чтобы не выбирать их вечно
+        expired = ~resolved & (target_ms + self.give_up_days * DAY_MS < now_ms)
+        write = resolved | expired
+        if not write.any():
+            self.stats['pending'] += len(rows)
+            return 0
+
+        scored_direction = resolved & ~np.isnan(base)
+        updated = await self.db.resolve_predictions(
+            ids[write].tolist(),
+            [float(v) if ok else None for v, ok in zip(realized[write], resolved[write])],
+            [float(v) if ok else None for v, ok in zip(error_pct[write], resolved[write])],
+            [bool(v) if ok else None for v, ok in zip(hit[write], scored_direction[write])],
+        )
+
+        self.stats['resolved'] += int(resolved.sum())
+        self.stats['expired'] += int(expired.sum())
+        self.stats['pending'] += int((~write).sum())
+        return updated
+
+    async def run_once(self) -> int:
+        """Один проход по всем прогнозам с прошедшим горизонтом"""
+        if self.db is None or not self.db.is_connected:
+            return 0
+
+        self.stats['pending'] = 0
+        total = 0
+        after_id = 0
+        while True:
+            rows = await self.db.get_due_predictions(after_id, self.batch_size)
+            if not rows:
+                break
+            total += await self.resolve_batch(rows)
+            after_id = rows[-1]['id']
+            if len(rows) < self.batch_size:
+                break
+
+        await self.refresh_accuracy()
+        self.stats['runs'] += 1
+        self.last_run = time.time()
+        return total
+
+    async def refresh_accuracy(self):
+        rows = await self.db.get_prediction_accuracy()
+        self.accuracy = {row['symbol']: self._format(row) for row in rows}
+
+    @staticmethod
+    def _format(row: dict) -> dict:
+        resolved = row['resolved']
+        scored = row['scored_direction']
+        return {
+            'resolved': resolved,
+            'mape': row['sum_abs_error_pct'] / resolved if resolved else None,
+            'bias_pct': row['sum_error_pct'] / resolved if resolved else None,
+            'directional_accuracy': row['direction_hits'] / scored * 100 if scored else None,
+            'scored_direction': scored,
+        }
+
+    def get_accuracy(self, symbol: str = None):
+        """Точность по символу или по всем символам с общим итогом (из памяти)"""
+        if symbol is not None:
+            return self.accuracy.get(symbol)
+
+        resolved = sum(item['resolved'] for item in self.accuracy.values())
+        scored = sum(item['scored_direction'] for item in self.accuracy.values())
+        abs_error = sum(item['mape'] * item['resolved'] for item in self.accuracy.values() if item['resolved'])
+        hits = sum(item['directional_accuracy'] * item['scored_direction'] / 100
+                   for item in self.accuracy.values() if item['scored_direction'])
+        return {
+            'overall': {
+                'resolved': resolved,
+                'mape': abs_error / resolved if resolved else None,
+                'directional_accuracy': hits / scored * 100 if scored else None,
+            },
+            'symbols': self.accuracy,
+        }
+
+    async def _loop(self):
+        while True:
+            try:
+                started = time.time()
+                resolved = await self.run_once()
+                self.last_error = None
+                if resolved:
+                    logger.info(f"✅ Оценено прогнозов: {resolved} за {time.time() - started:.1f}с")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Prediction resolver error: {e}")
+                self.last_error = {'time': time.time(), 'error': f"{type(e).__name__}: {e}"}
+                self.stats['errors'] += 1
+
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, db):
+        self.db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'symbols': len(self.accuracy), 'last_run': self.last_run,
+                'last_error': self.last_error}
+
+
+prediction_resolver = PredictionResolver()
@@ -0,0 +1,153 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Чем меньше число, тем раньше запрос уходит к Bybit
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 10
+
+
+class RateLimiter:
+    """Token bucket с приоритетной очередью для исходящих запросов к Bybit
+
+    Темп задаётся локально (rate/burst) и дополнительно подстраивается по
+    заголовкам ответа X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp:
+    когда лимит исчерпан, очередь ставится на паузу до момента сброса.
+    """
+
+    def __init__(self, rate: float, burst: int, cooldown: float = 60):
+        self.rate = rate
+        self.burst = burst
+        self.cooldown = cooldown
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._timer = None
+        self.stats = {'acquired': 0, 'queued': 0, 'wait_time': 0.0, 'pauses': 0, 'timeouts': 0}
+
+    async def acquire(self, priority: int = PRIORITY_USER, timeout: float = None) -> bool:
+        """Дождаться разрешения на запрос; False - разрешения не будет за timeout секунд
+
+        Если очередь на паузе дольше timeout, отказ возвращается сразу: вызывающий
+        может отдать устаревшие данные вместо ожидания.
+        """
+        self._refill()
+        now = time.monotonic()
+        if not self._queue and self._tokens >= 1 and now >= self._paused_until:
+            self._tokens -= 1
+            self.stats['acquired'] += 1
+            return True
+
+        if timeout is not None and self._paused_until - now >= timeout:
+            self.stats['timeouts'] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        item = (priority, next(self._seq), future)
+        heapq.heappush(self._queue, item)
+        self.stats['queued'] += 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        finally:
+            self.stats['wait_time'] += time.monotonic() - now
+            if not future.done():
+                # Таймаут или отмена ожидающего - место в очереди освобождаем
+                future.cancel()
+                self._queue.remove(item)
+                heapq.heapify(self._queue)
+
+        if future.cancelled():
+            self.stats['timeouts'] += 1
+            return False
+        return True
+
+    def pause(self, seconds: float, reason: str = ''):
+        """Остановить выдачу разрешений на seconds секунд"""
+        until = time.monotonic() + max(seconds, 0)
+        if until > self._paused_until:
+            self._paused_until = until
+            self.stats['pauses'] += 1
+            logger.warning(f"⏸ Bybit rate limit: пауза {seconds:.1f}с {reason}".rstrip())
+            self._reschedule(0)
+
+    def update_from_response(self, status: int, headers):
+        """Подстроиться под ответ Bybit (заголовки X-Bapi-Limit-*, 403/429)"""
+        reset_in = None
+        reset_ts = headers.get('X-Bapi-Limit-Reset-Timestamp')
+        if reset_ts:
+            try:
+                reset_in = int(reset_ts) / 1000 - time.time()
+            except ValueError:
+                reset_in = None
+
+        if status == 403:
+            # 403 у Bybit - бан IP за превышение частоты
+            self.pause(self.cooldown, '(HTTP 403, IP ban)')
+            return
+        if status == 429:
+            self.pause(reset_in if reset_in and reset_in > 0 else 1.0, '(HTTP 429)')
+            return
+
+        remaining = headers.get('X-Bapi-Limit-Status')
+        if remaining is not None and reset_in is not None:
+            try:
+                if int(remaining) <= 1 and reset_in > 0:
+                    self.pause(reset_in, '(X-Bapi-Limit-Status исчерпан)')
+            except ValueError:
+                pass
+
+    def get_stats(self) -> dict:
+        depth = {}
+        for priority, _, future in self._queue:
+            if not future.done():
+                depth[priority] = depth.get(priority, 0) + 1
+        self._refill()
+        return {
+            **self.stats,
+            'wait_time': round(self.stats['wait_time'], 3),
+            'queue_depth': sum(depth.values()),
+            'queue_by_priority': depth,
+            'tokens': round(self._tokens, 2),
+            'paused_for': round(max(self._paused_until - time.monotonic(), 0), 2),
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+
+        while self._queue:
+            priority, _, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+
+            wait = self._paused_until - time.monotonic()
+            if wait <= 0 and self._tokens >= 1:
+                heapq.heappop(self._queue)
+                self._tokens -= 1
+                self.stats['acquired'] += 1
+                future.set_result(None)
+                continue
+
+            self._reschedule(max(wait, (1 - self._tokens) / self.rate))
+            break
+
+    def _reschedule(self, delay: float):
+        if not self._queue:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
@@ -0,0 +1,177 @@
+import time
+import random
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 5.0) -> float:
+    """Экспоненциальная задержка с полным джиттером (AWS full jitter)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных запросов"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        """Перцентиль в секундах или None, пока данных недостаточно"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """Размыкатель: после серии ошибок запросы отклоняются сразу до истечения reset_timeout"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, name: str = ''):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+        # В полуоткрытом состоянии пропускаем один пробный запрос
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"✅ Circuit breaker {self.name} закрыт")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"⚠️ Circuit breaker {self.name} разомкнут после {self.failures} ошибок")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_cancel(self):
+        """Пробный запрос отменён без результата - разрешаем следующую пробу"""
+        self._trial_in_flight = False
+
+    def is_available(self) -> bool:
+        """Можно ли отправить запрос (без изменения состояния)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._trial_in_flight
+
+
+class UpstreamEndpoint:
+    """Базовый URL с EWMA задержки, долей ошибок и собственным размыкателем"""
+
+    ALPHA = 0.2
+    ERROR_HALF_LIFE = 60  # доля ошибок затухает, чтобы адрес снова попробовали
+
+    def __init__(self, url: str, failure_threshold: int, reset_timeout: float):
+        self.url = url
+        self.latency = None
+        self.measured_at = 0.0
+        self._error_rate = 0.0
+        self._error_updated_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, name=url)
+
+    def record_success(self, seconds: float):
+        self.requests += 1
+        self.latency = seconds if self.latency is None else self.ALPHA * seconds + (1 - self.ALPHA) * self.latency
+        self.measured_at = time.monotonic()
+        self._set_error_rate(self.error_rate * (1 - self.ALPHA))
+        self.breaker.record_success()
+
+    def record_failure(self):
+        self.requests += 1
+        self.errors += 1
+        self._set_error_rate(self.ALPHA + (1 - self.ALPHA) * self.error_rate)
+        self.breaker.record_failure()
+
+    @property
+    def error_rate(self) -> float:
+        elapsed = time.monotonic() - self._error_updated_at
+        return self._error_rate * 0.5 ** (elapsed / self.ERROR_HALF_LIFE)
+
+    def _set_error_rate(self, value: float):
+        self._error_rate = value
+        self._error_updated_at = time.monotonic()
+
+    @property
+    def score(self) -> float:
+        # Ещё не измеренный адрес пробуем первым, ошибки сильно штрафуются
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + 10 * self.error_rate) + self.error_rate
+
+    def stats(self) -> dict:
+        return {
+            'url': self.url,
+            'state': self.breaker.state,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class EndpointPool:
+    """Выбор самого быстрого здорового адреса из нескольких зеркал API
+
+    Доля probe_ratio запросов уходит на резервный адрес с самым давним замером,
+    иначе его EWMA устаревает и после временного замедления основного
+    трафик на него не вернётся.
+    """
+
+    def __init__(self, urls: list, failure_threshold: int = 5, reset_timeout: float = 30,
+                 probe_ratio: float = 0.05):
+        self.endpoints = [UpstreamEndpoint(url.rstrip('/'), failure_threshold, reset_timeout) for url in urls]
+        self.probe_ratio = probe_ratio
+        self.probes = 0
+
+    def choose(self, exclude=()):
+        """Лучший доступный адрес или None, если все размыкатели открыты"""
+        candidates = sorted((e for e in self.endpoints if e not in exclude and e.breaker.is_available()),
+                            key=lambda e: e.score)
+
+        # Пробуем только закрытые резервные адреса: полуоткрытые проверяет сам размыкатель
+        standby = [e for e in candidates[1:] if e.breaker.state == CircuitBreaker.CLOSED]
+        if standby and random.random() < self.probe_ratio:
+            self.probes += 1
+            return min(standby, key=lambda e: e.measured_at)
+
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                return endpoint
+        return None
+
+    def stats(self) -> list:
+        return [e.stats() for e in self.endpoints]
@@ -0,0 +1,102 @@
+import json
+import time
+import logging
+from collections import OrderedDict
+
+from config import CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTLS
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Ограниченный кэш ответов API
+
+    Пространство имён - часть ключа до двоеточия ('search:btc' -> 'search'),
+    у каждого свой TTL. Размер записи - длина её JSON, общий объём и число
+    записей ограничены; при переполнении вытесняются давно не читанные (LRU).
+    Запись больше десятой части бюджета не кэшируется.
+
+    bytes - длина JSON текста, а не занятая память: хранятся сами объекты
+    Python, и реальный расход в несколько раз больше max_bytes.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 ttls: dict = None, default_ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = RESPONSE_CACHE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # ключ -> (значение, истекает, байты)
+        self.bytes = 0
+        self.stats = {}
+
+    @staticmethod
+    def namespace(key: str) -> str:
+        return key.split(':', 1)[0]
+
+    def _counters(self, namespace: str) -> dict:
+        counters = self.stats.get(namespace)
+        if counters is None:
+            counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'rejected': 0}
+            self.stats[namespace] = counters
+        return counters
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        counters = self._counters(self.namespace(key))
+        entry = self._entries.get(key)
+        if entry is None:
+            counters['misses'] += 1
+            return None
+
+        value, expires_at, _ = entry
+        if time.time() >= expires_at:
+            self._remove(key)
+            counters['expired'] += 1
+            counters['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        counters['hits'] += 1
+        return value
+
+    def set(self, key: str, value):
+        namespace = self.namespace(key)
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes // 10:
+            self._counters(namespace)['rejected'] += 1
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        ttl = self.ttls.get(namespace, self.default_ttl)
+        self._entries[key] = (value, time.time() + ttl, size)
+        self.bytes += size
+
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            evicted_key = next(iter(self._entries))
+            self._remove(evicted_key)
+            self._counters(self.namespace(evicted_key))['evictions'] += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'namespaces': self.stats,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,358 @@
+"""
+Потоковые индикаторы: O(1) обновление на каждую закрытую свечу или тик
+
+Состояние хранится отдельно для каждой пары (символ, интервал). Закрытые
+свечи меняют состояние, тик только запоминает живую цену - значения для
+незакрытой свечи считаются "как если бы она закрылась по этой цене" без
+изменения состояния. Формулы совпадают с services/indicators.py
+(EMA и RSI Уайлдера с затравкой SMA).
+"""
+
+import math
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Глубина окна как у get_price_history(days=90) - 180 дневных свечей
+HISTORY_WINDOW = 180
+LEVELS_WINDOW = 20
+
+
+def _welford_add(n: int, mean: float, m2: float, x: float) -> tuple:
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    return n, mean, m2 + delta * (x - mean)
+
+
+def _welford_remove(n: int, mean: float, m2: float, x: float) -> tuple:
+    n -= 1
+    if n <= 0:
+        return 0, 0.0, 0.0
+    delta = x - mean
+    mean -= delta / n
+    return n, mean, max(m2 - delta * (x - mean), 0.0)
+
+
+class RunningEMA:
+    """EMA с затравкой SMA первых period значений; alpha=1/period даёт сглаживание Уайлдера"""
+
+    def __init__(self, period: int, alpha: float = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.value = None
+        self._count = 0
+        self._seed_sum = 0.0
+
+    def update(self, x: float):
+        if self.value is None:
+            self._count += 1
+            self._seed_sum += x
+            if self._count == self.period:
+                self.value = self._seed_sum / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def peek(self, x: float):
+        """Значение после x без изменения состояния"""
+        if self.value is None:
+            return (self._seed_sum + x) / self.period if self._count + 1 == self.period else None
+        return self.value + self.alpha * (x - self.value)
+
+
+class WilderRSI:
+    def __init__(self, period: int = 14):
+        self.prev = None
+        self.avg_gain = RunningEMA(period, alpha=1.0 / period)
+        self.avg_loss = RunningEMA(period, alpha=1.0 / period)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100 - 100 / (1 + gain / loss)
+
+    @property
+    def value(self):
+        return self._rsi(self.avg_gain.value, self.avg_loss.value)
+
+    def update(self, close: float):
+        if self.prev is not None:
+            delta = close - self.prev
+            self.avg_gain.update(max(delta, 0.0))
+            self.avg_loss.update(max(-delta, 0.0))
+        self.prev = close
+        return self.value
+
+    def peek(self, price: float):
+        if self.prev is None:
+            return None
+        delta = price - self.prev
+        return self._rsi(self.avg_gain.peek(max(delta, 0.0)), self.avg_loss.peek(max(-delta, 0.0)))
+
+
+class RollingStats:
+    """Среднее и дисперсия по скользящему окну (Welford с удалением старых значений)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._removed = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, x: float):
+        n = len(self.values)
+        if n == self.window:
+            n, self.mean, self.m2 = _welford_remove(n, self.mean, self.m2, self.values.popleft())
+            self._removed += 1
+        self.values.append(x)
+        _, self.mean, self.m2 = _welford_add(n, self.mean, self.m2, x)
+
+        # Периодический точный пересчёт убирает накопленную ошибку округления
+        if self._removed >= self.window:
+            self._removed = 0
+            self.mean = math.fsum(self.values) / len(self.values)
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    def peek(self, x: float) -> tuple:
+        """(среднее, дисперсия) окна после x без изменения состояния"""
+        n, mean, m2 = len(self.values), self.mean, self.m2
+        if n == self.window:
+            n, mean, m2 = _welford_remove(n, mean, m2, self.values[0])
+        n, mean, m2 = _welford_add(n, mean, m2, x)
+        return mean, m2 / n
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / len(self.values) if self.values else 0.0
+
+    def first(self, peek: bool = False):
+        """Самое старое значение окна (с учётом вытеснения при peek)"""
+        if not self.values:
+            return None
+        if peek and len(self.values) == self.window:
+            return self.values[1] if self.window > 1 else None
+        return self.values[0]
+
+
+class RollingExtremes:
+    """Максимум и минимум скользящего окна на монотонных деках"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._index = 0
+        self._max = deque()
+        self._min = deque()
+
+    def update(self, x: float):
+        self._index += 1
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._max.append((self._index, x))
+        self._min.append((self._index, x))
+
+        expired = self._index - self.window
+        if self._max[0][0] <= expired:
+            self._max.popleft()
+        if self._min[0][0] <= expired:
+            self._min.popleft()
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    def _peek_front(self, queue: deque):
+        # После добавления из окна выпадет только индекс index + 1 - window
+        if not queue:
+            return None
+        if queue[0][0] <= self._index + 1 - self.window:
+            return queue[1][1] if len(queue) > 1 else None
+        return queue[0][1]
+
+    def peek(self, x: float) -> tuple:
+        """(минимум, максимум) окна после x"""
+        low = self._peek_front(self._min)
+        high = self._peek_front(self._max)
+        return (x if low is None else min(low, x)), (x if high is None else max(high, x))
+
+
+class StreamingIndicators:
+    """Индикаторы одного символа на одном интервале"""
+
+    MA_PERIODS = (7, 20, 25, 50)
+
+    def __init__(self, interval_ms: int = None, window: int = HISTORY_WINDOW, levels_window: int = LEVELS_WINDOW):
+        self.interval_ms = interval_ms
+        self.window = window
+        self.last_timestamp = None
+        self.live_price = None
+        self.updates = 0
+
+        self.ema_12 = RunningEMA(12)
+        self.ema_26 = RunningEMA(26)
+        self.macd_signal = RunningEMA(9)
+        self.rsi = WilderRSI(14)
+        self.moving_averages = {period: RollingStats(period) for period in self.MA_PERIODS}
+        self.closes = RollingStats(window)
+        self.returns = RollingStats(window - 1)
+        self.levels = RollingExtremes(levels_window)
+
+    def update(self, timestamp: int, close: float):
+        """Закрытая свеча; более старые, чем уже учтённые, игнорируются"""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return
+        close = float(close)
+
+        prev = self.closes.values[-1] if len(self.closes) else None
+        if prev:
+            self.returns.update((close - prev) / prev * 100)
+
+        fast = self.ema_12.update(close)
+        slow = self.ema_26.update(close)
+        if fast is not None and slow is not None:
+            self.macd_signal.update(fast - slow)
+
+        self.rsi.update(close)
+        for stats in self.moving_averages.values():
+            stats.update(close)
+        self.closes.update(close)
+        self.levels.update(close)
+
+        self.last_timestamp = int(timestamp)
+        self.updates += 1
+
+    def on_tick(self, price: float):
+        """Живая цена незакрытой свечи; закрытые свечи приходят только через update"""
+        self.live_price = float(price)
+
+    def is_stale(self, now_ms: int = None) -> bool:
+        """Закрылась свеча, которой нет в состоянии (или закрытых свечей ещё не было)
+
+        Закрытия не достраиваются из живой цены: после разрыва потока это были бы
+        выдуманные свечи. Устаревшее состояние догоняется по хранилищу свечей.
+        """
+        if self.last_timestamp is None:
+            return True
+        if not self.interval_ms:
+            return False
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return now_ms >= self.last_timestamp + 2 * self.interval_ms
+
+    def snapshot(self) -> dict:
+        """Значения на текущий момент: по живой цене, если она есть, иначе по последней закрытой свече"""
+        price = self.live_price
+        if price is None:
+            if not len(self.closes):
+                return None
+            return self._closed_snapshot()
+
+        fast, slow = self.ema_12.peek(price), self.ema_26.peek(price)
+        macd = fast - slow if fast is not None and slow is not None else None
+        signal = self.macd_signal.peek(macd) if macd is not None else None
+
+        prev = self.closes.values[-1] if len(self.closes) else None
+        _, returns_variance = self.returns.peek((price - prev) / prev * 100) if prev else (0.0, self.returns.variance)
+        first = self.closes.first(peek=True)
+        support, resistance = self.levels.peek(price)
+
+        return self._format(
+            price=price,
+            rsi=self.rsi.peek(price),
+            moving_averages={p: stats.peek(price)[0] for p, stats in self.moving_averages.items()},
+            ema_12=fast, macd=macd, signal=signal,
+            volatility=math.sqrt(returns_variance),
+            first=first if first is not None else price,
+            support=support, resistance=resistance,
+        )
+
+    def _closed_snapshot(self) -> dict:
+        fast, slow = self.ema_12.value, self.ema_26.value
+        return self._format(
+            price=self.closes.values[-1],
+            rsi=self.rsi.value,
+            moving_averages={p: stats.mean for p, stats in self.moving_averages.items()},
+            ema_12=fast,
+            macd=fast - slow if fast is not None and slow is not None else None,
+            signal=self.macd_signal.value,
+            volatility=math.sqrt(self.returns.variance),
+            first=self.closes.first(),
+            support=self.levels.min, resistance=self.levels.max,
+        )
+
+    def _format(self, price, rsi, moving_averages, ema_12, macd, signal, volatility, first,
+                support, resistance) -> dict:
+        macd = macd if macd is not None else 0.0
+        signal = signal if signal is not None else macd
+        return {
+            'price': float(price),
+            'rsi': float(rsi) if rsi is not None else 50.0,
+            'ma_7': float(moving_averages[7]),
+            'ma_25': float(moving_averages[25]),
+            'ma_50': float(moving_averages[50]),
+            'sma_20': float(moving_averages[20]),
+            'ema_12': float(ema_12) if ema_12 is not None else float(price),
+            'macd': float(macd),
+            'signal': float(signal),
+            'histogram': float(macd - signal),
+            'volatility': float(volatility),
+            'trend_strength': float((price - first) / first * 100) if first else 0.0,
+            'support': float(support),
+            'resistance': float(resistance),
+            'last_closed': self.last_timestamp,
+        }
+
+
+class StreamingIndicatorRegistry:
+    """Состояния индикаторов по (символ, интервал); тики раздаются всем интервалам символа"""
+
+    WARMUP_CANDLES = 1000  # EMA/RSI сходятся задолго до этого
+
+    def __init__(self):
+        self._states = {}
+        self._by_symbol = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, symbol: str, interval: str):
+        return self._states.get((symbol, interval))
+
+    def sync(self, symbol: str, interval: str, closed_candles, interval_ms: int = None) -> StreamingIndicators:
+        """Догнать состояние по закрытым свечам (массив KLINE_DTYPE по возрастанию времени)
+
+        Учитываются только свечи новее последней обработанной, поэтому повторный
+        вызов с тем же хранилищем почти ничего не стоит.
+        """
+        key = (symbol, interval)
+        state = self._states.get(key)
+        if state is None:
+            state = StreamingIndicators(interval_ms)
+            self._states[key] = state
+            self._by_symbol.setdefault(symbol, []).append(state)
+            closed_candles = closed_candles[-self.WARMUP_CANDLES:]
+
+        if state.last_timestamp is not None:
+            closed_candles = closed_candles[closed_candles['timestamp'] > state.last_timestamp]
+
+        for timestamp, close in zip(closed_candles['timestamp'].tolist(), closed_candles['close'].tolist()):
+            state.update(timestamp, close)
+        return state
+
+    def on_tick(self, symbol: str, price: float):
+        for state in self._by_symbol.get(symbol, ()):
+            state.on_tick(price)
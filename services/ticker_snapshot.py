@@ -0,0 +1,74 @@
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TickerSnapshot:
+    """Колоночный снимок всех spot тикеров Bybit (USDT пары)
+
+    Список /v5/market/tickers разбирается один раз: символы лежат в одном
+    массиве строк, числовые поля - в одной матрице float64. Поиск, проверка
+    символа и цена читаются из памяти без запросов к Bybit.
+    """
+
+    COLUMNS = ('last_price', 'change_24h', 'high_24h', 'low_24h', 'volume_24h', 'turnover_24h')
+    SOURCE_FIELDS = ('lastPrice', 'price24hPcnt', 'highPrice24h', 'lowPrice24h', 'volume24h', 'turnover24h')
+
+    def __init__(self, symbols: np.ndarray, values: np.ndarray, created_at: float = None):
+        self.symbols = symbols
+        self.values = values
+        self.created_at = created_at or time.time()
+        self._index = {symbol: i for i, symbol in enumerate(symbols.tolist())}
+
+    @classmethod
+    def from_bybit_list(cls, rows: list) -> 'TickerSnapshot':
+        symbols = []
+        values = []
+
+        for row in rows:
+            symbol = row.get('symbol', '')
+            if not symbol.endswith('USDT'):
+                continue
+            try:
+                values.append([float(row.get(field) or 0) for field in cls.SOURCE_FIELDS])
+            except (TypeError, ValueError):
+                continue
+            symbols.append(symbol)
+
+        values = np.array(values, dtype=np.float64).reshape(-1, len(cls.COLUMNS))
+        values[:, 1] *= 100  # price24hPcnt приходит долей
+
+        order = np.argsort(symbols, kind='stable')
+        return cls(np.array(symbols, dtype=str)[order], values[order])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str):
+        return symbol in self._index
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.COLUMNS.index(name)]
+
+    def _row(self, i: int) -> dict:
+        row = {'symbol': str(self.symbols[i])}
+        row.update(zip(self.COLUMNS, self.values[i].tolist()))
+        return row
+
+    def get(self, symbol: str):
+        i = self._index.get(symbol)
+        return self._row(i) if i is not None else None
+
+    def search(self, query: str, limit: int = 20) -> list:
+        if not len(self.symbols):
+            return []
+        matches = np.flatnonzero(np.char.find(self.symbols, query.upper()) >= 0)
+        return [self._row(i) for i in matches[:limit]]
+
+    def usdt_symbols(self) -> set:
+        return set(self._index)